@@ -1,9 +1,12 @@
 
 from datetime import datetime, timedelta
+import asyncio
 from fastapi import HTTPException, status, Depends
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from app.db.mongodb import users_collection
+from app.utils.cache import TTLCache
+from app.utils.access_log import set_request_user
 import os
 from bson import ObjectId
 
@@ -12,6 +15,11 @@ SECRET_KEY = os.environ.get("SECRET_KEY", "your_secret_key_here")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24  # 24 hours
 
+# Tokens carry the user's roles and auth_version; the current version per user
+# is cached for this long, which bounds how late another worker sees a role change
+AUTH_VERSION_TTL_SECONDS = int(os.environ.get("AUTH_VERSION_TTL_SECONDS", "60"))
+auth_version_cache = TTLCache(maxsize=10000, ttl=AUTH_VERSION_TTL_SECONDS)
+
 # Password context for hashing
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
@@ -31,6 +39,34 @@ def create_access_token(data: dict, expires_delta: timedelta = None):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
+def create_user_token(user, expires_delta: timedelta = None):
+    """Create an access token carrying the claims needed to authorize without a user lookup"""
+    roles = user.get("roles") or [user.get("role", "user")]
+    return create_access_token(
+        data={
+            "sub": user["email"],
+            "uid": str(user["_id"]),
+            "role": user.get("role", "user"),
+            "roles": roles,
+            "ver": user.get("auth_version", 0)
+        },
+        expires_delta=expires_delta
+    )
+
+async def get_auth_version(email: str):
+    """Current auth_version of a user, served from the in-process cache when fresh"""
+    version = auth_version_cache.get(email)
+    if version is None:
+        user = await users_collection.find_one({"email": email}, {"auth_version": 1})
+        if user is None:
+            return None
+        version = user.get("auth_version", 0)
+        auth_version_cache.set(email, version)
+    return version
+
+def invalidate_auth_version(email: str):
+    auth_version_cache.pop(email)
+
 async def get_current_user(token: str):
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
@@ -45,15 +81,68 @@ async def get_current_user(token: str):
     except JWTError:
         raise credentials_exception
 
-    user = users_collection.find_one({"email": email})
+    # Tokens issued with role claims authorize from the claims alone, as long as
+    # the user's auth_version has not moved on since the token was issued
+    if "ver" in payload and "roles" in payload and "uid" in payload:
+        if await get_auth_version(email) == payload["ver"]:
+            set_request_user(payload["uid"])
+            return {
+                "_id": payload["uid"],
+                "email": email,
+                "role": payload.get("role", "user"),
+                "roles": payload["roles"],
+                "auth_version": payload["ver"]
+            }
+
+    # Legacy or stale token: fall back to the user document
+    user = await users_collection.find_one({"email": email})
     if user is None:
         raise credentials_exception
 
     # Convert ObjectId to string
     user["_id"] = str(user["_id"])
+    set_request_user(user["_id"])
     
     return user
 
+def get_context_value(request, data=None):
+    """Build the per-request GraphQL context.
+
+    The user is not resolved here; `get_context_user` authenticates lazily on
+    first use and shares the result with every other resolver in the request.
+    """
+    return {"request": request}
+
+def get_bearer_token(request):
+    auth_header = request.headers.get("Authorization") if request else None
+    if not auth_header or not auth_header.startswith("Bearer "):
+        return None
+    return auth_header.split(" ")[1]
+
+async def _authenticate_request(request):
+    token = get_bearer_token(request)
+    if token is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Not authenticated",
+            headers={"WWW-Authenticate": "Bearer"}
+        )
+    return await get_current_user(token)
+
+async def get_context_user(info):
+    """Return the authenticated user for the current request.
+
+    Resolvers of one operation run concurrently, so the lookup is stored as a
+    task on the context: the first caller starts it and everyone else awaits
+    the same result (or the same 401).
+    """
+    context = info.context
+    user_task = context.get("user_task")
+    if user_task is None:
+        user_task = asyncio.ensure_future(_authenticate_request(context.get("request")))
+        context["user_task"] = user_task
+    return await asyncio.shield(user_task)
+
 def is_admin(user):
     return user["role"] == "admin" or "admin" in user.get("roles", [])
 
@@ -64,18 +153,21 @@ def has_role(user, role):
         return role in user["roles"]
     return False
 
-def admin_required(user):
+async def admin_required(info):
+    user = await get_context_user(info)
     if not is_admin(user):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Admin privileges required"
         )
-    return True
+    return user
 
-def role_required(user, role):
-    if not has_role(user, role):
+async def role_required(info, *roles, detail=None):
+    """Require any one of `roles`; returns the authenticated user"""
+    user = await get_context_user(info)
+    if not any(has_role(user, role) for role in roles):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
-            detail=f"{role} privileges required"
+            detail=detail or f"{' or '.join(roles)} privileges required"
         )
-    return True
+    return user
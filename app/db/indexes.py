@@ -0,0 +1,136 @@
+"""
+Index registry: every index the application relies on, declared per collection.
+
+Applied idempotently at startup by `ensure_indexes`. A unique index that
+cannot be built (typically because existing documents hold duplicates) fails
+startup, since writes would no longer be checked for duplicates; set
+REQUIRE_UNIQUE_INDEXES=0 to start anyway while the duplicates are cleaned up.
+To compare the registry with what the server actually has, and see which
+indexes are never used:
+
+    python -m app.db.indexes report
+"""
+import asyncio
+import logging
+import os
+import sys
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from pymongo.errors import OperationFailure
+from app.db.mongodb import db
+
+REQUIRE_UNIQUE_INDEXES = os.environ.get("REQUIRE_UNIQUE_INDEXES", "1") != "0"
+
+logger = logging.getLogger(__name__)
+
+INDEXES = {
+    "users": [
+        IndexModel([("email", ASCENDING)], name="email_unique", unique=True),
+    ],
+    "roles": [
+        IndexModel([("name", ASCENDING)], name="name_unique", unique=True),
+    ],
+    "fy_configs": [
+        IndexModel([("fy", ASCENDING)], name="fy_unique", unique=True),
+    ],
+    "weekly_reports": [
+        IndexModel(
+            [("fy", ASCENDING), ("quarter", ASCENDING), ("week_date", ASCENDING)],
+            name="fy_quarter_week_unique", unique=True
+        ),
+        IndexModel([("report_date", DESCENDING), ("_id", DESCENDING)], name="report_date_id"),
+    ],
+    "report_drafts": [
+        IndexModel(
+            [("fy", ASCENDING), ("quarter", ASCENDING), ("week_date", ASCENDING), ("created_by", ASCENDING)],
+            name="fy_quarter_week_owner_unique", unique=True
+        ),
+    ],
+    "quarterly_rollups": [
+        IndexModel(
+            [("fy", ASCENDING), ("quarter", ASCENDING)],
+            name="fy_quarter_unique", unique=True
+        ),
+    ],
+    "export_jobs": [
+        IndexModel([("cache_key", ASCENDING), ("created_at", DESCENDING)], name="cache_key_created_at"),
+        IndexModel([("status", ASCENDING), ("last_accessed_at", ASCENDING)], name="status_last_accessed_at"),
+        IndexModel([("file_name", ASCENDING)], name="file_name"),
+    ],
+    "shared_state": [
+        IndexModel([("expires_at", ASCENDING)], name="expires_at_ttl", expireAfterSeconds=0),
+    ],
+    "automation_metadata": [
+        IndexModel([("apaid", ASCENDING)], name="apaid_unique", unique=True),
+        IndexModel([("priority", ASCENDING)], name="priority"),
+    ],
+    "execution_data": [
+        IndexModel([("apaid", ASCENDING)], name="apaid_unique", unique=True),
+        IndexModel([("current_status", ASCENDING)], name="current_status"),
+    ],
+    "infra_register": [
+        IndexModel([("last_dr_date", DESCENDING)], name="last_dr_date"),
+    ],
+    "interface_register": [
+        IndexModel([("apaid", ASCENDING)], name="apaid"),
+        IndexModel([("next_password_update_date", ASCENDING)], name="next_password_update_date"),
+    ],
+    "microbot_register": [
+        IndexModel([("apaid", ASCENDING)], name="apaid"),
+    ],
+}
+
+async def ensure_indexes():
+    """Create any missing registry index; existing identical indexes are left alone.
+
+    Indexes are created one at a time, plain ones before unique ones, so an
+    index that cannot be built does not hold back the others.
+    """
+    failed_unique = []
+    for unique in (False, True):
+        for collection_name, indexes in INDEXES.items():
+            for index in indexes:
+                if bool(index.document.get("unique")) != unique:
+                    continue
+                name = index.document["name"]
+                try:
+                    await db[collection_name].create_indexes([index])
+                except OperationFailure as e:
+                    logger.error("Could not create index %s on %s: %s", name, collection_name, e)
+                    if unique:
+                        failed_unique.append(f"{collection_name}.{name}")
+
+    if failed_unique and REQUIRE_UNIQUE_INDEXES:
+        raise RuntimeError(
+            f"Unique indexes could not be created: {', '.join(failed_unique)}. "
+            "Remove the duplicate documents, or set REQUIRE_UNIQUE_INDEXES=0 to start without them."
+        )
+    print("✅ Indexes ready")
+
+async def index_report():
+    """Print, per collection, registry indexes that are missing and indexes never used.
+
+    Usage counts come from $indexStats and reset when the server restarts.
+    """
+    for collection_name, indexes in INDEXES.items():
+        collection = db[collection_name]
+        declared = {index.document["name"] for index in indexes}
+        existing = await collection.index_information()
+        stats = await collection.aggregate([{"$indexStats": {}}]).to_list(length=None)
+        ops = {}
+        for stat in stats:
+            ops[stat["name"]] = ops.get(stat["name"], 0) + stat["accesses"]["ops"]
+
+        missing = sorted(declared - set(existing))
+        unused = sorted(name for name in existing if name != "_id_" and ops.get(name, 0) == 0)
+        undeclared = sorted(set(existing) - declared - {"_id_"})
+
+        print(f"{collection_name}:")
+        print(f"  missing:    {', '.join(missing) or '-'}")
+        print(f"  unused:     {', '.join(unused) or '-'}")
+        print(f"  undeclared: {', '.join(undeclared) or '-'}")
+
+if __name__ == "__main__":
+    if sys.argv[1:] != ["report"]:
+        print("Usage: python -m app.db.indexes report")
+        sys.exit(1)
+    asyncio.run(index_report())
@@ -1,10 +1,12 @@
 
 from app.db.mongodb import users_collection, roles_collection
+from app.db.indexes import ensure_indexes
+from app.db.rollups import drop_legacy_rollups, ensure_quarterly_rollups
 from app.auth import get_password_hash
 from datetime import datetime
 import os
 
-def init_roles():
+async def init_roles():
     """Initialize application roles if they don't exist"""
     required_roles = [
         {
@@ -58,21 +60,24 @@ def init_roles():
     ]
     
     for role in required_roles:
-        existing_role = roles_collection.find_one({"name": role["name"]})
+        existing_role = await roles_collection.find_one({"name": role["name"]})
         if not existing_role:
             role["created_at"] = datetime.utcnow()
-            roles_collection.insert_one(role)
+            await roles_collection.insert_one(role)
             print(f"✅ Created role: {role['name']}")
         else:
             print(f"ℹ️ Role already exists: {role['name']}")
 
-def create_superadmin():
+async def create_superadmin():
     """Create superadmin user if it doesn't exist"""
     # ... keep existing code (create_superadmin function)
 
-def initialize_database():
-    """Initialize database with required roles and superadmin user"""
+async def initialize_database():
+    """Initialize database with indexes, required roles and superadmin user"""
     print("🔄 Initializing database...")
-    init_roles()
-    create_superadmin()
+    await drop_legacy_rollups()
+    await ensure_indexes()
+    await init_roles()
+    await create_superadmin()
+    await ensure_quarterly_rollups()
     print("✅ Database initialization complete")
@@ -0,0 +1,74 @@
+import asyncio
+from bson import ObjectId
+from app.db.mongodb import metrics_collection
+
+class MetricLoader:
+    """Per-request batch loader for metric definitions.
+
+    Every `load` issued before the event loop gets back to the loader is
+    collected and fetched with one `$in` query. Results are memoized for the
+    lifetime of the loader (one GraphQL request), so callers must treat the
+    returned documents as read-only.
+    """
+
+    def __init__(self, collection=metrics_collection):
+        self.collection = collection
+        self._futures = {}
+        self._queue = []
+        self._dispatch_task = None
+
+    def load(self, metric_id):
+        """Return an awaitable resolving to the metric document, or None if it doesn't exist"""
+        future = self._futures.get(metric_id)
+        if future is None:
+            loop = asyncio.get_running_loop()
+            future = loop.create_future()
+            self._futures[metric_id] = future
+            self._queue.append(metric_id)
+            if len(self._queue) == 1:
+                loop.call_soon(self._schedule_dispatch)
+        return future
+
+    async def load_many(self, metric_ids):
+        """Load several metrics in one batch; invalid IDs come back as their exception"""
+        return await asyncio.gather(
+            *(self.load(metric_id) for metric_id in metric_ids),
+            return_exceptions=True
+        )
+
+    def _schedule_dispatch(self):
+        self._dispatch_task = asyncio.ensure_future(self._dispatch())
+
+    async def _dispatch(self):
+        metric_ids, self._queue = self._queue, []
+
+        object_ids = {}
+        for metric_id in metric_ids:
+            try:
+                object_ids[metric_id] = ObjectId(metric_id)
+            except Exception as e:
+                self._futures[metric_id].set_exception(e)
+
+        if not object_ids:
+            return
+
+        try:
+            docs = await self.collection.find(
+                {"_id": {"$in": list(object_ids.values())}}
+            ).to_list(length=None)
+        except Exception as e:
+            for metric_id in object_ids:
+                self._futures[metric_id].set_exception(e)
+            return
+
+        docs_by_id = {doc["_id"]: doc for doc in docs}
+        for metric_id, object_id in object_ids.items():
+            self._futures[metric_id].set_result(docs_by_id.get(object_id))
+
+def get_metric_loader(info):
+    """Return the MetricLoader bound to the current request's context"""
+    context = info.context
+    loader = context.get("metric_loader")
+    if loader is None:
+        loader = context["metric_loader"] = MetricLoader()
+    return loader
@@ -0,0 +1,86 @@
+"""
+One-off data migrations, run by name:
+
+    python -m app.db.migrations <name>
+
+Every migration is idempotent and only touches documents that still need it.
+"""
+import asyncio
+import sys
+from datetime import datetime
+from pymongo import UpdateOne
+from app.db.mongodb import db, weekly_reports_collection, report_drafts_collection, parse_week_date
+from app.db.serializers import FIELD_TYPES, date_fields
+
+BATCH_SIZE = 1000
+
+async def _bulk_update(collection, operations):
+    if operations:
+        await collection.bulk_write(operations, ordered=False)
+    return len(operations)
+
+async def backfill_report_dates():
+    """Add the sortable report_date to weekly reports and drafts that only have week_date"""
+    for collection in (weekly_reports_collection, report_drafts_collection):
+        updated = 0
+        operations = []
+        cursor = collection.find({"report_date": {"$exists": False}}, {"week_date": 1})
+        async for doc in cursor:
+            operations.append(UpdateOne(
+                {"_id": doc["_id"]},
+                {"$set": {"report_date": parse_week_date(doc.get("week_date"))}}
+            ))
+            if len(operations) >= BATCH_SIZE:
+                updated += await _bulk_update(collection, operations)
+                operations = []
+        updated += await _bulk_update(collection, operations)
+        print(f"✅ {collection.name}: report_date set on {updated} documents")
+
+def _parse_stored_date(value):
+    try:
+        return datetime.strptime(value, '%d-%m-%Y %H:%M:%S')
+    except ValueError:
+        return parse_week_date(value)
+
+async def convert_native_dates():
+    """Rewrite date fields stored as strings (DD-MM-YYYY, ISO) as BSON dates"""
+    for collection_name in FIELD_TYPES:
+        fields = date_fields(collection_name)
+        if not fields:
+            continue
+        collection = db[collection_name]
+        updated = unparseable = 0
+        operations = []
+        cursor = collection.find(
+            {"$or": [{field: {"$type": "string"}} for field in fields]},
+            {field: 1 for field in fields}
+        )
+        async for doc in cursor:
+            changes = {}
+            for field in fields:
+                if isinstance(doc.get(field), str):
+                    parsed = _parse_stored_date(doc[field])
+                    if parsed:
+                        changes[field] = parsed
+                    else:
+                        unparseable += 1
+            if changes:
+                operations.append(UpdateOne({"_id": doc["_id"]}, {"$set": changes}))
+            if len(operations) >= BATCH_SIZE:
+                updated += await _bulk_update(collection, operations)
+                operations = []
+        updated += await _bulk_update(collection, operations)
+        print(f"✅ {collection_name}: dates converted on {updated} documents")
+        if unparseable:
+            print(f"⚠️ {collection_name}: {unparseable} date values could not be parsed and were left as is")
+
+MIGRATIONS = {
+    "report-dates": backfill_report_dates,
+    "native-dates": convert_native_dates,
+}
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2 or sys.argv[1] not in MIGRATIONS:
+        print(f"Usage: python -m app.db.migrations {{{'|'.join(MIGRATIONS)}}}")
+        sys.exit(1)
+    asyncio.run(MIGRATIONS[sys.argv[1]]())
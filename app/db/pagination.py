@@ -0,0 +1,106 @@
+"""
+Relay-style connections with keyset (cursor) pagination.
+
+A page is fetched with the sort keys of the last document seen as a lower
+bound, so every page costs one indexed range scan no matter how deep it is,
+unlike skip/limit. Cursors are the base64 encoded sort-key values of a document.
+"""
+import base64
+from bson import json_util
+from fastapi import HTTPException, status
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+def encode_cursor(doc, sort):
+    # A missing sort key sorts (and is matched) as null
+    values = [doc.get(key) for key, _ in sort]
+    return base64.urlsafe_b64encode(json_util.dumps(values).encode()).decode()
+
+def decode_cursor(cursor, sort):
+    try:
+        values = json_util.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (ValueError, TypeError):
+        values = None
+    if not isinstance(values, list) or len(values) != len(sort):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid pagination cursor"
+        )
+    return values
+
+def _after_value(key, direction, value):
+    """Condition on `key` for documents strictly after `value`, or None if there are none.
+
+    Null (or missing) sorts before every other value, so it comes last in
+    descending order and first in ascending order.
+    """
+    if direction > 0:
+        return {key: {"$ne": None}} if value is None else {key: {"$gt": value}}
+    if value is None:
+        return None
+    return {"$or": [{key: {"$lt": value}}, {key: None}]}
+
+def keyset_filter(sort, values):
+    """Filter matching the documents that come after `values` in `sort` order.
+
+    (a, b) after (x, y) means a > x, or a == x and b > y (with < for descending keys).
+    """
+    clauses = []
+    for i, (key, direction) in enumerate(sort):
+        after = _after_value(key, direction, values[i])
+        if after is None:
+            continue
+        clause = {prev_key: values[j] for j, (prev_key, _) in enumerate(sort[:i])}
+        clauses.append({"$and": [clause, after]} if clause else after)
+    return {"$or": clauses} if clauses else {"_id": {"$exists": False}}
+
+def with_sort_keys(projection, sort):
+    """`projection` extended so fetched documents carry the sort keys cursors are built from"""
+    if not projection:
+        return projection
+    fields = {key: value for key, value in projection.items() if key != "_id"}
+    if fields and not any(fields.values()):
+        # Exclusion projection: just make sure no sort key is excluded
+        return {key: value for key, value in projection.items() if key not in dict(sort)}
+    return {**projection, **{key: 1 for key, _ in sort}}
+
+async def paginate(collection, query, first=None, after=None, sort=None, projection=None, node=None):
+    """One page of `collection.find(query)` as a connection.
+
+    `sort` must end with _id so cursors are unique; `node` turns each document
+    into the GraphQL node.
+    """
+    sort = sort or [("_id", 1)]
+    if first is None:
+        first = DEFAULT_PAGE_SIZE
+    if first < 0:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="first must not be negative"
+        )
+    first = min(first, MAX_PAGE_SIZE)
+
+    page_query = query
+    if after:
+        after_filter = keyset_filter(sort, decode_cursor(after, sort))
+        page_query = {"$and": [query, after_filter]} if query else after_filter
+
+    # One extra document tells whether there is a next page
+    docs = await collection.find(page_query, with_sort_keys(projection, sort)).sort(sort).limit(first + 1).to_list(length=None)
+    has_next_page = len(docs) > first
+    docs = docs[:first]
+
+    edges = []
+    for doc in docs:
+        # Cursor first: node serializers may drop or rename _id
+        cursor = encode_cursor(doc, sort)
+        edges.append({"cursor": cursor, "node": node(doc) if node else doc})
+    return {
+        "edges": edges,
+        "pageInfo": {
+            "hasNextPage": has_next_page,
+            "endCursor": edges[-1]["cursor"] if edges else None
+        },
+        "totalCount": await collection.count_documents(query)
+    }
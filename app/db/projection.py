@@ -0,0 +1,52 @@
+"""
+Mongo projections derived from the GraphQL selection set.
+
+Resolvers pass `projection_from_info(info)` to find/find_one so only the fields
+the query asks for are read, sent over the wire and decoded. Object fields
+(e.g. a report's `metrics`) are projected whole.
+"""
+from graphql import FieldNode, FragmentSpreadNode, InlineFragmentNode
+
+def _fields(selections, info):
+    """Field nodes of a selection list, with named and inline fragments expanded"""
+    for selection in selections:
+        if isinstance(selection, FieldNode):
+            yield selection
+        elif isinstance(selection, FragmentSpreadNode):
+            yield from _fields(info.fragments[selection.name.value].selection_set.selections, info)
+        elif isinstance(selection, InlineFragmentNode):
+            yield from _fields(selection.selection_set.selections, info)
+
+def selected_fields(info, path=()):
+    """Names of the fields selected on the field being resolved.
+
+    `path` walks down nested selections first, e.g. ("edges", "node") for the
+    nodes of a connection.
+    """
+    selections = [
+        selection
+        for field_node in info.field_nodes if field_node.selection_set
+        for selection in field_node.selection_set.selections
+    ]
+    for name in path:
+        selections = [
+            selection
+            for field in _fields(selections, info) if field.name.value == name and field.selection_set
+            for selection in field.selection_set.selections
+        ]
+    return {field.name.value for field in _fields(selections, info)}
+
+def projection_from_info(info, path=(), requires=None):
+    """Projection of the stored fields behind the selected GraphQL fields.
+
+    `requires` maps a GraphQL field to the stored fields it is built from, for
+    fields a resolver computes. `id` is always served from `_id`.
+    """
+    requires = requires or {}
+    projection = {"_id": 1}
+    for field in selected_fields(info, path):
+        if field == "id" or field.startswith("__"):
+            continue
+        for stored_field in requires.get(field, [field]):
+            projection[stored_field] = 1
+    return projection
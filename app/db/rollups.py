@@ -0,0 +1,211 @@
+"""
+Quarterly rollups: per-metric aggregates of the weekly reports of each (fy, quarter).
+
+quarterlyReports and weeklyReport.quarter_actual read these pre-aggregated
+documents instead of rescanning weekly reports. There is one document per
+quarter, whose `metrics` hold for every metric:
+
+- entries_sum / entries: over every entry of the metric in the quarter's
+  reports (quarterlyReports averages these);
+- sum / count: over the first entry of the metric in each report (quarter
+  actuals average these);
+- name, baseline, target and unit from the earliest report with the metric,
+  and first_report / position, so quarters and metrics keep the order in which
+  they were first reported.
+
+Weekly report writes go through `updating_quarters`, which keeps each touched
+quarter consistent without transactions:
+
+1. before the write, the quarter's `pending` count goes up;
+2. after it (even if it failed), one update bumps the quarter's `revision`
+   and takes `pending` back down;
+3. the quarter is aggregated from its reports (about 13) and stored only if
+   `revision` has not moved since; otherwise it is aggregated again for the
+   newer revision.
+
+A quarter is current when nothing is pending and it was built at its latest
+revision. Reads aggregate a quarter with a write in flight from its reports,
+and rebuild one whose last rebuild failed, so they never serve stale
+averages. Rebuild everything (e.g. after a backfill, or a process dying in
+the middle of a write left a quarter pending) with:
+
+    python -m app.db.rollups rebuild
+"""
+import asyncio
+import sys
+from contextlib import asynccontextmanager
+from datetime import datetime
+from pymongo import ReturnDocument, UpdateOne
+from app.db.mongodb import weekly_reports_collection, quarterly_rollups_collection
+
+# Times a rebuild is retried when other writes keep moving the quarter's revision
+ROLLUP_BUILD_ATTEMPTS = 5
+
+# Metric rollups of the weekly reports fed in; reports sorted by _id, so $first
+# and the ordering keys follow the order in which reports were created
+ROLLUP_PIPELINE = [
+    {"$sort": {"_id": 1}},
+    {"$unwind": {"path": "$metrics", "includeArrayIndex": "position"}},
+    # Per report and metric: its first entry, and the total over all its entries
+    {"$group": {
+        "_id": {"report": "$_id", "metric_id": "$metrics.metric_id"},
+        "metric": {"$first": "$metrics"},
+        "position": {"$first": "$position"},
+        "entries_sum": {"$sum": "$metrics.value"},
+        "entries": {"$sum": 1}
+    }},
+    {"$sort": {"_id.report": 1, "position": 1}},
+    {"$group": {
+        "_id": "$_id.metric_id",
+        "sum": {"$sum": "$metric.value"},
+        "count": {"$sum": 1},
+        "entries_sum": {"$sum": "$entries_sum"},
+        "entries": {"$sum": "$entries"},
+        "name": {"$first": "$metric.name"},
+        "baseline": {"$first": "$metric.baseline"},
+        "target": {"$first": "$metric.target"},
+        "unit": {"$first": "$metric.unit"},
+        "first_report": {"$first": "$_id.report"},
+        "position": {"$first": "$position"}
+    }},
+    {"$sort": {"first_report": 1, "position": 1}},
+    {"$project": {
+        "_id": 0,
+        "metric_id": "$_id",
+        "sum": 1,
+        "count": 1,
+        "entries_sum": 1,
+        "entries": 1,
+        "name": 1,
+        "baseline": 1,
+        "target": 1,
+        "unit": 1,
+        "first_report": 1,
+        "position": 1
+    }}
+]
+
+async def compute_quarter_rollup(fy, quarter):
+    """The rollup fields of a quarter, aggregated from its weekly reports"""
+    metrics = await weekly_reports_collection.aggregate(
+        [{"$match": {"fy": fy, "quarter": quarter}}, *ROLLUP_PIPELINE]
+    ).to_list(length=None)
+    return {
+        "first_report": metrics[0]["first_report"] if metrics else None,
+        "metrics": metrics
+    }
+
+async def _bump_revision(fy, quarter, release=False):
+    """Move the quarter to a new revision (ending a write marked pending if `release`)"""
+    increments = {"revision": 1, "pending": -1} if release else {"revision": 1}
+    rollup = await quarterly_rollups_collection.find_one_and_update(
+        {"fy": fy, "quarter": quarter},
+        {"$inc": increments},
+        projection={"revision": 1},
+        upsert=True,
+        return_document=ReturnDocument.AFTER
+    )
+    return rollup["revision"]
+
+async def build_quarter_rollup(fy, quarter, revision, reset_pending=False):
+    """Aggregate the quarter and store it as built at `revision`.
+
+    The result is only stored while the quarter is still at `revision`. When a
+    write moved it on in the meantime, the aggregation may predate that write,
+    so it is redone for the newer revision. Returns the rollup fields.
+    """
+    for _ in range(ROLLUP_BUILD_ATTEMPTS):
+        rollup = await compute_quarter_rollup(fy, quarter)
+        changes = {**rollup, "built_revision": revision, "updated_at": datetime.utcnow()}
+        if reset_pending:
+            changes["pending"] = 0
+        result = await quarterly_rollups_collection.update_one(
+            {"fy": fy, "quarter": quarter, "revision": revision},
+            {"$set": changes}
+        )
+        if result.matched_count:
+            break
+        current = await quarterly_rollups_collection.find_one({"fy": fy, "quarter": quarter}, {"revision": 1})
+        revision = current["revision"]
+    return rollup
+
+@asynccontextmanager
+async def updating_quarters(*quarters):
+    """Wrap a weekly report write that touches `quarters`, (fy, quarter) pairs.
+
+    They are marked pending before the write and rebuilt after it, whether or
+    not it succeeded. Yields the set of touched quarters; add any quarter the
+    write turns out to touch as well (e.g. from its pre-image).
+    """
+    marked = set(quarters)
+    if marked:
+        await quarterly_rollups_collection.bulk_write([
+            UpdateOne({"fy": fy, "quarter": quarter}, {"$inc": {"pending": 1, "revision": 0}}, upsert=True)
+            for fy, quarter in marked
+        ], ordered=False)
+    touched = set(marked)
+    try:
+        yield touched
+    finally:
+        for fy, quarter in touched:
+            revision = await _bump_revision(fy, quarter, release=(fy, quarter) in marked)
+            await build_quarter_rollup(fy, quarter, revision)
+
+def is_current(rollup):
+    return not rollup.get("pending") and rollup.get("built_revision") == rollup["revision"]
+
+async def get_quarter_rollups(query):
+    """Rollups of the quarters matching `query` that have reports, in the order they were first reported"""
+    rollups = []
+    async for rollup in quarterly_rollups_collection.find(query):
+        if not is_current(rollup):
+            fy, quarter = rollup["fy"], rollup["quarter"]
+            if rollup.get("pending"):
+                # A write is in flight; its rebuild will follow
+                rollup.update(await compute_quarter_rollup(fy, quarter))
+            else:
+                # The rebuild after the last write failed
+                rollup.update(await build_quarter_rollup(fy, quarter, rollup["revision"]))
+        if rollup.get("metrics"):
+            rollups.append(rollup)
+    rollups.sort(key=lambda rollup: rollup["first_report"])
+    return rollups
+
+async def rebuild_quarterly_rollups():
+    """Recompute every quarter's rollup from the weekly reports, clearing pending writes.
+
+    Meant for when no report writes are running: a write in flight while its
+    quarter's pending count is cleared is not waited for by reads.
+    """
+    quarters = {
+        (group["_id"]["fy"], group["_id"]["quarter"])
+        for group in await weekly_reports_collection.aggregate([
+            {"$group": {"_id": {"fy": "$fy", "quarter": "$quarter"}}}
+        ]).to_list(length=None)
+    }
+    async for rollup in quarterly_rollups_collection.find({}, {"fy": 1, "quarter": 1}):
+        quarters.add((rollup["fy"], rollup["quarter"]))
+
+    for fy, quarter in quarters:
+        revision = await _bump_revision(fy, quarter)
+        await build_quarter_rollup(fy, quarter, revision, reset_pending=True)
+
+async def drop_legacy_rollups():
+    """Drop rollups kept one document per metric, before the per-quarter unique index is built"""
+    if await quarterly_rollups_collection.find_one({"metric_id": {"$exists": True}}, {"_id": 1}) is not None:
+        print("🔄 Dropping per-metric quarterly rollups...")
+        await quarterly_rollups_collection.drop()
+
+async def ensure_quarterly_rollups():
+    """Build the rollups on startup if they have never been built"""
+    if await quarterly_rollups_collection.find_one({}, {"_id": 1}) is None:
+        if await weekly_reports_collection.find_one({}, {"_id": 1}) is not None:
+            print("🔄 Building quarterly rollups...")
+            await rebuild_quarterly_rollups()
+
+if __name__ == "__main__":
+    if sys.argv[1:] != ["rebuild"]:
+        print("Usage: python -m app.db.rollups rebuild")
+        sys.exit(1)
+    asyncio.run(rebuild_quarterly_rollups())
+    print("✅ Quarterly rollups rebuilt")
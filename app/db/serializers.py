@@ -0,0 +1,99 @@
+"""
+Per-collection document serializers.
+
+Each collection declares the type of its fields that need converting; a
+serializer specialised to exactly those fields is built once at import.
+Dates and datetimes are stored as BSON dates and left as datetimes here: the
+GraphQL Date/DateTime scalars format them at the edge.
+"""
+from datetime import datetime
+from app.db.mongodb import parse_week_date
+
+# Field types, per collection:
+#   "date" / "datetime": BSON date, served through the Date / DateTime scalar
+#   "date_string": DD-MM-YYYY string used as a key (week_date)
+#   "str": stringified on read (e.g. ObjectId references)
+FIELD_TYPES = {
+    "weekly_reports": {
+        "week_date": "date_string",
+        "created_by": "str",
+        "created_at": "datetime",
+        "updated_at": "datetime",
+    },
+    "automation_metadata": {
+        "created_by": "str",
+        "created_at": "datetime",
+        "updated_at": "datetime",
+    },
+    "execution_data": {
+        "last_successful_execution": "date",
+        "created_at": "datetime",
+        "updated_at": "datetime",
+    },
+    "infra_register": {
+        "last_dr_date": "date",
+        "created_at": "datetime",
+        "updated_at": "datetime",
+    },
+    "interface_register": {
+        "latest_password_change_date": "date",
+        "next_password_update_date": "date",
+        "created_at": "datetime",
+        "updated_at": "datetime",
+    },
+    "microbot_register": {
+        "created_at": "datetime",
+        "updated_at": "datetime",
+    },
+}
+
+# Same output as strftime('%d-%m-%Y') / strftime('%d-%m-%Y %H:%M:%S'), but
+# %-formatting the parts is markedly cheaper per call
+def format_date(value):
+    if isinstance(value, datetime):
+        return "%02d-%02d-%04d" % (value.day, value.month, value.year)
+    if isinstance(value, str) and value[2:3] != '-':
+        # Not DD-MM-YYYY (e.g. an ISO string stored before migration); parsed as a fallback
+        parsed = parse_week_date(value)
+        return format_date(parsed) if parsed else value
+    return value
+
+def format_datetime(value):
+    if isinstance(value, datetime):
+        return "%02d-%02d-%04d %02d:%02d:%02d" % (
+            value.day, value.month, value.year, value.hour, value.minute, value.second
+        )
+    return value
+
+# Conversions applied on read; date and datetime fields pass through as stored
+READ_CONVERTERS = {
+    "date_string": format_date,
+    "str": str,
+}
+
+def build_serializer(field_types):
+    """Serializer converting `_id` to `id` and only the fields in `field_types` that need it"""
+    converters = tuple(
+        (field, READ_CONVERTERS[kind])
+        for field, kind in field_types.items() if kind in READ_CONVERTERS
+    )
+
+    def serialize(doc):
+        if doc:
+            doc["id"] = str(doc.pop("_id"))
+            for field, convert in converters:
+                value = doc.get(field)
+                if value:
+                    doc[field] = convert(value)
+        return doc
+
+    return serialize
+
+SERIALIZERS = {name: build_serializer(field_types) for name, field_types in FIELD_TYPES.items()}
+
+def get_serializer(collection_name):
+    return SERIALIZERS[collection_name]
+
+def date_fields(collection_name):
+    """Fields of a collection stored as BSON dates"""
+    return [field for field, kind in FIELD_TYPES[collection_name].items() if kind in ("date", "datetime")]
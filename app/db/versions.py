@@ -0,0 +1,34 @@
+"""
+Data versions: counters that advance whenever weekly report data changes.
+
+One counter per FY and one per (FY, quarter). The weekly report mutations bump
+the counters of every scope they touch, so anything derived from a filtered
+set of reports (e.g. an export file) stays valid while the version it was
+built from is still current.
+"""
+from datetime import datetime
+from pymongo import UpdateOne
+from app.db.mongodb import report_versions_collection
+
+def _scope_ids(fy, quarter=None):
+    return [fy, f"{fy}:{quarter}"] if quarter else [fy]
+
+async def bump_report_versions(*reports):
+    """Advance the versions of the FY and quarter of each given report"""
+    scopes = set()
+    for report in reports:
+        if report:
+            scopes.update(_scope_ids(report["fy"], report["quarter"]))
+
+    if scopes:
+        now = datetime.utcnow()
+        await report_versions_collection.bulk_write([
+            UpdateOne({"_id": scope}, {"$inc": {"version": 1}, "$set": {"updated_at": now}}, upsert=True)
+            for scope in sorted(scopes)
+        ], ordered=False)
+
+async def get_report_version(fy, quarter=None):
+    """Current version of the reports of an FY, or of one of its quarters"""
+    scope = _scope_ids(fy, quarter)[-1]
+    doc = await report_versions_collection.find_one({"_id": scope}, {"version": 1})
+    return doc["version"] if doc else 0
@@ -1,76 +1,197 @@
+"""
+HTTP middleware, as plain ASGI classes.
 
-from fastapi import Request, Response
+Outermost first, main.py installs: NotFoundMiddleware,
+BlockMaliciousPathsMiddleware, ErrorHandlingMiddleware, RateLimitMiddleware,
+LoggingMiddleware. Unlike @app.middleware("http") functions these do not
+run the rest of the app in a separate task or re-stream the response through
+a queue; they wrap `send` and only look at the response start message.
+Non-HTTP scopes (lifespan, websockets) pass straight through.
+"""
+from fastapi import Request
 from fastapi.responses import JSONResponse
+import math
+import os
 import time
 import logging
-from typing import Callable
+from app.utils.rate_limit import get_rate_limiter, RATE_LIMIT_KEYS, DEFAULT_FIELD_COST, graphql_cost, request_user
+from app.utils.access_log import RequestStats, configure_logging, current_request, log_access
 
-# Setup logging
-logging.basicConfig(level=logging.INFO)
+# Setup logging (written off the event loop, see app/utils/access_log.py)
+configure_logging(logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Rate limiting dictionary
-rate_limit_store = {}
-
-# IP based rate limiting
-async def rate_limiting_middleware(request: Request, call_next: Callable):
-    # Get client IP
-    client_ip = request.client.host
-    current_time = time.time()
-    
-    # Initialize entry for new IP
-    if client_ip not in rate_limit_store:
-        rate_limit_store[client_ip] = {
-            "count": 0, 
-            "timestamp": current_time
-        }
-    
-    # Reset counter if time window has passed (e.g., 1 minute)
-    if current_time - rate_limit_store[client_ip]["timestamp"] > 60:
-        rate_limit_store[client_ip] = {
-            "count": 0, 
-            "timestamp": current_time
-        }
-    
-    # Increment request count
-    rate_limit_store[client_ip]["count"] += 1
-    
-    # Check if rate limit exceeded
-    if rate_limit_store[client_ip]["count"] > 100:  # 100 requests per minute
-        return JSONResponse(
-            status_code=429,
-            content={"detail": "Rate limit exceeded. Please try again later."}
-        )
-    
-    # Proceed with request
-    return await call_next(request)
-
-# Request logging middleware
-async def logging_middleware(request: Request, call_next: Callable):
-    start_time = time.time()
-    
-    # Log request details
-    logger.info(f"Request: {request.method} {request.url.path}")
-    
-    # Process request
-    response = await call_next(request)
-    
-    # Log response details and time
-    process_time = time.time() - start_time
-    logger.info(f"Response: {request.method} {request.url.path} - Status: {response.status_code}, Time: {process_time:.4f}s")
-    
-    # Add processing time header to the response
-    response.headers["X-Process-Time"] = str(process_time)
-    
-    return response
-
-# Error handling middleware
-async def error_handling_middleware(request: Request, call_next: Callable):
-    try:
-        return await call_next(request)
-    except Exception as e:
-        logger.error(f"Unhandled exception: {str(e)}")
-        return JSONResponse(
-            status_code=500,
-            content={"detail": "Internal Server Error"}
-        )
+SUSPICIOUS_PATH_PATTERNS = ("jndi", "struts2", "optiontransferselect", "web-inf")
+
+# Largest GraphQL request body accepted; it is held in memory to be costed
+GRAPHQL_MAX_BODY_BYTES = int(os.environ.get("GRAPHQL_MAX_BODY_KB", "1024")) * 1024
+
+# Per-client budgets (see app/utils/rate_limit.py)
+rate_limiter = get_rate_limiter()
+
+async def read_body(receive, max_bytes=GRAPHQL_MAX_BODY_BYTES):
+    """The whole request body, and a receive callable that replays it downstream.
+
+    The body is None once it grows past `max_bytes`; nothing more is read then.
+    """
+    messages = []
+    chunks = []
+    size = 0
+    while True:
+        message = await receive()
+        messages.append(message)
+        if message["type"] != "http.request":
+            break
+        chunk = message.get("body", b"")
+        size += len(chunk)
+        if size > max_bytes:
+            return None, receive
+        chunks.append(chunk)
+        if not message.get("more_body", False):
+            break
+
+    async def replay():
+        return messages.pop(0) if messages else await receive()
+
+    return b"".join(chunks), replay
+
+def rate_limit_key(request: Request, operation=None):
+    """Bucket key of a request, from the parts in RATE_LIMIT_KEYS"""
+    parts = []
+    for part in RATE_LIMIT_KEYS:
+        if part == "ip":
+            parts.append(request.client.host if request.client else "unknown")
+        elif part == "user":
+            parts.append(request_user(request) or "anonymous")
+        elif part == "operation":
+            parts.append(operation or f"{request.method} {request.url.path}")
+    return "|".join(parts)
+
+class NotFoundMiddleware:
+    """Replace the body of every 404 response with {"detail": "Not Found"}"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        replaced = False
+
+        async def send_wrapper(message):
+            nonlocal replaced
+            if message["type"] == "http.response.start" and message["status"] == 404:
+                replaced = True
+                await JSONResponse(status_code=404, content={"detail": "Not Found"})(scope, receive, send)
+            elif not replaced:
+                await send(message)
+
+        await self.app(scope, receive, send_wrapper)
+
+class BlockMaliciousPathsMiddleware:
+    """Refuse paths probing for known exploits (log4j, struts, WEB-INF)"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http":
+            url_path = scope["path"].lower()
+            if any(pattern in url_path for pattern in SUSPICIOUS_PATH_PATTERNS):
+                return await JSONResponse(status_code=403, content={"detail": "Forbidden"})(scope, receive, send)
+        await self.app(scope, receive, send)
+
+class ErrorHandlingMiddleware:
+    """Turn unhandled exceptions into a 500 JSON response (if nothing was sent yet)"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        response_started = False
+
+        async def send_wrapper(message):
+            nonlocal response_started
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        except Exception as e:
+            logger.error("Unhandled exception: %s", e)
+            if response_started:
+                raise
+            await JSONResponse(
+                status_code=500,
+                content={"detail": "Internal Server Error"}
+            )(scope, receive, send)
+
+class RateLimitMiddleware:
+    """Spend the request's cost from its client's budget, or answer 429"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        operation, cost = None, DEFAULT_FIELD_COST
+        # GraphQL requests cost per operation, so their body is read up front
+        if scope["method"] == "POST" and scope["path"] == "/graphql":
+            body, receive = await read_body(receive)
+            if body is None:
+                return await JSONResponse(
+                    status_code=413,
+                    content={"detail": "Request body too large"}
+                )(scope, receive, send)
+            operation, cost = graphql_cost(body)
+            # Request state, for the access log
+            scope.setdefault("state", {})["graphql_operation"] = operation
+
+        retry_after = await rate_limiter.acquire(rate_limit_key(Request(scope), operation), cost)
+        if retry_after:
+            return await JSONResponse(
+                status_code=429,
+                content={"detail": "Rate limit exceeded. Please try again later."},
+                headers={"Retry-After": str(math.ceil(retry_after))}
+            )(scope, receive, send)
+
+        await self.app(scope, receive, send)
+
+class LoggingMiddleware:
+    """Write a JSON access log record per request, and add an X-Process-Time header"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        started = time.perf_counter()
+        stats = RequestStats()
+        stats.operation = scope.get("state", {}).get("graphql_operation")
+        token = current_request.set(stats)
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                process_time = time.perf_counter() - started
+                message["headers"] = [*message.get("headers", []), (b"x-process-time", str(process_time).encode())]
+            elif message["type"] == "http.response.body":
+                stats.response_bytes += len(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            current_request.reset(token)
+            log_access(scope["method"], scope["path"], status, started, stats)
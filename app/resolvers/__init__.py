@@ -2,31 +2,32 @@
 from ariadne import make_executable_schema, ObjectType
 from app.resolvers.auth import (
     login_resolver, register_resolver, me_resolver, 
-    roles_resolver, update_user_roles_resolver, all_users_resolver
+    roles_resolver, update_user_roles_resolver, all_users_resolver, all_users_connection_resolver
 )
 from app.resolvers.metrics import (
-    metrics_resolver, metric_resolver, create_metric_resolver,
+    metrics_resolver, metrics_connection_resolver, metric_resolver, create_metric_resolver,
     update_metric_resolver, delete_metric_resolver
 )
 from app.resolvers.reports import (
-    weekly_reports_resolver, weekly_report_resolver, quarterly_reports_resolver,
+    weekly_reports_resolver, weekly_reports_connection_resolver, weekly_report_resolver, quarterly_reports_resolver,
     create_weekly_report_resolver, update_weekly_report_resolver, delete_weekly_report_resolver,
-    get_draft_resolver, save_draft_resolver, export_report_resolver,
+    get_draft_resolver, save_draft_resolver, export_report_resolver, export_job_resolver,
     service_metric_dashboard_resolver
 )
 from app.resolvers.fy_config import (
-    fy_configs_resolver, fy_config_resolver, create_fy_config_resolver,
+    fy_configs_resolver, fy_configs_connection_resolver, fy_config_resolver, create_fy_config_resolver,
     update_fy_config_resolver, delete_fy_config_resolver
 )
 from app.resolvers.autosave import autosave_resolver
+from app.resolvers.scalars import date_scalar, datetime_scalar
 from app.resolvers.indusit import (
     # Automation Metadata
-    automation_metadata_resolver, all_automation_metadata_resolver,
+    automation_metadata_resolver, all_automation_metadata_resolver, all_automation_metadata_connection_resolver,
     automation_metadata_by_apaid_resolver, create_automation_metadata_resolver,
     update_automation_metadata_resolver, delete_automation_metadata_resolver,
     
     # Execution Data
-    execution_data_resolver, all_execution_data_resolver,
+    execution_data_resolver, all_execution_data_resolver, all_execution_data_connection_resolver,
     execution_data_by_apaid_resolver, create_execution_data_resolver,
     update_execution_data_resolver, delete_execution_data_resolver,
     
@@ -37,7 +38,7 @@ from app.resolvers.indusit import (
     
     # Interface Register
     interface_register_resolver, all_interface_register_resolver,
-    interface_register_by_apaid_resolver, create_interface_register_resolver,
+    interface_register_by_apaid_resolver, passwords_expiring_resolver, create_interface_register_resolver,
     update_interface_register_resolver, delete_interface_register_resolver,
     
     # Microbot Register
@@ -61,12 +62,14 @@ mutation = ObjectType("Mutation")
 query.set_field("me", me_resolver)
 query.set_field("roles", roles_resolver)
 query.set_field("allUsers", all_users_resolver)
+query.set_field("allUsersConnection", all_users_connection_resolver)
 mutation.set_field("login", login_resolver)
 mutation.set_field("register", register_resolver)
 mutation.set_field("updateUserRoles", update_user_roles_resolver)
 
 # Metrics resolvers
 query.set_field("metrics", metrics_resolver)
+query.set_field("metricsConnection", metrics_connection_resolver)
 query.set_field("metric", metric_resolver)
 mutation.set_field("createMetric", create_metric_resolver)
 mutation.set_field("updateMetric", update_metric_resolver)
@@ -74,9 +77,11 @@ mutation.set_field("deleteMetric", delete_metric_resolver)
 
 # Report resolvers
 query.set_field("weeklyReports", weekly_reports_resolver)
+query.set_field("weeklyReportsConnection", weekly_reports_connection_resolver)
 query.set_field("weeklyReport", weekly_report_resolver)
 query.set_field("quarterlyReports", quarterly_reports_resolver)
 query.set_field("getDraft", get_draft_resolver)
+query.set_field("exportJob", export_job_resolver)
 mutation.set_field("createWeeklyReport", create_weekly_report_resolver)
 mutation.set_field("updateWeeklyReport", update_weekly_report_resolver)
 mutation.set_field("deleteWeeklyReport", delete_weekly_report_resolver)
@@ -88,6 +93,7 @@ query.set_field("serviceMetricDashboard", service_metric_dashboard_resolver)
 
 # FY Config resolvers
 query.set_field("fyConfigs", fy_configs_resolver)
+query.set_field("fyConfigsConnection", fy_configs_connection_resolver)
 query.set_field("fyConfig", fy_config_resolver)
 mutation.set_field("createFYConfig", create_fy_config_resolver)
 mutation.set_field("updateFYConfig", update_fy_config_resolver)
@@ -97,6 +103,7 @@ mutation.set_field("deleteFYConfig", delete_fy_config_resolver)
 # Automation Metadata
 query.set_field("automationMetadata", automation_metadata_resolver)
 query.set_field("allAutomationMetadata", all_automation_metadata_resolver)
+query.set_field("allAutomationMetadataConnection", all_automation_metadata_connection_resolver)
 query.set_field("automationMetadataByApaid", automation_metadata_by_apaid_resolver)
 mutation.set_field("createAutomationMetadata", create_automation_metadata_resolver)
 mutation.set_field("updateAutomationMetadata", update_automation_metadata_resolver)
@@ -105,6 +112,7 @@ mutation.set_field("deleteAutomationMetadata", delete_automation_metadata_resolv
 # Execution Data
 query.set_field("executionData", execution_data_resolver)
 query.set_field("allExecutionData", all_execution_data_resolver)
+query.set_field("allExecutionDataConnection", all_execution_data_connection_resolver)
 query.set_field("executionDataByApaid", execution_data_by_apaid_resolver)
 mutation.set_field("createExecutionData", create_execution_data_resolver)
 mutation.set_field("updateExecutionData", update_execution_data_resolver)
@@ -121,6 +129,7 @@ mutation.set_field("deleteInfraRegister", delete_infra_register_resolver)
 query.set_field("interfaceRegister", interface_register_resolver)
 query.set_field("allInterfaceRegister", all_interface_register_resolver)
 query.set_field("interfaceRegisterByApaid", interface_register_by_apaid_resolver)
+query.set_field("passwordsExpiring", passwords_expiring_resolver)
 mutation.set_field("createInterfaceRegister", create_interface_register_resolver)
 mutation.set_field("updateInterfaceRegister", update_interface_register_resolver)
 mutation.set_field("deleteInterfaceRegister", delete_interface_register_resolver)
@@ -138,4 +147,4 @@ query.set_field("userDashboardStats", user_dashboard_stats_resolver)
 query.set_field("adminDashboardStats", admin_dashboard_stats_resolver)
 
 # Create executable schema
-schema = make_executable_schema(type_defs, query, mutation)
+schema = make_executable_schema(type_defs, query, mutation, date_scalar, datetime_scalar)
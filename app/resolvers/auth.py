@@ -2,10 +2,13 @@ from ariadne import convert_kwargs_to_snake_case
 from fastapi import HTTPException, status
 from datetime import timedelta
 from app.auth import (
-    verify_password, get_password_hash, create_access_token,
-    get_current_user, ACCESS_TOKEN_EXPIRE_MINUTES, is_admin
+    verify_password, get_password_hash, create_user_token,
+    get_context_user, get_bearer_token, invalidate_auth_version,
+    ACCESS_TOKEN_EXPIRE_MINUTES
 )
 from app.db.mongodb import users_collection, roles_collection
+from app.db.pagination import paginate
+from pymongo.errors import DuplicateKeyError
 import re
 from email_validator import validate_email, EmailNotValidError
 
@@ -14,7 +17,7 @@ async def login_resolver(_, info, input):
     email = input.get("email")
     password = input.get("password")
     
-    user = users_collection.find_one({"email": email})
+    user = await users_collection.find_one({"email": email})
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -28,10 +31,7 @@ async def login_resolver(_, info, input):
         )
     
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-    access_token = create_access_token(
-        data={"sub": email},
-        expires_delta=access_token_expires
-    )
+    access_token = create_user_token(user, expires_delta=access_token_expires)
     
     # Ensure roles is properly included in the response
     roles = user.get("roles", [user.get("role")])
@@ -62,22 +62,16 @@ async def register_resolver(_, info, input):
     roles = ["user"]
     
     # Only pass the role from input if it's coming from a superadmin 
-    context = info.context
-    request = context.get("request")
-    
-    if request and request.headers.get("Authorization"):
-        auth_header = request.headers.get("Authorization")
-        if auth_header and auth_header.startswith("Bearer "):
-            token = auth_header.split(" ")[1]
-            try:
-                current_user = await get_current_user(token)
-                # Allow superadmin to set roles during registration
-                if "superadmin" in current_user.get("roles", []):
-                    role_name = input.get("role", "user")
-                    roles = input.get("roles", ["user"])
-            except Exception:
-                # Fall back to default user role
-                pass
+    if get_bearer_token(info.context.get("request")):
+        try:
+            current_user = await get_context_user(info)
+            # Allow superadmin to set roles during registration
+            if "superadmin" in current_user.get("roles", []):
+                role_name = input.get("role", "user")
+                roles = input.get("roles", ["user"])
+        except Exception:
+            # Fall back to default user role
+            pass
 
     # Validate email
     try:
@@ -89,7 +83,7 @@ async def register_resolver(_, info, input):
         )
 
     # Check if user already exists
-    if users_collection.find_one({"email": email}):
+    if await users_collection.find_one({"email": email}):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Email already registered"
@@ -103,7 +97,7 @@ async def register_resolver(_, info, input):
         )
 
     # Validate role
-    role = roles_collection.find_one({"name": role_name})
+    role = await roles_collection.find_one({"name": role_name})
     if not role:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -118,18 +112,23 @@ async def register_resolver(_, info, input):
         "name": name,
         "role": role_name,
         "roles": roles,
-        "is_active": True
+        "is_active": True,
+        "auth_version": 0
     }
 
-    result = users_collection.insert_one(user_data)
+    # The unique email index also catches a concurrent registration of the same email
+    try:
+        result = await users_collection.insert_one(user_data)
+    except DuplicateKeyError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Email already registered"
+        )
     user_id = str(result.inserted_id)
 
     # Create token
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-    access_token = create_access_token(
-        data={"sub": email},
-        expires_delta=access_token_expires
-    )
+    access_token = create_user_token(user_data, expires_delta=access_token_expires)
 
     return {
         "token": access_token,
@@ -145,32 +144,30 @@ async def register_resolver(_, info, input):
 
 @convert_kwargs_to_snake_case
 async def me_resolver(_, info):
-    context = info.context
-    request = context.get("request")
-    
-    if request and request.headers.get("Authorization"):
-        auth_header = request.headers.get("Authorization")
-        if auth_header and auth_header.startswith("Bearer "):
-            token = auth_header.split(" ")[1]
-            try:
-                current_user = await get_current_user(token)
-                # Ensure the User ID is always a string, not an ObjectId
-                if '_id' in current_user:
-                    current_user['id'] = str(current_user['_id'])
-                
-                # Ensure roles array is present
-                if 'roles' not in current_user or not current_user['roles']:
-                    current_user['roles'] = [current_user.get('role', 'user')]
-                
-                print("me_resolver returning:", current_user)
-                return current_user
-            except Exception as e:
-                print(f"Error in me_resolver: {str(e)}")
-                # Don't return None for non-nullable fields
-                raise HTTPException(
-                    status_code=status.HTTP_401_UNAUTHORIZED,
-                    detail="Authentication failed"
-                )
+    if get_bearer_token(info.context.get("request")):
+        try:
+            # The context user may only hold token claims; load the full profile
+            principal = await get_context_user(info)
+            current_user = await users_collection.find_one(
+                {"email": principal["email"]}, {"password": 0}
+            )
+            # Ensure the User ID is always a string, not an ObjectId
+            if '_id' in current_user:
+                current_user['id'] = str(current_user['_id'])
+            
+            # Ensure roles array is present
+            if 'roles' not in current_user or not current_user['roles']:
+                current_user['roles'] = [current_user.get('role', 'user')]
+            
+            print("me_resolver returning:", current_user)
+            return current_user
+        except Exception as e:
+            print(f"Error in me_resolver: {str(e)}")
+            # Don't return None for non-nullable fields
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Authentication failed"
+            )
 
     # Don't return None for non-nullable fields
     raise HTTPException(
@@ -180,86 +177,71 @@ async def me_resolver(_, info):
 
 @convert_kwargs_to_snake_case
 async def roles_resolver(_, info):
-    context = info.context
-    request = context.get("request")
-    
-    if request and request.headers.get("Authorization"):
-        auth_header = request.headers.get("Authorization")
-        if auth_header and auth_header.startswith("Bearer "):
-            token = auth_header.split(" ")[1]
-            try:
-                current_user = await get_current_user(token)
-                return current_user.get("roles", [])
-            except Exception:
-                pass
+    if get_bearer_token(info.context.get("request")):
+        try:
+            current_user = await get_context_user(info)
+            return current_user.get("roles", [])
+        except Exception:
+            pass
 
     return []
 
+def serialize_user(user):
+    # Convert ObjectId to string
+    user["id"] = str(user["_id"])
+    del user["_id"]
+    
+    # Don't return password
+    if "password" in user:
+        del user["password"]
+    
+    # Ensure roles is properly included
+    if "roles" not in user or not user["roles"]:
+        user["roles"] = [user.get("role", "user")]
+    return user
+
 @convert_kwargs_to_snake_case
 async def all_users_resolver(_, info):
-    context = info.context
-    request = context.get("request")
-    
-    if request and request.headers.get("Authorization"):
-        auth_header = request.headers.get("Authorization")
-        if auth_header and auth_header.startswith("Bearer "):
-            token = auth_header.split(" ")[1]
-            try:
-                current_user = await get_current_user(token)
-                # Check if current user is superadmin
-                if "superadmin" not in current_user.get("roles", []):
-                    raise HTTPException(
-                        status_code=status.HTTP_403_FORBIDDEN,
-                        detail="Superadmin privileges required"
-                    )
-                    
-                # Get all users
-                all_users = list(users_collection.find({}))
-                
-                # Convert ObjectId to string for each user
-                for user in all_users:
-                    user["id"] = str(user["_id"])
-                    del user["_id"]
-                    
-                    # Don't return password
-                    if "password" in user:
-                        del user["password"]
-                    
-                    # Ensure roles is properly included
-                    if "roles" not in user or not user["roles"]:
-                        user["roles"] = [user.get("role", "user")]
-                
-                return all_users
-                
-            except Exception as e:
-                print(f"Error in all_users_resolver: {str(e)}")
+    if get_bearer_token(info.context.get("request")):
+        try:
+            current_user = await get_context_user(info)
+            # Check if current user is superadmin
+            if "superadmin" not in current_user.get("roles", []):
                 raise HTTPException(
-                    status_code=status.HTTP_401_UNAUTHORIZED,
-                    detail="Authentication failed"
+                    status_code=status.HTTP_403_FORBIDDEN,
+                    detail="Superadmin privileges required"
                 )
+                
+            # Get all users
+            all_users = await users_collection.find({}).to_list(length=None)
+            return [serialize_user(user) for user in all_users]
+            
+        except Exception as e:
+            print(f"Error in all_users_resolver: {str(e)}")
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Authentication failed"
+            )
 
     raise HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Authentication required"
     )
 
-@convert_kwargs_to_snake_case
-async def update_user_roles_resolver(_, info, user_id, roles):
-    # Get current user from context
-    context = info.context
-    request = context["request"]
-
-    # Get the Authorization header
-    auth_header = request.headers.get("Authorization")
-    if not auth_header or not auth_header.startswith("Bearer "):
+async def all_users_connection_resolver(_, info, first=None, after=None):
+    current_user = await get_context_user(info)
+    if "superadmin" not in current_user.get("roles", []):
         raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Not authenticated",
-            headers={"WWW-Authenticate": "Bearer"}
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Superadmin privileges required"
         )
+    
+    return await paginate(users_collection, {}, first, after, projection={"password": 0}, node=serialize_user)
 
-    token = auth_header.split(" ")[1]
-    current_user = await get_current_user(token)
+@convert_kwargs_to_snake_case
+async def update_user_roles_resolver(_, info, user_id, roles):
+    # Get current user from context
+    current_user = await get_context_user(info)
 
     # Check if current user is superadmin
     if "superadmin" not in current_user.get("roles", []):
@@ -270,7 +252,7 @@ async def update_user_roles_resolver(_, info, user_id, roles):
 
     # Validate all roles exist
     for role_name in roles:
-        role = roles_collection.find_one({"name": role_name})
+        role = await roles_collection.find_one({"name": role_name})
         if not role:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
@@ -280,7 +262,7 @@ async def update_user_roles_resolver(_, info, user_id, roles):
     # Find and update user
     from bson import ObjectId
     user_obj_id = ObjectId(user_id)
-    user = users_collection.find_one({"_id": user_obj_id})
+    user = await users_collection.find_one({"_id": user_obj_id})
 
     if not user:
         raise HTTPException(
@@ -288,15 +270,17 @@ async def update_user_roles_resolver(_, info, user_id, roles):
             detail="User not found"
         )
     
-    # Update user roles
+    # Update user roles and bump auth_version so tokens carrying the old roles stop
+    # authorizing from their claims
     primary_role = roles[0] if roles else "user"
-    users_collection.update_one(
+    await users_collection.update_one(
         {"_id": user_obj_id},
-        {"$set": {"roles": roles, "role": primary_role}}
+        {"$set": {"roles": roles, "role": primary_role}, "$inc": {"auth_version": 1}}
     )
+    invalidate_auth_version(user["email"])
     
     # Return updated user
-    updated_user = users_collection.find_one({"_id": user_obj_id})
+    updated_user = await users_collection.find_one({"_id": user_obj_id})
     updated_user["id"] = str(updated_user["_id"])
     del updated_user["_id"]
     del updated_user["password"]
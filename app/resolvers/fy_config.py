@@ -3,48 +3,32 @@ from ariadne import convert_kwargs_to_snake_case
 from fastapi import HTTPException, status
 from bson import ObjectId
 from datetime import datetime
+from pymongo.errors import DuplicateKeyError
 from app.db.mongodb import fy_configs_collection
-from app.auth import get_current_user, admin_required
+from app.db.pagination import paginate
+from app.auth import get_context_user, admin_required
+
+def serialize_fy_config(config):
+    config["id"] = str(config["_id"])
+    del config["_id"]
+    return config
 
 async def fy_configs_resolver(_, info):
-    context = info.context
-    request = context["request"]
-    
-    # Get the Authorization header
-    auth_header = request.headers.get("Authorization")
-    if not auth_header or not auth_header.startswith("Bearer "):
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Not authenticated"
-        )
-    
-    token = auth_header.split(" ")[1]
-    user = await get_current_user(token)
+    await get_context_user(info)
     
-    configs = list(fy_configs_collection.find())
-    for config in configs:
-        config["id"] = str(config["_id"])
-        del config["_id"]
+    configs = await fy_configs_collection.find().to_list(length=None)
+    return [serialize_fy_config(config) for config in configs]
+
+async def fy_configs_connection_resolver(_, info, first=None, after=None):
+    await get_context_user(info)
     
-    return configs
+    return await paginate(fy_configs_collection, {}, first, after, node=serialize_fy_config)
 
 @convert_kwargs_to_snake_case
 async def fy_config_resolver(_, info, fy):
-    context = info.context
-    request = context["request"]
+    await get_context_user(info)
     
-    # Get the Authorization header
-    auth_header = request.headers.get("Authorization")
-    if not auth_header or not auth_header.startswith("Bearer "):
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Not authenticated"
-        )
-    
-    token = auth_header.split(" ")[1]
-    user = await get_current_user(token)
-    
-    config = fy_configs_collection.find_one({"fy": fy})
+    config = await fy_configs_collection.find_one({"fy": fy})
     if config:
         config["id"] = str(config["_id"])
         del config["_id"]
@@ -53,30 +37,8 @@ async def fy_config_resolver(_, info, fy):
 
 @convert_kwargs_to_snake_case
 async def create_fy_config_resolver(_, info, input):
-    context = info.context
-    request = context["request"]
-    
-    # Get the Authorization header
-    auth_header = request.headers.get("Authorization")
-    if not auth_header or not auth_header.startswith("Bearer "):
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Not authenticated"
-        )
-    
-    token = auth_header.split(" ")[1]
-    user = await get_current_user(token)
-    
     # Only admin can create FY configs
-    admin_required(user)
-    
-    # Check if FY config already exists
-    existing_config = fy_configs_collection.find_one({"fy": input["fy"]})
-    if existing_config:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"FY config for {input['fy']} already exists"
-        )
+    await admin_required(info)
     
     # Create FY config
     config_data = {
@@ -86,10 +48,17 @@ async def create_fy_config_resolver(_, info, input):
         "updated_at": None
     }
     
-    result = fy_configs_collection.insert_one(config_data)
+    # One config per FY is enforced by the unique fy index
+    try:
+        result = await fy_configs_collection.insert_one(config_data)
+    except DuplicateKeyError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"FY config for {input['fy']} already exists"
+        )
     
     # Return created config
-    config = fy_configs_collection.find_one({"_id": result.inserted_id})
+    config = await fy_configs_collection.find_one({"_id": result.inserted_id})
     config["id"] = str(config["_id"])
     del config["_id"]
     
@@ -97,44 +66,17 @@ async def create_fy_config_resolver(_, info, input):
 
 @convert_kwargs_to_snake_case
 async def update_fy_config_resolver(_, info, id, input):
-    context = info.context
-    request = context["request"]
-    
-    # Get the Authorization header
-    auth_header = request.headers.get("Authorization")
-    if not auth_header or not auth_header.startswith("Bearer "):
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Not authenticated"
-        )
-    
-    token = auth_header.split(" ")[1]
-    user = await get_current_user(token)
-    
     # Only admin can update FY configs
-    admin_required(user)
+    await admin_required(info)
     
     # Check if config exists
-    config = fy_configs_collection.find_one({"_id": ObjectId(id)})
+    config = await fy_configs_collection.find_one({"_id": ObjectId(id)})
     if not config:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"FY config with ID {id} not found"
         )
     
-    # Check if changing to a FY that already has a config
-    if input["fy"] != config["fy"]:
-        existing_config = fy_configs_collection.find_one({
-            "fy": input["fy"],
-            "_id": {"$ne": ObjectId(id)}
-        })
-        
-        if existing_config:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail=f"FY config for {input['fy']} already exists"
-            )
-    
     # Update config
     updated_data = {
         "fy": input["fy"],
@@ -142,13 +84,20 @@ async def update_fy_config_resolver(_, info, id, input):
         "updated_at": datetime.utcnow()
     }
     
-    fy_configs_collection.update_one(
-        {"_id": ObjectId(id)},
-        {"$set": updated_data}
-    )
+    # Changing to a FY that already has a config is rejected by the unique fy index
+    try:
+        await fy_configs_collection.update_one(
+            {"_id": ObjectId(id)},
+            {"$set": updated_data}
+        )
+    except DuplicateKeyError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"FY config for {input['fy']} already exists"
+        )
     
     # Return updated config
-    updated_config = fy_configs_collection.find_one({"_id": ObjectId(id)})
+    updated_config = await fy_configs_collection.find_one({"_id": ObjectId(id)})
     updated_config["id"] = str(updated_config["_id"])
     del updated_config["_id"]
     
@@ -156,25 +105,11 @@ async def update_fy_config_resolver(_, info, id, input):
 
 @convert_kwargs_to_snake_case
 async def delete_fy_config_resolver(_, info, id):
-    context = info.context
-    request = context["request"]
-    
-    # Get the Authorization header
-    auth_header = request.headers.get("Authorization")
-    if not auth_header or not auth_header.startswith("Bearer "):
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Not authenticated"
-        )
-    
-    token = auth_header.split(" ")[1]
-    user = await get_current_user(token)
-    
     # Only admin can delete FY configs
-    admin_required(user)
+    await admin_required(info)
     
     # Check if config exists
-    config = fy_configs_collection.find_one({"_id": ObjectId(id)})
+    config = await fy_configs_collection.find_one({"_id": ObjectId(id)})
     if not config:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -182,7 +117,7 @@ async def delete_fy_config_resolver(_, info, id):
         )
     
     # Delete config
-    result = fy_configs_collection.delete_one({"_id": ObjectId(id)})
+    result = await fy_configs_collection.delete_one({"_id": ObjectId(id)})
     
     if result.deleted_count == 1:
         return True
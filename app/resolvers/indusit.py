@@ -4,135 +4,68 @@ from fastapi import HTTPException, status
 from app.db.mongodb import (
     automation_metadata_collection, execution_data_collection,
     infra_register_collection, interface_register_collection,
-    microbot_register_collection, serialize_doc, serialize_docs
+    microbot_register_collection
 )
-from app.auth import get_current_user, role_required
-from datetime import datetime
+from app.db.serializers import get_serializer
+from app.db.pagination import paginate
+from app.db.projection import projection_from_info
+from app.auth import role_required
+from app.utils.dashboard_cache import cached_dashboard, invalidate_dashboards, INDUSIT_DASHBOARDS
+from datetime import datetime, timedelta
 from bson import ObjectId
+from pymongo.errors import DuplicateKeyError
+
+serialize_automation = get_serializer("automation_metadata")
+serialize_execution = get_serializer("execution_data")
+serialize_interface = get_serializer("interface_register")
 
 # Automation Metadata Resolvers
 async def automation_metadata_resolver(_, info, id=None):
-    context = info.context
-    request = context["request"]
-    
-    # Authenticate user
-    auth_header = request.headers.get("Authorization")
-    if not auth_header or not auth_header.startswith("Bearer "):
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Not authenticated",
-            headers={"WWW-Authenticate": "Bearer"}
-        )
-    
-    token = auth_header.split(" ")[1]
-    user = await get_current_user(token)
-    
     # Check if user has IDuser or IDadmin role
-    if not any(role in user.get("roles", []) + [user["role"]] for role in ["IDuser", "IDadmin"]):
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="IndusIT Dashboard access required"
-        )
+    await role_required(info, "IDuser", "IDadmin", detail="IndusIT Dashboard access required")
     
     if id:
-        automation = automation_metadata_collection.find_one({"_id": ObjectId(id)})
+        automation = await automation_metadata_collection.find_one({"_id": ObjectId(id)}, projection_from_info(info))
         if not automation:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail=f"Automation with ID {id} not found"
             )
-        return serialize_doc(automation)
+        return serialize_automation(automation)
     
     return None
 
 async def all_automation_metadata_resolver(_, info):
-    context = info.context
-    request = context["request"]
-    
-    # Authenticate user
-    auth_header = request.headers.get("Authorization")
-    if not auth_header or not auth_header.startswith("Bearer "):
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Not authenticated",
-            headers={"WWW-Authenticate": "Bearer"}
-        )
-    
-    token = auth_header.split(" ")[1]
-    user = await get_current_user(token)
-    
     # Check if user has IDuser or IDadmin role
-    if not any(role in user.get("roles", []) + [user["role"]] for role in ["IDuser", "IDadmin"]):
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="IndusIT Dashboard access required"
-        )
+    await role_required(info, "IDuser", "IDadmin", detail="IndusIT Dashboard access required")
     
-    automations = list(automation_metadata_collection.find())
-    return serialize_docs(automations)
+    automations = await automation_metadata_collection.find({}, projection_from_info(info)).to_list(length=None)
+    return [serialize_automation(automation) for automation in automations]
 
-async def automation_metadata_by_apaid_resolver(_, info, apaid):
-    context = info.context
-    request = context["request"]
-    
-    # Authenticate user
-    auth_header = request.headers.get("Authorization")
-    if not auth_header or not auth_header.startswith("Bearer "):
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Not authenticated",
-            headers={"WWW-Authenticate": "Bearer"}
-        )
-    
-    token = auth_header.split(" ")[1]
-    user = await get_current_user(token)
+async def all_automation_metadata_connection_resolver(_, info, first=None, after=None):
+    await role_required(info, "IDuser", "IDadmin", detail="IndusIT Dashboard access required")
     
+    return await paginate(
+        automation_metadata_collection, {}, first, after,
+        projection=projection_from_info(info, ("edges", "node")), node=serialize_automation
+    )
+
+async def automation_metadata_by_apaid_resolver(_, info, apaid):
     # Check if user has IDuser or IDadmin role
-    if not any(role in user.get("roles", []) + [user["role"]] for role in ["IDuser", "IDadmin"]):
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="IndusIT Dashboard access required"
-        )
+    await role_required(info, "IDuser", "IDadmin", detail="IndusIT Dashboard access required")
     
-    automation = automation_metadata_collection.find_one({"apaid": apaid})
+    automation = await automation_metadata_collection.find_one({"apaid": apaid}, projection_from_info(info))
     if not automation:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Automation with APAID {apaid} not found"
         )
-    return serialize_doc(automation)
+    return serialize_automation(automation)
 
 @convert_kwargs_to_snake_case
 async def create_automation_metadata_resolver(_, info, input):
-    context = info.context
-    request = context["request"]
-    
-    # Authenticate user
-    auth_header = request.headers.get("Authorization")
-    if not auth_header or not auth_header.startswith("Bearer "):
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Not authenticated",
-            headers={"WWW-Authenticate": "Bearer"}
-        )
-    
-    token = auth_header.split(" ")[1]
-    user = await get_current_user(token)
-    
     # Check if user has IDadmin role
-    if not any(role in user.get("roles", []) + [user["role"]] for role in ["IDadmin"]):
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="IDadmin role required"
-        )
-    
-    # Check if APAID already exists
-    existing = automation_metadata_collection.find_one({"apaid": input["apaid"]})
-    if existing:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"Automation with APAID {input['apaid']} already exists"
-        )
+    user = await role_required(info, "IDadmin", detail="IDadmin role required")
     
     # Add creation metadata
     now = datetime.utcnow()
@@ -140,39 +73,27 @@ async def create_automation_metadata_resolver(_, info, input):
     input["created_at"] = now
     input["updated_at"] = now
     
-    # Insert document
-    result = automation_metadata_collection.insert_one(input)
+    # Insert document; APAIDs are unique through the apaid index
+    try:
+        result = await automation_metadata_collection.insert_one(input)
+    except DuplicateKeyError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Automation with APAID {input['apaid']} already exists"
+        )
+    await invalidate_dashboards(*INDUSIT_DASHBOARDS)
     
     # Fetch the created document
-    created = automation_metadata_collection.find_one({"_id": result.inserted_id})
-    return serialize_doc(created)
+    created = await automation_metadata_collection.find_one({"_id": result.inserted_id})
+    return serialize_automation(created)
 
 @convert_kwargs_to_snake_case
 async def update_automation_metadata_resolver(_, info, id, input):
-    context = info.context
-    request = context["request"]
-    
-    # Authenticate user
-    auth_header = request.headers.get("Authorization")
-    if not auth_header or not auth_header.startswith("Bearer "):
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Not authenticated",
-            headers={"WWW-Authenticate": "Bearer"}
-        )
-    
-    token = auth_header.split(" ")[1]
-    user = await get_current_user(token)
-    
     # Check if user has IDadmin role
-    if not any(role in user.get("roles", []) + [user["role"]] for role in ["IDadmin"]):
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="IDadmin role required"
-        )
+    await role_required(info, "IDadmin", detail="IDadmin role required")
     
     # Check if record exists
-    existing = automation_metadata_collection.find_one({"_id": ObjectId(id)})
+    existing = await automation_metadata_collection.find_one({"_id": ObjectId(id)})
     if not existing:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -183,41 +104,29 @@ async def update_automation_metadata_resolver(_, info, id, input):
     input["updated_at"] = datetime.utcnow()
     
     # Update document
-    automation_metadata_collection.update_one(
-        {"_id": ObjectId(id)},
-        {"$set": input}
-    )
+    try:
+        await automation_metadata_collection.update_one(
+            {"_id": ObjectId(id)},
+            {"$set": input}
+        )
+    except DuplicateKeyError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Automation with APAID {input['apaid']} already exists"
+        )
+    await invalidate_dashboards(*INDUSIT_DASHBOARDS)
     
     # Fetch the updated document
-    updated = automation_metadata_collection.find_one({"_id": ObjectId(id)})
-    return serialize_doc(updated)
+    updated = await automation_metadata_collection.find_one({"_id": ObjectId(id)})
+    return serialize_automation(updated)
 
 @convert_kwargs_to_snake_case
 async def delete_automation_metadata_resolver(_, info, id):
-    context = info.context
-    request = context["request"]
-    
-    # Authenticate user
-    auth_header = request.headers.get("Authorization")
-    if not auth_header or not auth_header.startswith("Bearer "):
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Not authenticated",
-            headers={"WWW-Authenticate": "Bearer"}
-        )
-    
-    token = auth_header.split(" ")[1]
-    user = await get_current_user(token)
-    
     # Check if user has IDadmin role
-    if not any(role in user.get("roles", []) + [user["role"]] for role in ["IDadmin"]):
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="IDadmin role required"
-        )
+    await role_required(info, "IDadmin", detail="IDadmin role required")
     
     # Check if record exists
-    existing = automation_metadata_collection.find_one({"_id": ObjectId(id)})
+    existing = await automation_metadata_collection.find_one({"_id": ObjectId(id)})
     if not existing:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -225,162 +134,79 @@ async def delete_automation_metadata_resolver(_, info, id):
         )
     
     # Delete the document
-    result = automation_metadata_collection.delete_one({"_id": ObjectId(id)})
+    result = await automation_metadata_collection.delete_one({"_id": ObjectId(id)})
+    await invalidate_dashboards(*INDUSIT_DASHBOARDS)
     
     return result.deleted_count > 0
 
 # Execution Data Resolvers - Similar structure to Automation Metadata
 async def execution_data_resolver(_, info, id=None):
-    context = info.context
-    request = context["request"]
-    
-    # Authenticate user
-    auth_header = request.headers.get("Authorization")
-    if not auth_header or not auth_header.startswith("Bearer "):
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Not authenticated",
-            headers={"WWW-Authenticate": "Bearer"}
-        )
-    
-    token = auth_header.split(" ")[1]
-    user = await get_current_user(token)
-    
     # Check if user has IDuser or IDadmin role
-    if not any(role in user.get("roles", []) + [user["role"]] for role in ["IDuser", "IDadmin"]):
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="IndusIT Dashboard access required"
-        )
+    await role_required(info, "IDuser", "IDadmin", detail="IndusIT Dashboard access required")
     
     if id:
-        execution = execution_data_collection.find_one({"_id": ObjectId(id)})
+        execution = await execution_data_collection.find_one({"_id": ObjectId(id)}, projection_from_info(info))
         if not execution:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail=f"Execution data with ID {id} not found"
             )
-        return serialize_doc(execution)
+        return serialize_execution(execution)
     
     return None
 
 async def all_execution_data_resolver(_, info):
-    context = info.context
-    request = context["request"]
+    await role_required(info, "IDuser", "IDadmin", detail="IndusIT Dashboard access required")
     
-    # Authenticate user and check permissions - similar to other resolvers
-    auth_header = request.headers.get("Authorization")
-    if not auth_header or not auth_header.startswith("Bearer "):
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Not authenticated",
-            headers={"WWW-Authenticate": "Bearer"}
-        )
-    
-    token = auth_header.split(" ")[1]
-    user = await get_current_user(token)
-    
-    if not any(role in user.get("roles", []) + [user["role"]] for role in ["IDuser", "IDadmin"]):
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="IndusIT Dashboard access required"
-        )
+    executions = await execution_data_collection.find({}, projection_from_info(info)).to_list(length=None)
+    return [serialize_execution(execution) for execution in executions]
+
+async def all_execution_data_connection_resolver(_, info, first=None, after=None):
+    await role_required(info, "IDuser", "IDadmin", detail="IndusIT Dashboard access required")
     
-    executions = list(execution_data_collection.find())
-    return serialize_docs(executions)
+    return await paginate(
+        execution_data_collection, {}, first, after,
+        projection=projection_from_info(info, ("edges", "node")), node=serialize_execution
+    )
 
 async def execution_data_by_apaid_resolver(_, info, apaid):
     # Similar structure to automation_metadata_by_apaid_resolver
-    context = info.context
-    request = context["request"]
-    
-    auth_header = request.headers.get("Authorization")
-    if not auth_header or not auth_header.startswith("Bearer "):
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Not authenticated",
-            headers={"WWW-Authenticate": "Bearer"}
-        )
-    
-    token = auth_header.split(" ")[1]
-    user = await get_current_user(token)
-    
-    if not any(role in user.get("roles", []) + [user["role"]] for role in ["IDuser", "IDadmin"]):
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="IndusIT Dashboard access required"
-        )
+    await role_required(info, "IDuser", "IDadmin", detail="IndusIT Dashboard access required")
     
-    execution = execution_data_collection.find_one({"apaid": apaid})
+    execution = await execution_data_collection.find_one({"apaid": apaid}, projection_from_info(info))
     if not execution:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Execution data with APAID {apaid} not found"
         )
-    return serialize_doc(execution)
+    return serialize_execution(execution)
 
 @convert_kwargs_to_snake_case
 async def create_execution_data_resolver(_, info, input):
     # Similar structure to create_automation_metadata_resolver
-    context = info.context
-    request = context["request"]
-    
-    auth_header = request.headers.get("Authorization")
-    if not auth_header or not auth_header.startswith("Bearer "):
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Not authenticated",
-            headers={"WWW-Authenticate": "Bearer"}
-        )
-    
-    token = auth_header.split(" ")[1]
-    user = await get_current_user(token)
+    await role_required(info, "IDadmin", detail="IDadmin role required")
     
-    if not any(role in user.get("roles", []) + [user["role"]] for role in ["IDadmin"]):
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="IDadmin role required"
-        )
+    now = datetime.utcnow()
+    input["created_at"] = now
+    input["updated_at"] = now
     
-    existing = execution_data_collection.find_one({"apaid": input["apaid"]})
-    if existing:
+    try:
+        result = await execution_data_collection.insert_one(input)
+    except DuplicateKeyError:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=f"Execution data for APAID {input['apaid']} already exists"
         )
-    
-    now = datetime.utcnow()
-    input["created_at"] = now
-    input["updated_at"] = now
-    
-    result = execution_data_collection.insert_one(input)
-    created = execution_data_collection.find_one({"_id": result.inserted_id})
-    return serialize_doc(created)
+    await invalidate_dashboards(*INDUSIT_DASHBOARDS)
+    created = await execution_data_collection.find_one({"_id": result.inserted_id})
+    return serialize_execution(created)
 
 @convert_kwargs_to_snake_case
 async def update_execution_data_resolver(_, info, id, input):
     # Similar to update_automation_metadata_resolver
-    context = info.context
-    request = context["request"]
+    await role_required(info, "IDadmin", detail="IDadmin role required")
     
-    auth_header = request.headers.get("Authorization")
-    if not auth_header or not auth_header.startswith("Bearer "):
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Not authenticated",
-            headers={"WWW-Authenticate": "Bearer"}
-        )
-    
-    token = auth_header.split(" ")[1]
-    user = await get_current_user(token)
-    
-    if not any(role in user.get("roles", []) + [user["role"]] for role in ["IDadmin"]):
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="IDadmin role required"
-        )
-    
-    existing = execution_data_collection.find_one({"_id": ObjectId(id)})
+    existing = await execution_data_collection.find_one({"_id": ObjectId(id)})
     if not existing:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -389,140 +215,159 @@ async def update_execution_data_resolver(_, info, id, input):
     
     input["updated_at"] = datetime.utcnow()
     
-    execution_data_collection.update_one(
-        {"_id": ObjectId(id)},
-        {"$set": input}
-    )
+    try:
+        await execution_data_collection.update_one(
+            {"_id": ObjectId(id)},
+            {"$set": input}
+        )
+    except DuplicateKeyError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Execution data for APAID {input['apaid']} already exists"
+        )
+    await invalidate_dashboards(*INDUSIT_DASHBOARDS)
     
-    updated = execution_data_collection.find_one({"_id": ObjectId(id)})
-    return serialize_doc(updated)
+    updated = await execution_data_collection.find_one({"_id": ObjectId(id)})
+    return serialize_execution(updated)
 
 @convert_kwargs_to_snake_case
 async def delete_execution_data_resolver(_, info, id):
     # Similar to delete_automation_metadata_resolver
-    context = info.context
-    request = context["request"]
+    await role_required(info, "IDadmin", detail="IDadmin role required")
     
-    auth_header = request.headers.get("Authorization")
-    if not auth_header or not auth_header.startswith("Bearer "):
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Not authenticated",
-            headers={"WWW-Authenticate": "Bearer"}
-        )
-    
-    token = auth_header.split(" ")[1]
-    user = await get_current_user(token)
-    
-    if not any(role in user.get("roles", []) + [user["role"]] for role in ["IDadmin"]):
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="IDadmin role required"
-        )
-    
-    existing = execution_data_collection.find_one({"_id": ObjectId(id)})
+    existing = await execution_data_collection.find_one({"_id": ObjectId(id)})
     if not existing:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Execution data with ID {id} not found"
         )
     
-    result = execution_data_collection.delete_one({"_id": ObjectId(id)})
+    result = await execution_data_collection.delete_one({"_id": ObjectId(id)})
+    await invalidate_dashboards(*INDUSIT_DASHBOARDS)
     
     return result.deleted_count > 0
 
-# Dashboard Stats Resolvers
-async def user_dashboard_stats_resolver(_, info):
-    context = info.context
-    request = context["request"]
-    
-    # Authenticate user
-    auth_header = request.headers.get("Authorization")
-    if not auth_header or not auth_header.startswith("Bearer "):
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Not authenticated",
-            headers={"WWW-Authenticate": "Bearer"}
-        )
-    
-    token = auth_header.split(" ")[1]
-    user = await get_current_user(token)
+# Interface Register Resolvers
+async def passwords_expiring_resolver(_, info, days=14):
+    await role_required(info, "IDuser", "IDadmin", detail="IndusIT Dashboard access required")
     
-    # Check if user has IDuser or IDadmin role
-    if not any(role in user.get("roles", []) + [user["role"]] for role in ["IDuser", "IDadmin"]):
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="IndusIT Dashboard access required"
-        )
-    
-    # Calculate automations count by category
-    pipeline = [
+    # Range scan on the next_password_update_date index, soonest first
+    now = datetime.utcnow()
+    interfaces = await interface_register_collection.find(
+        {"next_password_update_date": {"$gte": now, "$lt": now + timedelta(days=days)}},
+        projection_from_info(info)
+    ).sort("next_password_update_date", 1).to_list(length=None)
+    return [serialize_interface(interface) for interface in interfaces]
+
+# Dashboard Stats Resolvers
+# One round trip: the documents each stat needs from other collections are
+# unioned into the automation stream, tagged with `stats_source`, and each facet
+# picks its own. $facet sub-pipelines cannot use indexes, so every union side
+# is narrowed (on an index where possible) before it joins the stream.
+def _union(collection_name, source, pipeline):
+    return {"$unionWith": {
+        "coll": collection_name,
+        "pipeline": pipeline + [{"$addFields": {"stats_source": source}}]
+    }}
+
+USER_STATS_UNIONS = [
+    _union("execution_data", "running_execution", [
+        {"$match": {"current_status": "Running"}},
+        {"$project": {"_id": 0, "volumes_daily": 1}}
+    ]),
+]
+
+ADMIN_STATS_UNIONS = USER_STATS_UNIONS + [
+    # Latest DR date: the first entry of the last_dr_date index
+    _union("infra_register", "last_dr", [
+        {"$match": {"last_dr_date": {"$ne": None}}},
+        {"$sort": {"last_dr_date": -1}},
+        {"$limit": 1},
+        {"$project": {"_id": 0, "last_dr_date": 1}}
+    ]),
+    _union("infra_register", "vulnerabilities", [
+        {"$group": {"_id": None, "total": {"$sum": "$open_vulnerabilities"}}},
+        {"$project": {"_id": 0, "total": 1}}
+    ]),
+]
+
+AUTOMATIONS = {"stats_source": {"$exists": False}}
+
+USER_STATS_FACETS = {
+    "automations_count_by_category": [
+        {"$match": AUTOMATIONS},
         {"$group": {"_id": "$category", "count": {"$sum": 1}}},
         {"$project": {"category": "$_id", "count": 1, "_id": 0}}
-    ]
-    category_counts = list(automation_metadata_collection.aggregate(pipeline))
-    
-    # Calculate volumes processed today
-    # This is a simplified calculation - in a real implementation, you'd query actual daily volumes
-    volumes_processed = 0
-    for execution in execution_data_collection.find({"current_status": "Running"}):
-        volumes_processed += execution.get("volumes_daily", 0)
-    
-    # Get P1 bots status
-    p1_bots = []
-    for automation in automation_metadata_collection.find({"priority": "P1"}):
-        apaid = automation["apaid"]
-        execution = execution_data_collection.find_one({"apaid": apaid})
-        status = execution["current_status"] if execution else "Unknown"
-        p1_bots.append({
-            "apaid": apaid,
-            "rpa_name": automation["rpa_name"],
-            "status": status
-        })
-    
-    return {
-        "automations_count_by_category": category_counts,
-        "volumes_processed_today": volumes_processed,
-        "p1_bots_status": p1_bots
+    ],
+    "volumes_processed_today": [
+        {"$match": {"stats_source": "running_execution"}},
+        {"$group": {"_id": None, "total": {"$sum": "$volumes_daily"}}}
+    ],
+    "p1_bots_status": [
+        {"$match": {**AUTOMATIONS, "priority": "P1"}},
+        {"$lookup": {
+            "from": "execution_data",
+            "localField": "apaid",
+            "foreignField": "apaid",
+            "as": "execution"
+        }},
+        {"$project": {
+            "_id": 0,
+            "apaid": 1,
+            "rpa_name": 1,
+            "status": {"$ifNull": [{"$arrayElemAt": ["$execution.current_status", 0]}, "Unknown"]}
+        }}
+    ],
+}
+
+ADMIN_STATS_FACETS = {
+    **USER_STATS_FACETS,
+    "last_dr_date": [{"$match": {"stats_source": "last_dr"}}],
+    "current_vulns": [{"$match": {"stats_source": "vulnerabilities"}}],
+}
+
+# The automation fields the facets read, projected before the unions so whole
+# automation documents never enter the stream
+AUTOMATION_STATS_PROJECTION = {"$project": {"_id": 0, "category": 1, "priority": 1, "apaid": 1, "rpa_name": 1}}
+
+USER_DASHBOARD_PIPELINE = [AUTOMATION_STATS_PROJECTION, *USER_STATS_UNIONS, {"$facet": USER_STATS_FACETS}]
+ADMIN_DASHBOARD_PIPELINE = [AUTOMATION_STATS_PROJECTION, *ADMIN_STATS_UNIONS, {"$facet": ADMIN_STATS_FACETS}]
+
+async def get_dashboard_stats(admin=False):
+    """User (or admin) dashboard stats from a single aggregation"""
+    pipeline = ADMIN_DASHBOARD_PIPELINE if admin else USER_DASHBOARD_PIPELINE
+    result = await automation_metadata_collection.aggregate(pipeline).to_list(length=None)
+    facets = result[0]
+    volumes = facets["volumes_processed_today"]
+    stats = {
+        "automations_count_by_category": facets["automations_count_by_category"],
+        "volumes_processed_today": volumes[0]["total"] if volumes else 0,
+        "p1_bots_status": facets["p1_bots_status"]
     }
+    if admin:
+        last_dr = facets["last_dr_date"]
+        vulns = facets["current_vulns"]
+        stats["last_dr_date"] = last_dr[0]["last_dr_date"] if last_dr else None
+        stats["current_vulns"] = vulns[0]["total"] if vulns else 0
+    return stats
 
-async def admin_dashboard_stats_resolver(_, info):
-    context = info.context
-    request = context["request"]
-    
-    # Authenticate user
-    auth_header = request.headers.get("Authorization")
-    if not auth_header or not auth_header.startswith("Bearer "):
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Not authenticated",
-            headers={"WWW-Authenticate": "Bearer"}
-        )
-    
-    token = auth_header.split(" ")[1]
-    user = await get_current_user(token)
+async def get_user_dashboard_stats():
+    return await get_dashboard_stats()
+
+async def get_admin_dashboard_stats():
+    return await get_dashboard_stats(admin=True)
+
+async def user_dashboard_stats_resolver(_, info):
+    # Check if user has IDuser or IDadmin role
+    user = await role_required(info, "IDuser", "IDadmin", detail="IndusIT Dashboard access required")
     
+    return await cached_dashboard("userDashboardStats", user, get_user_dashboard_stats)
+
+async def admin_dashboard_stats_resolver(_, info):
     # Check if user has IDadmin role
-    if not any(role in user.get("roles", []) + [user["role"]] for role in ["IDadmin"]):
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="IDadmin role required"
-        )
-    
-    # Get user dashboard stats first
-    user_stats = await user_dashboard_stats_resolver(_, info)
+    user = await role_required(info, "IDadmin", detail="IDadmin role required")
     
-    # Add admin-specific stats
-    # For demo purposes, these are hardcoded values
-    # In a real implementation, you would query actual data
-    last_dr_date = "15-04-2023"
-    current_vulns = 5
-    
-    return {
-        **user_stats,
-        "last_dr_date": last_dr_date,
-        "current_vulns": current_vulns
-    }
+    return await cached_dashboard("adminDashboardStats", user, get_admin_dashboard_stats)
 
 # Implement the rest of the resolvers for Infra Register, Interface Register, and Microbot Register
 # following the same pattern as above
@@ -4,7 +4,10 @@ from fastapi import HTTPException, status
 from bson import ObjectId
 from datetime import datetime
 from app.db.mongodb import metrics_collection
-from app.auth import get_current_user, admin_required
+from app.db.loaders import get_metric_loader
+from app.db.pagination import paginate
+from app.db.projection import projection_from_info
+from app.auth import get_context_user, admin_required
 
 # Helper function to get metric status
 def get_metric_status(value, baseline, target):
@@ -15,49 +18,36 @@ def get_metric_status(value, baseline, target):
     else:
         return "below_baseline"
 
+def serialize_metric(metric):
+    metric["id"] = str(metric["_id"])
+    del metric["_id"]
+    return metric
+
 async def metrics_resolver(_, info):
-    context = info.context
-    request = context["request"]
-    
-    # Get the Authorization header
-    auth_header = request.headers.get("Authorization")
-    if not auth_header or not auth_header.startswith("Bearer "):
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Not authenticated"
-        )
+    await get_context_user(info)
     
-    token = auth_header.split(" ")[1]
-    user = await get_current_user(token)
-    
-    metrics = list(metrics_collection.find())
-    for metric in metrics:
-        metric["id"] = str(metric["_id"])
-        del metric["_id"]
+    metrics = await metrics_collection.find({}, projection_from_info(info)).to_list(length=None)
+    return [serialize_metric(metric) for metric in metrics]
+
+async def metrics_connection_resolver(_, info, first=None, after=None):
+    await get_context_user(info)
     
-    return metrics
+    return await paginate(
+        metrics_collection, {}, first, after,
+        projection=projection_from_info(info, ("edges", "node")), node=serialize_metric
+    )
 
 @convert_kwargs_to_snake_case
 async def metric_resolver(_, info, id):
-    context = info.context
-    request = context["request"]
-    
-    # Get the Authorization header
-    auth_header = request.headers.get("Authorization")
-    if not auth_header or not auth_header.startswith("Bearer "):
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Not authenticated"
-        )
-    
-    token = auth_header.split(" ")[1]
-    user = await get_current_user(token)
+    await get_context_user(info)
     
     try:
-        metric = metrics_collection.find_one({"_id": ObjectId(id)})
+        metric = await get_metric_loader(info).load(id)
         if not metric:
             return None
         
+        # Loader results are shared within the request, so work on a copy
+        metric = dict(metric)
         metric["id"] = str(metric["_id"])
         del metric["_id"]
         return metric
@@ -69,22 +59,8 @@ async def metric_resolver(_, info, id):
 
 @convert_kwargs_to_snake_case
 async def create_metric_resolver(_, info, input):
-    context = info.context
-    request = context["request"]
-    
-    # Get the Authorization header
-    auth_header = request.headers.get("Authorization")
-    if not auth_header or not auth_header.startswith("Bearer "):
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Not authenticated"
-        )
-    
-    token = auth_header.split(" ")[1]
-    user = await get_current_user(token)
-    
     # Only admin can create metrics
-    admin_required(user)
+    user = await admin_required(info)
     
     # Create metric
     metric_data = {
@@ -97,7 +73,7 @@ async def create_metric_resolver(_, info, input):
         "created_at": datetime.utcnow(),
     }
     
-    result = metrics_collection.insert_one(metric_data)
+    result = await metrics_collection.insert_one(metric_data)
     metric_id = str(result.inserted_id)
     
     # Return created metric
@@ -109,25 +85,11 @@ async def create_metric_resolver(_, info, input):
 
 @convert_kwargs_to_snake_case
 async def update_metric_resolver(_, info, id, input):
-    context = info.context
-    request = context["request"]
-    
-    # Get the Authorization header
-    auth_header = request.headers.get("Authorization")
-    if not auth_header or not auth_header.startswith("Bearer "):
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Not authenticated"
-        )
-    
-    token = auth_header.split(" ")[1]
-    user = await get_current_user(token)
-    
     # Only admin can update metrics
-    admin_required(user)
+    await admin_required(info)
     
     # Check if metric exists
-    metric = metrics_collection.find_one({"_id": ObjectId(id)})
+    metric = await metrics_collection.find_one({"_id": ObjectId(id)})
     if not metric:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -144,13 +106,13 @@ async def update_metric_resolver(_, info, id, input):
         "updated_at": datetime.utcnow()
     }
     
-    metrics_collection.update_one(
+    await metrics_collection.update_one(
         {"_id": ObjectId(id)},
         {"$set": updated_data}
     )
     
     # Return updated metric
-    updated_metric = metrics_collection.find_one({"_id": ObjectId(id)})
+    updated_metric = await metrics_collection.find_one({"_id": ObjectId(id)})
     updated_metric["id"] = str(updated_metric["_id"])
     del updated_metric["_id"]
     
@@ -158,25 +120,11 @@ async def update_metric_resolver(_, info, id, input):
 
 @convert_kwargs_to_snake_case
 async def delete_metric_resolver(_, info, id):
-    context = info.context
-    request = context["request"]
-    
-    # Get the Authorization header
-    auth_header = request.headers.get("Authorization")
-    if not auth_header or not auth_header.startswith("Bearer "):
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Not authenticated"
-        )
-    
-    token = auth_header.split(" ")[1]
-    user = await get_current_user(token)
-    
     # Only admin can delete metrics
-    admin_required(user)
+    await admin_required(info)
     
     # Check if metric exists
-    metric = metrics_collection.find_one({"_id": ObjectId(id)})
+    metric = await metrics_collection.find_one({"_id": ObjectId(id)})
     if not metric:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -184,7 +132,7 @@ async def delete_metric_resolver(_, info, id):
         )
     
     # Delete metric
-    result = metrics_collection.delete_one({"_id": ObjectId(id)})
+    result = await metrics_collection.delete_one({"_id": ObjectId(id)})
     
     if result.deleted_count == 1:
         return True
@@ -2,33 +2,47 @@ from ariadne import convert_kwargs_to_snake_case
 from fastapi import HTTPException, status
 from bson import ObjectId
 from datetime import datetime
-import pandas as pd
+import asyncio
 import io
 import os
 import uuid
 from app.db.mongodb import (
     weekly_reports_collection,
-    metrics_collection,
     report_drafts_collection,
-    serialize_doc
+    export_jobs_collection,
+    parse_week_date
 )
-from app.auth import get_current_user, admin_required
-
-async def weekly_reports_resolver(_, info, fy=None, quarter=None, week_date=None):
-    context = info.context
-    request = context["request"]
+from app.db.serializers import get_serializer
+from app.db.loaders import get_metric_loader
+from app.db.rollups import get_quarter_rollups, updating_quarters
+from app.db.versions import bump_report_versions, get_report_version
+from app.utils.dashboard_cache import cached_dashboard, invalidate_dashboards, REPORT_DASHBOARDS
+from app.db.pagination import paginate
+from app.db.projection import projection_from_info
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+from app.utils.export import EXPORT_PROJECTION, write_csv_report
+from app.utils.export_jobs import (
+    JOB_WRITERS, get_export_dir, export_cache_key, find_cached_export,
+    enqueue_export_job, record_export_job, serialize_export_job
+)
+from app.auth import get_context_user, admin_required, is_admin
 
-    # Get the Authorization header
-    auth_header = request.headers.get("Authorization")
-    if not auth_header or not auth_header.startswith("Bearer "):
+def parse_date_filter(name, value):
+    date = parse_week_date(value)
+    if date is None:
         raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Not authenticated"
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid {name} date '{value}', expected DD-MM-YYYY"
         )
-    
-    token = auth_header.split(" ")[1]
-    user = await get_current_user(token)
+    return date
+
+serialize_weekly_report = get_serializer("weekly_reports")
+
+# Newest week first; _id breaks ties so pagination cursors are unique
+WEEKLY_REPORTS_SORT = [("report_date", -1), ("_id", -1)]
 
+def build_weekly_reports_query(fy=None, quarter=None, week_date=None, date_range=None):
     # Build query based on filters
     query = {}
     if fy:
@@ -37,76 +51,88 @@ async def weekly_reports_resolver(_, info, fy=None, quarter=None, week_date=None
         query["quarter"] = quarter
     if week_date:
         query["week_date"] = week_date
-
-    # Get reports
-    reports = list(weekly_reports_collection.find(query).sort("week_date", -1))
     
-    # Process reports
-    for report in reports:
-        report["id"] = str(report["_id"])
-        del report["_id"]
-        
-        # Convert any ObjectIds to strings
-        report["created_by"] = str(report["created_by"])
+    # `from` is a Python keyword, so the range bounds arrive through **date_range
+    date_range = date_range or {}
+    report_date = {}
+    if date_range.get("from"):
+        report_date["$gte"] = parse_date_filter("from", date_range["from"])
+    if date_range.get("to"):
+        report_date["$lte"] = parse_date_filter("to", date_range["to"])
+    if report_date:
+        query["report_date"] = report_date
+    return query
+
+async def weekly_reports_resolver(_, info, fy=None, quarter=None, week_date=None, **date_range):
+    await get_context_user(info)
+
+    query = build_weekly_reports_query(fy, quarter, week_date, date_range)
+    reports = await weekly_reports_collection.find(query, projection_from_info(info)).sort(WEEKLY_REPORTS_SORT).to_list(length=None)
+    return [serialize_weekly_report(report) for report in reports]
+
+async def weekly_reports_connection_resolver(_, info, fy=None, quarter=None, week_date=None, first=None, after=None, **date_range):
+    await get_context_user(info)
 
-    return reports
+    query = build_weekly_reports_query(fy, quarter, week_date, date_range)
+    return await paginate(
+        weekly_reports_collection, query, first, after,
+        sort=WEEKLY_REPORTS_SORT, projection=projection_from_info(info, ("edges", "node")),
+        node=serialize_weekly_report
+    )
+
+async def get_quarter_actuals(fy, quarter, metric_ids):
+    """Average value of each metric across all weekly reports of a quarter.
+
+    Read from the quarter's rollup in one indexed lookup. Metrics without
+    values are left out.
+    """
+    metric_ids = set(metric_ids)
+    actuals = {}
+    for rollup in await get_quarter_rollups({"fy": fy, "quarter": quarter}):
+        # Simple calculation: average of all values
+        # In a real system, you would parse and evaluate the formula
+        for metric in rollup["metrics"]:
+            if metric["metric_id"] in metric_ids:
+                actuals[metric["metric_id"]] = metric["sum"] / metric["count"]
+    return actuals
 
 @convert_kwargs_to_snake_case
 async def weekly_report_resolver(_, info, id):
-    context = info.context
-    request = context["request"]
-
-    # Get the Authorization header
-    auth_header = request.headers.get("Authorization")
-    if not auth_header or not auth_header.startswith("Bearer "):
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Not authenticated"
-        )
-    
-    token = auth_header.split(" ")[1]
-    user = await get_current_user(token)
+    await get_context_user(info)
 
     # Get report
     try:
-        report = weekly_reports_collection.find_one({"_id": ObjectId(id)})
+        # Quarter actuals of the metrics are looked up by the report's fy and quarter
+        projection = projection_from_info(info, requires={"metrics": ["metrics", "fy", "quarter"]})
+        report = await weekly_reports_collection.find_one({"_id": ObjectId(id)}, projection)
         if not report:
             return None
         
-        # Get quarter actuals for each metric
-        for metric in report["metrics"]:
-            metric_id = metric["metric_id"]
-            # Get the metric formula
-            metric_data = metrics_collection.find_one({"_id": ObjectId(metric_id)})
+        # Get the metric formulas in one batch
+        metrics = report.get("metrics", [])
+        metric_definitions = await get_metric_loader(info).load_many(
+            [metric["metric_id"] for metric in metrics]
+        )
+        
+        # Attach formulas; only metrics that still have a definition get a quarter actual
+        defined_metrics = []
+        for metric, metric_data in zip(metrics, metric_definitions):
+            if isinstance(metric_data, Exception):
+                raise metric_data
             if metric_data:
                 metric["actual_formula"] = metric_data.get("actual_formula", "")
-                
-                # Calculate quarter actual based on formula and all reports in the quarter
-                fy = report["fy"]
-                quarter = report["quarter"]
-                
-                # Get all reports for this quarter
-                quarter_reports = list(weekly_reports_collection.find({
-                    "fy": fy,
-                    "quarter": quarter
-                }))
-                
-                # Extract values for this metric from all reports
-                values = []
-                for qr in quarter_reports:
-                    for m in qr["metrics"]:
-                        if m["metric_id"] == metric_id:
-                            values.append(m["value"])
-                            break
-                
-                # Simple calculation: average of all values
-                # In a real system, you would parse and evaluate the formula
-                if values:
-                    metric["quarter_actual"] = sum(values) / len(values)
-                else:
-                    metric["quarter_actual"] = 0
+                defined_metrics.append(metric)
+        
+        if defined_metrics:
+            # Calculate quarter actuals for all metrics from one pass over the quarter's reports
+            quarter_actuals = await get_quarter_actuals(
+                report["fy"], report["quarter"],
+                {metric["metric_id"] for metric in defined_metrics}
+            )
+            for metric in defined_metrics:
+                metric["quarter_actual"] = quarter_actuals.get(metric["metric_id"], 0)
         
-        return serialize_doc(report)
+        return serialize_weekly_report(report)
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -114,19 +140,7 @@ async def weekly_report_resolver(_, info, id):
         )
 
 async def quarterly_reports_resolver(_, info, fy=None, quarter=None):
-    context = info.context
-    request = context["request"]
-
-    # Get the Authorization header
-    auth_header = request.headers.get("Authorization")
-    if not auth_header or not auth_header.startswith("Bearer "):
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Not authenticated"
-        )
-    
-    token = auth_header.split(" ")[1]
-    user = await get_current_user(token)
+    await get_context_user(info)
 
     # Build query based on filters
     query = {}
@@ -135,102 +149,45 @@ async def quarterly_reports_resolver(_, info, fy=None, quarter=None):
     if quarter:
         query["quarter"] = quarter
 
-    # Get weekly reports for the quarter
-    weekly_reports = list(weekly_reports_collection.find(query))
-    
-    # Group metrics by quarter and calculate averages/totals
-    quarterly_data = {}
-    
-    for report in weekly_reports:
-        key = f"{report['fy']}_{report['quarter']}"
-        
-        if key not in quarterly_data:
-            quarterly_data[key] = {
-                "fy": report["fy"],
-                "quarter": report["quarter"],
-                "metrics_data": {}
-            }
-            
-        # Process metrics in this report
-        for metric in report["metrics"]:
-            metric_id = metric["metric_id"]
-            
-            if metric_id not in quarterly_data[key]["metrics_data"]:
-                quarterly_data[key]["metrics_data"][metric_id] = {
-                    "values": [],
+    # Quarterly averages are kept in the rollups collection, one document per
+    # quarter, in the order quarters were first reported
+    rollups = await get_quarter_rollups(query)
+    
+    return [
+        {
+            "fy": rollup["fy"],
+            "quarter": rollup["quarter"],
+            "metrics": [
+                {
+                    "metric_id": metric["metric_id"],
                     "name": metric["name"],
-                    "baseline": metric["baseline"],
-                    "target": metric["target"],
-                    "unit": metric["unit"]
+                    "value": metric["entries_sum"] / metric["entries"],
+                    "baseline": metric.get("baseline"),
+                    "target": metric.get("target"),
+                    "unit": metric.get("unit"),
+                    "comment": f"Average of {metric['entries']} weekly reports"
                 }
-                
-            quarterly_data[key]["metrics_data"][metric_id]["values"].append(metric["value"])
-    
-    # Convert to list of quarterly reports
-    result = []
-    
-    for key, data in quarterly_data.items():
-        metrics = []
-        
-        for metric_id, metric_data in data["metrics_data"].items():
-            # Calculate average value for the metric across all weekly reports
-            avg_value = sum(metric_data["values"]) / len(metric_data["values"]) if metric_data["values"] else 0
-            
-            metrics.append({
-                "metric_id": metric_id,
-                "name": metric_data["name"],
-                "value": avg_value,
-                "baseline": metric_data["baseline"],
-                "target": metric_data["target"],
-                "unit": metric_data["unit"],
-                "comment": f"Average of {len(metric_data['values'])} weekly reports"
-            })
-        
-        result.append({
-            "fy": data["fy"],
-            "quarter": data["quarter"],
-            "metrics": metrics
-        })
-    
-    return result
+                for metric in rollup["metrics"]
+            ]
+        }
+        for rollup in rollups
+    ]
 
-@convert_kwargs_to_snake_case
-async def create_weekly_report_resolver(_, info, input):
-    context = info.context
-    request = context["request"]
+async def build_report_metrics(info, metric_values):
+    """Snapshot metric definitions and RAG status for each submitted metric value.
+
+    All definitions are fetched in one batch; errors are raised in input order,
+    exactly as the former per-metric lookups did.
+    """
+    metrics = await get_metric_loader(info).load_many(
+        [metric_value["metric_id"] for metric_value in metric_values]
+    )
 
-    # Get the Authorization header
-    auth_header = request.headers.get("Authorization")
-    if not auth_header or not auth_header.startswith("Bearer "):
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Not authenticated"
-        )
-    
-    token = auth_header.split(" ")[1]
-    user = await get_current_user(token)
-    
-    # Only admin can create reports
-    admin_required(user)
-    
-    # Check if a report for this week already exists
-    existing_report = weekly_reports_collection.find_one({
-        "fy": input["fy"],
-        "quarter": input["quarter"],
-        "week_date": input["week_date"]
-    })
-    
-    if existing_report:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"A report for FY {input['fy']}, {input['quarter']}, week ending {input['week_date']} already exists"
-        )
-    
-    # Fetch metric details to include in the report
     metrics_data = []
-    for metric_value in input["metrics"]:
+    for metric_value, metric in zip(metric_values, metrics):
         metric_id = metric_value["metric_id"]
-        metric = metrics_collection.find_one({"_id": ObjectId(metric_id)})
+        if isinstance(metric, Exception):
+            raise metric
         
         if not metric:
             raise HTTPException(
@@ -243,7 +200,7 @@ async def create_weekly_report_resolver(_, info, input):
         baseline = metric["baseline"]
         target = metric["target"]
         
-        status = "green" if value >= target else ("amber" if value > baseline else "red")
+        metric_status = "green" if value >= target else ("amber" if value > baseline else "red")
         
         metrics_data.append({
             "metric_id": metric_id,
@@ -253,25 +210,47 @@ async def create_weekly_report_resolver(_, info, input):
             "baseline": baseline,
             "target": target,
             "unit": metric["unit"],
-            "status": status,
+            "status": metric_status,
             "actual_formula": metric.get("actual_formula", "")
         })
     
+    return metrics_data
+
+@convert_kwargs_to_snake_case
+async def create_weekly_report_resolver(_, info, input):
+    # Only admin can create reports
+    user = await admin_required(info)
+    report_date = parse_date_filter("week", input["week_date"])
+    
+    # Fetch metric details to include in the report
+    metrics_data = await build_report_metrics(info, input["metrics"])
+    
     # Create report
     report_data = {
         "fy": input["fy"],
         "quarter": input["quarter"],
         "week_date": input["week_date"],
+        "report_date": report_date,
         "metrics": metrics_data,
         "created_by": ObjectId(user["_id"]),
         "created_at": datetime.utcnow(),
         "updated_at": None
     }
     
-    result = weekly_reports_collection.insert_one(report_data)
+    # One report per week is enforced by the unique (fy, quarter, week_date) index
+    try:
+        async with updating_quarters((input["fy"], input["quarter"])):
+            result = await weekly_reports_collection.insert_one(report_data)
+    except DuplicateKeyError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"A report for FY {input['fy']}, {input['quarter']}, week ending {input['week_date']} already exists"
+        )
+    await bump_report_versions(report_data)
+    await invalidate_dashboards(*REPORT_DASHBOARDS)
     
     # Clean up any drafts
-    report_drafts_collection.delete_many({
+    await report_drafts_collection.delete_many({
         "fy": input["fy"],
         "quarter": input["quarter"],
         "week_date": input["week_date"],
@@ -279,286 +258,167 @@ async def create_weekly_report_resolver(_, info, input):
     })
     
     # Return created report
-    report = weekly_reports_collection.find_one({"_id": result.inserted_id})
-    return serialize_doc(report)
+    report = await weekly_reports_collection.find_one({"_id": result.inserted_id})
+    return serialize_weekly_report(report)
 
 @convert_kwargs_to_snake_case
 async def update_weekly_report_resolver(_, info, id, input):
-    context = info.context
-    request = context["request"]
-
-    # Get the Authorization header
-    auth_header = request.headers.get("Authorization")
-    if not auth_header or not auth_header.startswith("Bearer "):
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Not authenticated"
-        )
-    
-    token = auth_header.split(" ")[1]
-    user = await get_current_user(token)
-    
     # Only admin can update reports
-    admin_required(user)
+    await admin_required(info)
+    report_date = parse_date_filter("week", input["week_date"])
     
     # Check if report exists
-    report = weekly_reports_collection.find_one({"_id": ObjectId(id)})
+    report = await weekly_reports_collection.find_one({"_id": ObjectId(id)})
     if not report:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Report with ID {id} not found"
         )
     
-    # Check if changing to a week that already has a report
-    if (input["fy"] != report["fy"] or 
-        input["quarter"] != report["quarter"] or 
-        input["week_date"] != report["week_date"]):
-        
-        existing_report = weekly_reports_collection.find_one({
-            "fy": input["fy"],
-            "quarter": input["quarter"],
-            "week_date": input["week_date"],
-            "_id": {"$ne": ObjectId(id)}
-        })
-        
-        if existing_report:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail=f"A report for FY {input['fy']}, {input['quarter']}, week ending {input['week_date']} already exists"
-            )
-    
     # Fetch metric details to include in the report
-    metrics_data = []
-    for metric_value in input["metrics"]:
-        metric_id = metric_value["metric_id"]
-        metric = metrics_collection.find_one({"_id": ObjectId(metric_id)})
-        
-        if not metric:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail=f"Metric with ID {metric_id} not found"
-            )
-        
-        # Calculate status
-        value = metric_value["value"]
-        baseline = metric["baseline"]
-        target = metric["target"]
-        
-        status = "green" if value >= target else ("amber" if value > baseline else "red")
-        
-        metrics_data.append({
-            "metric_id": metric_id,
-            "name": metric["name"],
-            "value": value,
-            "comment": metric_value.get("comment", ""),
-            "baseline": baseline,
-            "target": target,
-            "unit": metric["unit"],
-            "status": status,
-            "actual_formula": metric.get("actual_formula", "")
-        })
+    metrics_data = await build_report_metrics(info, input["metrics"])
     
     # Update report
     updated_data = {
         "fy": input["fy"],
         "quarter": input["quarter"],
         "week_date": input["week_date"],
+        "report_date": report_date,
         "metrics": metrics_data,
         "updated_at": datetime.utcnow()
     }
     
-    weekly_reports_collection.update_one(
-        {"_id": ObjectId(id)},
-        {"$set": updated_data}
-    )
+    # Take the pre-image atomically with the write so the rollups of the quarter
+    # the report leaves are refreshed too, should it have moved since it was
+    # read. Moving onto a week that already has a report is rejected by the
+    # unique (fy, quarter, week_date) index.
+    try:
+        async with updating_quarters((report["fy"], report["quarter"]), (input["fy"], input["quarter"])) as quarters:
+            previous_report = await weekly_reports_collection.find_one_and_update(
+                {"_id": ObjectId(id)},
+                {"$set": updated_data},
+                return_document=ReturnDocument.BEFORE
+            )
+            if previous_report:
+                quarters.add((previous_report["fy"], previous_report["quarter"]))
+    except DuplicateKeyError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"A report for FY {input['fy']}, {input['quarter']}, week ending {input['week_date']} already exists"
+        )
     
-    # Return updated report
-    updated_report = weekly_reports_collection.find_one({"_id": ObjectId(id)})
-    return serialize_doc(updated_report)
-
-@convert_kwargs_to_snake_case
-async def delete_weekly_report_resolver(_, info, id):
-    context = info.context
-    request = context["request"]
-
-    # Get the Authorization header
-    auth_header = request.headers.get("Authorization")
-    if not auth_header or not auth_header.startswith("Bearer "):
+    if not previous_report:
         raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Not authenticated"
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Report with ID {id} not found"
         )
     
-    token = auth_header.split(" ")[1]
-    user = await get_current_user(token)
+    updated_report = {**previous_report, **updated_data}
+    await bump_report_versions(previous_report, updated_report)
+    await invalidate_dashboards(*REPORT_DASHBOARDS)
     
+    # Return updated report
+    return serialize_weekly_report(updated_report)
+
+@convert_kwargs_to_snake_case
+async def delete_weekly_report_resolver(_, info, id):
     # Only admin can delete reports
-    admin_required(user)
+    await admin_required(info)
     
-    # Check if report exists
-    report = weekly_reports_collection.find_one({"_id": ObjectId(id)})
+    report = await weekly_reports_collection.find_one({"_id": ObjectId(id)}, {"fy": 1, "quarter": 1})
     if not report:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Report with ID {id} not found"
         )
     
-    # Delete report
-    result = weekly_reports_collection.delete_one({"_id": ObjectId(id)})
+    # Delete report, keeping the deleted document to refresh its quarter's rollups
+    async with updating_quarters((report["fy"], report["quarter"])) as quarters:
+        report = await weekly_reports_collection.find_one_and_delete({"_id": ObjectId(id)})
+        if report:
+            quarters.add((report["fy"], report["quarter"]))
+    if not report:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Report with ID {id} not found"
+        )
     
-    if result.deleted_count == 1:
-        return True
-    return False
+    await bump_report_versions(report)
+    await invalidate_dashboards(*REPORT_DASHBOARDS)
+    return True
+
+def build_export_query(fy, quarter=None, week_date=None):
+    query = {"fy": fy}
+    if quarter:
+        query["quarter"] = quarter
+    if week_date:
+        query["week_date"] = week_date
+    return query
+
+def find_export_reports(query):
+    """Cursor over the weekly reports to export, projected to the exported fields"""
+    return weekly_reports_collection.find(query, EXPORT_PROJECTION).batch_size(500)
 
 @convert_kwargs_to_snake_case
 async def export_report_resolver(_, info, input):
-    context = info.context
-    request = context["request"]
-
-    # Get the Authorization header
-    auth_header = request.headers.get("Authorization")
-    if not auth_header or not auth_header.startswith("Bearer "):
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Not authenticated"
-        )
-    
-    token = auth_header.split(" ")[1]
-    user = await get_current_user(token)
+    user = await get_context_user(info)
+    owner = str(user["_id"])
     
     # Build query
-    query = {"fy": input["fy"]}
-    if input.get("quarter"):
-        query["quarter"] = input["quarter"]
-    if input.get("week_date"):
-        query["week_date"] = input["week_date"]
+    query = build_export_query(input["fy"], input.get("quarter"), input.get("week_date"))
+    
+    # Export format
+    export_format = input.get("format", "csv").lower()
+    if export_format != "csv" and export_format not in JOB_WRITERS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unsupported export format: {export_format}"
+        )
     
-    # Get reports
-    reports = list(weekly_reports_collection.find(query))
+    # Identical exports of unchanged data share one file (or one in-flight job)
+    data_version = await get_report_version(query["fy"], query.get("quarter"))
+    cache_key = export_cache_key(query, export_format, data_version)
+    job = await find_cached_export(cache_key, owner)
+    if job:
+        return {"url": job["url"], "job_id": str(job["_id"]), "status": job["status"]}
     
-    if not reports:
+    if not await weekly_reports_collection.find_one(query, {"_id": 1}):
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="No reports found with the provided criteria"
         )
     
-    # Process data for export
-    export_data = []
-    
-    for report in reports:
-        for metric in report["metrics"]:
-            export_data.append({
-                "FY": report["fy"],
-                "Quarter": report["quarter"],
-                "Week Date": report["week_date"],
-                "Metric Name": metric["name"],
-                "Value": metric["value"],
-                "Baseline": metric["baseline"],
-                "Target": metric["target"],
-                "Unit": metric["unit"],
-                "Status": metric.get("status", ""),
-                "Comment": metric.get("comment", "")
-            })
-    
-    # Create DataFrame
-    df = pd.DataFrame(export_data)
-    
-    # Export format
-    export_format = input.get("format", "csv").lower()
-    
-    # Define file path for saving exports
-    export_dir = os.environ.get("EXPORT_DIR", "./exports")
-    os.makedirs(export_dir, exist_ok=True)
+    if export_format == "csv":
+        # Streamed straight from the cursor, cheap enough to finish within the
+        # request; the file I/O runs on worker threads
+        file_name = f"report_{uuid.uuid4()}.csv"
+        export_dir = await asyncio.to_thread(get_export_dir)
+        await write_csv_report(find_export_reports(query), os.path.join(export_dir, file_name))
+        job = await record_export_job(owner, query, export_format, cache_key, file_name)
+    else:
+        # XLSX/HTML builds are CPU bound, so they run on the export worker pool
+        job = await enqueue_export_job(owner, query, export_format, cache_key)
     
-    file_uuid = str(uuid.uuid4())
+    return {"url": job["url"], "job_id": str(job["_id"]), "status": job["status"]}
+
+async def export_job_resolver(_, info, id):
+    user = await get_context_user(info)
     
-    # Export based on format
-    if export_format == "csv":
-        file_path = f"{export_dir}/report_{file_uuid}.csv"
-        df.to_csv(file_path, index=False)
-        file_url = f"/downloads/report_{file_uuid}.csv"
-        
-    elif export_format == "excel" or export_format == "xlsx":
-        file_path = f"{export_dir}/report_{file_uuid}.xlsx"
-        
-        # Create Excel writer with formatting
-        with pd.ExcelWriter(file_path, engine='xlsxwriter') as writer:
-            df.to_excel(writer, sheet_name='Report', index=False)
-            
-            # Get workbook and worksheet objects
-            workbook = writer.book
-            worksheet = writer.sheets['Report']
-            
-            # Add formats
-            header_format = workbook.add_format({
-                'bold': True,
-                'bg_color': '#D3D3D3',
-                'border': 1
-            })
-            
-            # Format headers
-            for col_num, value in enumerate(df.columns.values):
-                worksheet.write(0, col_num, value, header_format)
-            
-            # Auto-fit columns
-            for i, col in enumerate(df.columns):
-                max_len = max(df[col].astype(str).apply(len).max(), len(str(col))) + 2
-                worksheet.set_column(i, i, max_len)
-            
-        file_url = f"/downloads/report_{file_uuid}.xlsx"
-        
-    elif export_format == "pdf":
-        file_path = f"{export_dir}/report_{file_uuid}.pdf"
-        
-        # Use a styling library for PDF
-        styled_df = df.style.set_properties(**{
-            'font-size': '10pt',
-            'border-color': 'black',
-            'border-style': 'solid',
-            'border-width': '1px'
-        })
-        
-        # Custom PDF styling
-        html = styled_df.to_html()
-        
-        # Use a PDF conversion library like WeasyPrint or ReportLab
-        # This is a placeholder - you'll need to implement the actual PDF conversion
-        # Example with WeasyPrint
-        # from weasyprint import HTML
-        # HTML(string=html).write_pdf(file_path)
-        
-        # For now, let's just create a simple HTML file
-        with open(file_path.replace('.pdf', '.html'), 'w') as f:
-            f.write(html)
-        
-        file_url = f"/downloads/report_{file_uuid}.html"
+    job = await export_jobs_collection.find_one({"_id": ObjectId(id)}, {"query": 0})
     
-    else:
+    # Users only see jobs they requested; other people's are reported as missing
+    if not job or (str(user["_id"]) not in job["requested_by"] and not is_admin(user)):
         raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"Unsupported export format: {export_format}"
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Export job with ID {id} not found"
         )
     
-    return {"url": file_url}
+    return serialize_export_job(job)
 
 # Service Metrics Dashboard resolver
-async def service_metric_dashboard_resolver(_, info):
-    context = info.context
-    request = context["request"]
-
-    # Get the Authorization header
-    auth_header = request.headers.get("Authorization")
-    if not auth_header or not auth_header.startswith("Bearer "):
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Not authenticated"
-        )
-    
-    token = auth_header.split(" ")[1]
-    user = await get_current_user(token)
-    
-    # Get the latest report
-    latest_report = list(weekly_reports_collection.find().sort("week_date", -1).limit(1))
+async def get_service_metric_dashboard():
+    # Get the latest report (indexed on report_date)
+    latest_report = await weekly_reports_collection.find_one({}, sort=[("report_date", -1)])
     
     if not latest_report:
         raise HTTPException(
@@ -566,8 +426,6 @@ async def service_metric_dashboard_resolver(_, info):
             detail="No reports found"
         )
     
-    latest_report = latest_report[0]
-    
     # Extract metrics for the dashboard
     metrics = latest_report["metrics"]
     
@@ -598,3 +456,8 @@ async def service_metric_dashboard_resolver(_, info):
         "report": metrics,
         "summary": summary
     }
+
+async def service_metric_dashboard_resolver(_, info):
+    user = await get_context_user(info)
+    
+    return await cached_dashboard("serviceMetricDashboard", user, get_service_metric_dashboard)
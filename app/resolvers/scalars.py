@@ -0,0 +1,48 @@
+from datetime import datetime
+from ariadne import ScalarType
+from graphql import StringValueNode
+from app.db.mongodb import parse_week_date
+from app.db.serializers import format_date, format_datetime
+
+# Dates are stored as BSON dates and only formatted here, at the API edge:
+# Date as DD-MM-YYYY, DateTime as DD-MM-YYYY HH:MM:SS
+date_scalar = ScalarType("Date")
+datetime_scalar = ScalarType("DateTime")
+
+@date_scalar.serializer
+def serialize_date(value):
+    return format_date(value)
+
+@date_scalar.value_parser
+def parse_date_value(value):
+    date = parse_week_date(value)
+    if date is None:
+        raise ValueError(f"Invalid date '{value}', expected DD-MM-YYYY")
+    return date
+
+@date_scalar.literal_parser
+def parse_date_literal(ast, variable_values=None):
+    if not isinstance(ast, StringValueNode):
+        raise ValueError("Date must be a string")
+    return parse_date_value(ast.value)
+
+@datetime_scalar.serializer
+def serialize_datetime(value):
+    return format_datetime(value)
+
+@datetime_scalar.value_parser
+def parse_datetime_value(value):
+    try:
+        return datetime.strptime(value, '%d-%m-%Y %H:%M:%S')
+    except (TypeError, ValueError):
+        pass
+    date = parse_week_date(value)
+    if date is None:
+        raise ValueError(f"Invalid datetime '{value}', expected DD-MM-YYYY HH:MM:SS")
+    return date
+
+@datetime_scalar.literal_parser
+def parse_datetime_literal(ast, variable_values=None):
+    if not isinstance(ast, StringValueNode):
+        raise ValueError("DateTime must be a string")
+    return parse_datetime_value(ast.value)
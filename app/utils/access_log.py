@@ -0,0 +1,115 @@
+"""
+Logging setup and structured access logs.
+
+All application log records go through a QueueHandler onto an in-memory
+queue; a QueueListener thread does the formatting and the writes, so a slow
+disk or stdout pipe never stalls the event loop. LoggingMiddleware emits one
+JSON access record per request (method, path, status, GraphQL operation,
+user id, duration, Mongo command count, response size). Successful requests
+faster than ACCESS_LOG_SLOW_MS are sampled at ACCESS_LOG_SAMPLE_RATE; errors
+and slow requests are always logged.
+
+Mongo commands are counted by a pymongo CommandListener into the current
+request's stats, found through a contextvar (Motor runs commands in its
+executor within a copy of the caller's context).
+"""
+import atexit
+import json
+import logging
+import os
+import queue
+import random
+import time
+from contextvars import ContextVar
+from logging.handlers import QueueHandler, QueueListener
+from pymongo import monitoring
+
+ACCESS_LOG_SAMPLE_RATE = float(os.environ.get("ACCESS_LOG_SAMPLE_RATE", "1.0"))
+ACCESS_LOG_SLOW_MS = float(os.environ.get("ACCESS_LOG_SLOW_MS", "1000"))
+
+ACCESS_LOGGER = "app.access"
+access_logger = logging.getLogger(ACCESS_LOGGER)
+
+class RequestStats:
+    __slots__ = ("operation", "user_id", "mongo_ops", "response_bytes")
+
+    def __init__(self):
+        self.operation = None
+        self.user_id = None
+        self.mongo_ops = 0
+        self.response_bytes = 0
+
+current_request = ContextVar("current_request", default=None)
+
+def set_request_user(user_id):
+    stats = current_request.get()
+    if stats is not None:
+        stats.user_id = str(user_id)
+
+class MongoCommandCounter(monitoring.CommandListener):
+    """Count the Mongo commands each request sends"""
+
+    def started(self, event):
+        stats = current_request.get()
+        if stats is not None:
+            stats.mongo_ops += 1
+
+    def succeeded(self, event):
+        pass
+
+    def failed(self, event):
+        pass
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {"ts": self.formatTime(record, "%Y-%m-%dT%H:%M:%S"), **record.access}
+        return json.dumps(entry, separators=(",", ":"))
+
+def should_log(status, duration_ms):
+    if status >= 400 or duration_ms >= ACCESS_LOG_SLOW_MS:
+        return True
+    return ACCESS_LOG_SAMPLE_RATE >= 1 or random.random() < ACCESS_LOG_SAMPLE_RATE
+
+def log_access(method, path, status, started, stats):
+    duration_ms = (time.perf_counter() - started) * 1000
+    if not should_log(status, duration_ms):
+        return
+    access_logger.info("access", extra={"access": {
+        "method": method,
+        "path": path,
+        "status": status,
+        "operation": stats.operation,
+        "user_id": stats.user_id,
+        "duration_ms": round(duration_ms, 2),
+        "mongo_ops": stats.mongo_ops,
+        "response_bytes": stats.response_bytes,
+    }})
+
+_listener = None
+
+def configure_logging(level=logging.INFO):
+    """Send every log record through a queue to a listener thread that writes it.
+
+    Access records are written as JSON lines, everything else in the usual
+    basicConfig format; both to stderr.
+    """
+    global _listener
+    if _listener is not None:
+        return
+
+    console = logging.StreamHandler()
+    console.setFormatter(logging.Formatter(logging.BASIC_FORMAT))
+    console.addFilter(lambda record: record.name != ACCESS_LOGGER)
+    access = logging.StreamHandler()
+    access.setFormatter(JsonFormatter())
+    access.addFilter(logging.Filter(ACCESS_LOGGER))
+
+    log_queue = queue.SimpleQueue()
+    root = logging.getLogger()
+    root.handlers = [QueueHandler(log_queue)]
+    root.setLevel(level)
+
+    _listener = QueueListener(log_queue, console, access)
+    _listener.start()
+    # Flush what is still queued when the process exits
+    atexit.register(_listener.stop)
@@ -0,0 +1,60 @@
+"""
+Cache for the dashboard stats resolvers.
+
+Dashboard aggregates only change when the IndusIT or weekly report mutations
+run, so results are kept per dashboard for DASHBOARD_CACHE_TTL_SECONDS and
+dropped by those mutations. Entries are keyed by the caller's roles so a
+result is only ever served to users with the same roles. Invalidations bump
+a per-dashboard generation in the shared state backend (see
+app/utils/shared_state.py) that is part of every cache key, so with a shared
+backend a write reaches every worker's cache at once; with the default local
+backend other workers see it at most one TTL late.
+"""
+import os
+from app.utils import metrics
+from app.utils.cache import TTLCache
+from app.utils.shared_state import get_shared_state
+
+DASHBOARD_CACHE_TTL_SECONDS = int(os.environ.get("DASHBOARD_CACHE_TTL_SECONDS", "30"))
+DASHBOARD_CACHE_SIZE = int(os.environ.get("DASHBOARD_CACHE_SIZE", "256"))
+
+_MISSING = object()
+
+# Which mutations invalidate which dashboards
+INDUSIT_DASHBOARDS = ("userDashboardStats", "adminDashboardStats")
+REPORT_DASHBOARDS = ("serviceMetricDashboard",)
+
+_caches = {
+    name: TTLCache(maxsize=DASHBOARD_CACHE_SIZE, ttl=DASHBOARD_CACHE_TTL_SECONDS)
+    for name in INDUSIT_DASHBOARDS + REPORT_DASHBOARDS
+}
+
+def role_scope(user):
+    return (user.get("role", "user"), frozenset(user.get("roles") or ()))
+
+async def cached_dashboard(name, user, compute):
+    """Result of `compute()` for dashboard `name`, shared by users with the same roles"""
+    cache = _caches[name]
+    state = get_shared_state()
+    generation = await state.get(f"dashboard:{name}")
+    key = (role_scope(user), generation)
+    result = cache.get(key, _MISSING)
+    if result is not _MISSING:
+        metrics.inc("dashboard_cache_hits")
+        metrics.inc(f"dashboard_cache_hits_{name}")
+        return result
+
+    metrics.inc("dashboard_cache_misses")
+    metrics.inc(f"dashboard_cache_misses_{name}")
+    result = await compute()
+    # A result computed across an invalidation may predate the write; don't keep it
+    if await state.get(f"dashboard:{name}") == generation:
+        cache.set(key, result)
+    return result
+
+async def invalidate_dashboards(*names):
+    state = get_shared_state()
+    for name in names:
+        await state.incr(f"dashboard:{name}")
+        _caches[name].clear()
+    metrics.inc("dashboard_cache_invalidations")
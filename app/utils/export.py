@@ -1,55 +1,183 @@
 
 import pandas as pd
+import numpy as np
+import xlsxwriter
+import asyncio
+import csv
+import html
+import io
+import itertools
 import os
 import uuid
 
+# Columns of the flat metric-per-row export
+EXPORT_COLUMNS = [
+    "FY", "Quarter", "Week Date", "Metric Name", "Value",
+    "Baseline", "Target", "Unit", "Status", "Comment"
+]
+
+# Only the fields export rows are built from
+EXPORT_PROJECTION = {
+    "_id": 0, "fy": 1, "quarter": 1, "week_date": 1,
+    "metrics.name": 1, "metrics.value": 1, "metrics.baseline": 1, "metrics.target": 1,
+    "metrics.unit": 1, "metrics.status": 1, "metrics.comment": 1
+}
+
+# Display labels and cell colours of metric statuses in Excel reports
+STATUS_LABELS = {
+    "green": "Green (Target Achieved)",
+    "amber": "Amber (Above Baseline)",
+    "red": "Red (Below Baseline)"
+}
+STATUS_COLOURS = {
+    "green": {'bg_color': '#C6EFCE', 'font_color': '#006100'},
+    "amber": {'bg_color': '#FFEB9C', 'font_color': '#9C5700'},
+    "red": {'bg_color': '#FFC7CE', 'font_color': '#9C0006'}
+}
+
+def iter_export_rows(report):
+    """Yield one export row (ordered as EXPORT_COLUMNS) per metric of a weekly report"""
+    for metric in report["metrics"]:
+        yield [
+            report["fy"],
+            report["quarter"],
+            report["week_date"],
+            metric["name"],
+            metric["value"],
+            metric["baseline"],
+            metric["target"],
+            metric["unit"],
+            metric.get("status", ""),
+            metric.get("comment", "")
+        ]
+
+async def iter_csv_chunks(cursor, rows_per_chunk=1000):
+    """Yield the CSV export of the weekly reports in `cursor` as text chunks.
+
+    Only one chunk of rows is held at a time, so memory stays flat however
+    many reports the cursor returns.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    writer.writerow(EXPORT_COLUMNS)
+    pending = 0
+    async for report in cursor:
+        for row in iter_export_rows(report):
+            writer.writerow(row)
+            pending += 1
+            if pending >= rows_per_chunk:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+                pending = 0
+    yield buffer.getvalue()
+
+async def write_csv_report(cursor, file_path):
+    """Stream the CSV export of the weekly reports in `cursor` to `file_path`.
+
+    The file is opened, written and closed on worker threads, so slow disk
+    I/O never blocks the event loop between chunks.
+    """
+    f = await asyncio.to_thread(open, file_path, "w", newline="")
+    try:
+        async for chunk in iter_csv_chunks(cursor):
+            await asyncio.to_thread(f.write, chunk)
+    finally:
+        await asyncio.to_thread(f.close)
+
+def _chunks(rows, size):
+    rows = iter(rows)
+    while True:
+        chunk = list(itertools.islice(rows, size))
+        if not chunk:
+            return
+        yield chunk
+
+def write_xlsx_report(rows, file_path, columns=EXPORT_COLUMNS, status_labels=None, password=None, chunk_size=5000):
+    """Stream `rows` (lists ordered as `columns`) into an .xlsx file in constant memory.
+
+    xlsxwriter's constant_memory mode flushes each row to disk as it is written,
+    so only one chunk of rows is held at a time. Column widths are sized per
+    chunk with vectorized string lengths, and the status colours are
+    conditional formats over the status column instead of per-cell formats.
+    `status_labels` optionally maps raw status values to display labels.
+    """
+    workbook = xlsxwriter.Workbook(file_path, {"constant_memory": True})
+    worksheet = workbook.add_worksheet("Report")
+    
+    header_format = workbook.add_format({
+        'bold': True,
+        'bg_color': '#D3D3D3',
+        'border': 1
+    })
+    worksheet.write_row(0, 0, columns, header_format)
+    
+    status_col = columns.index("Status") if "Status" in columns else None
+    widths = np.array([len(str(col)) for col in columns])
+    row_num = 1
+    for chunk in _chunks(rows, chunk_size):
+        if status_col is not None and status_labels:
+            for row in chunk:
+                row[status_col] = status_labels.get(row[status_col], row[status_col])
+        widths = np.maximum(widths, np.char.str_len(np.array(chunk, dtype=str)).max(axis=0))
+        for row in chunk:
+            worksheet.write_row(row_num, 0, row)
+            row_num += 1
+    
+    # Auto-fit columns
+    for i, width in enumerate(widths):
+        worksheet.set_column(i, i, int(width) + 2)
+    
+    # Status cell colours
+    if status_col is not None and row_num > 1:
+        for status, colours in STATUS_COLOURS.items():
+            label = status_labels.get(status, status) if status_labels else status
+            worksheet.conditional_format(1, status_col, row_num - 1, status_col, {
+                'type': 'cell',
+                'criteria': '==',
+                'value': f'"{label}"',
+                'format': workbook.add_format({**colours, 'border': 1})
+            })
+    
+    if password:
+        worksheet.protect(password, options={'format_cells': True})
+    workbook.close()
+
+# The "pdf" export format is served as a printable HTML page
+HTML_EXPORT_HEAD = """<!DOCTYPE html>
+<html>
+<head>
+<meta charset="UTF-8">
+<title>Metrics Report</title>
+<style>
+table { border-collapse: collapse; }
+th, td { font-size: 10pt; border: 1px solid black; padding: 2px 4px; }
+</style>
+</head>
+<body>
+<table>
+"""
+HTML_EXPORT_TAIL = "</tbody>\n</table>\n</body>\n</html>\n"
+
+def _html_cell(value):
+    if value is None or (isinstance(value, float) and np.isnan(value)):
+        return ""
+    return html.escape(str(value))
+
+def write_html_export(rows, file_path):
+    """Write the export rows as an HTML table, a row at a time"""
+    with open(file_path, 'w', encoding='utf-8') as f:
+        f.write(HTML_EXPORT_HEAD)
+        f.write("<thead><tr>" + "".join(f"<th>{html.escape(col)}</th>" for col in EXPORT_COLUMNS) + "</tr></thead>\n<tbody>\n")
+        for row in rows:
+            f.write("<tr>" + "".join(f"<td>{_html_cell(value)}</td>" for value in row) + "</tr>\n")
+        f.write(HTML_EXPORT_TAIL)
+
 def create_excel_report(data, file_path):
     """Create formatted Excel report with appropriate column widths and styling"""
-    df = pd.DataFrame(data)
-    
-    with pd.ExcelWriter(file_path, engine='xlsxwriter') as writer:
-        df.to_excel(writer, sheet_name='Report', index=False)
-        
-        # Get workbook and worksheet objects
-        workbook = writer.book
-        worksheet = writer.sheets['Report']
-        
-        # Add formats
-        header_format = workbook.add_format({
-            'bold': True,
-            'bg_color': '#D3D3D3',
-            'border': 1
-        })
-        
-        # Status cell formats
-        green_format = workbook.add_format({'bg_color': '#C6EFCE', 'font_color': '#006100', 'border': 1})
-        amber_format = workbook.add_format({'bg_color': '#FFEB9C', 'font_color': '#9C5700', 'border': 1})
-        red_format = workbook.add_format({'bg_color': '#FFC7CE', 'font_color': '#9C0006', 'border': 1})
-        
-        # Format headers
-        for col_num, value in enumerate(df.columns.values):
-            worksheet.write(0, col_num, value, header_format)
-        
-        # Format status column if it exists
-        if 'Status' in df.columns:
-            status_col_idx = df.columns.get_loc('Status')
-            
-            # Apply conditional formatting
-            for row_num, status in enumerate(df['Status'], 1):
-                if status == 'green':
-                    worksheet.write(row_num, status_col_idx, 'Green (Target Achieved)', green_format)
-                elif status == 'amber':
-                    worksheet.write(row_num, status_col_idx, 'Amber (Above Baseline)', amber_format)
-                elif status == 'red':
-                    worksheet.write(row_num, status_col_idx, 'Red (Below Baseline)', red_format)
-        
-        # Auto-fit columns
-        for i, col in enumerate(df.columns):
-            max_len = max(df[col].astype(str).apply(len).max(), len(str(col))) + 2
-            worksheet.set_column(i, i, max_len)
-            
-        # Add sheet protection
-        worksheet.protect('password123', options={'format_cells': True})
+    columns = list(data[0].keys()) if data else []
+    rows = ([record.get(col) for col in columns] for record in data)
+    write_xlsx_report(rows, file_path, columns, status_labels=STATUS_LABELS, password='password123')
 
 def create_pdf_report(data, file_path):
     """Create PDF report with proper formatting (this is a placeholder)"""
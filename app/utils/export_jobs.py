@@ -0,0 +1,301 @@
+import asyncio
+import hashlib
+import json
+import multiprocessing
+import os
+import uuid
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+from bson import ObjectId
+from fastapi import HTTPException, status
+from pymongo import MongoClient
+from app.db.mongodb import MONGO_URI, export_jobs_collection
+from app.utils.export import (
+    EXPORT_PROJECTION, iter_export_rows, write_xlsx_report, write_html_export
+)
+
+# Worker processes building export files; this is also the cap on exports running at once
+EXPORT_WORKERS = int(os.environ.get("EXPORT_WORKERS", "2"))
+# Queued + running exports allowed per API process, and per user
+EXPORT_QUEUE_LIMIT = int(os.environ.get("EXPORT_QUEUE_LIMIT", "20"))
+EXPORT_USER_QUEUE_LIMIT = int(os.environ.get("EXPORT_USER_QUEUE_LIMIT", "3"))
+# The API process owning a queued or running job refreshes its heartbeat_at this
+# often; a job whose heartbeat is older than EXPORT_JOB_STALE_SECONDS lost its
+# process (restart, crash) and counts as failed
+EXPORT_HEARTBEAT_SECONDS = int(os.environ.get("EXPORT_HEARTBEAT_SECONDS", "30"))
+EXPORT_JOB_STALE_SECONDS = int(os.environ.get("EXPORT_JOB_STALE_SECONDS", "120"))
+
+UNFINISHED_STATUSES = ["queued", "running"]
+INTERRUPTED_ERROR = "Export was interrupted, please request it again"
+
+# Formats built in the background, with the extension and writer of the file they produce
+JOB_WRITERS = {
+    "excel": ("xlsx", write_xlsx_report),
+    "xlsx": ("xlsx", write_xlsx_report),
+    "pdf": ("html", write_html_export),
+}
+
+# Reports read between two progress updates of a running job
+PROGRESS_INTERVAL = 200
+
+_export_pool = None
+_worker_client = None
+# Tasks awaiting the pool, kept referenced so they aren't garbage collected mid-run
+_job_tasks = set()
+_active_jobs = Counter()
+
+def export_extension(export_format):
+    """Extension of the file an export format produces (formats sharing one share files)"""
+    if export_format == "csv":
+        return "csv"
+    return JOB_WRITERS[export_format][0]
+
+def export_cache_key(query, export_format, data_version):
+    """Content address of an export: same filter, file type and data version, same file"""
+    payload = json.dumps(
+        {"query": query, "extension": export_extension(export_format), "version": data_version},
+        sort_keys=True
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+def stale_cutoff():
+    return datetime.utcnow() - timedelta(seconds=EXPORT_JOB_STALE_SECONDS)
+
+def is_stale(job):
+    """Whether `job` is queued or running without a live process behind it"""
+    heartbeat = job.get("heartbeat_at") or job["created_at"]
+    return job["status"] in UNFINISHED_STATUSES and heartbeat < stale_cutoff()
+
+async def fail_stale_export_jobs():
+    """Mark queued/running jobs whose process went away as failed; returns how many"""
+    result = await export_jobs_collection.update_many(
+        {
+            "status": {"$in": UNFINISHED_STATUSES},
+            "$or": [
+                {"heartbeat_at": {"$lt": stale_cutoff()}},
+                {"heartbeat_at": {"$exists": False}, "created_at": {"$lt": stale_cutoff()}}
+            ]
+        },
+        {"$set": {
+            "status": "failed",
+            "error": INTERRUPTED_ERROR,
+            "finished_at": datetime.utcnow(),
+            "last_accessed_at": datetime.utcnow()
+        }}
+    )
+    return result.modified_count
+
+def get_export_dir():
+    export_dir = os.environ.get("EXPORT_DIR", "./exports")
+    os.makedirs(export_dir, exist_ok=True)
+    return export_dir
+
+def get_export_pool():
+    global _export_pool
+    if _export_pool is None:
+        # spawn, not fork: the API process holds Mongo client threads that must not be forked
+        _export_pool = ProcessPoolExecutor(
+            max_workers=EXPORT_WORKERS,
+            mp_context=multiprocessing.get_context("spawn")
+        )
+    return _export_pool
+
+def shutdown_export_pool():
+    global _export_pool
+    if _export_pool is not None:
+        _export_pool.shutdown(wait=False, cancel_futures=True)
+        _export_pool = None
+
+def _worker_db():
+    # Worker processes have no event loop, so they use a plain pymongo client
+    global _worker_client
+    if _worker_client is None:
+        _worker_client = MongoClient(MONGO_URI)
+    return _worker_client.metrics_tracking
+
+def build_export_file(job_id, query, export_format, file_path):
+    """Build one export file. Runs in a worker process of the export pool."""
+    db = _worker_db()
+    job_filter = {"_id": ObjectId(job_id)}
+    db.export_jobs.update_one(job_filter, {"$set": {"status": "running", "started_at": datetime.utcnow()}})
+
+    total = max(db.weekly_reports.count_documents(query), 1)
+    cursor = db.weekly_reports.find(query, EXPORT_PROJECTION).batch_size(500)
+
+    def rows():
+        # Rows are streamed into the writer, reporting progress as reports are read
+        for done, report in enumerate(cursor, 1):
+            yield from iter_export_rows(report)
+            if done % PROGRESS_INTERVAL == 0:
+                db.export_jobs.update_one(job_filter, {"$set": {"progress": round(0.99 * done / total, 2)}})
+
+    _, writer = JOB_WRITERS[export_format]
+    writer(rows(), file_path)
+
+async def _heartbeat(job_id):
+    try:
+        await export_jobs_collection.update_one({"_id": job_id}, {"$set": {"heartbeat_at": datetime.utcnow()}})
+    except Exception as e:
+        # A missed heartbeat only matters if they keep failing; the build goes on
+        print(f"⚠️ Export job heartbeat failed: {e}")
+
+async def _run_export_job(job_id, owner, query, export_format, file_path, file_url):
+    loop = asyncio.get_running_loop()
+    build = loop.run_in_executor(
+        get_export_pool(), build_export_file, str(job_id), query, export_format, file_path
+    )
+    cancelled = False
+    try:
+        while True:
+            try:
+                await asyncio.wait_for(asyncio.shield(build), EXPORT_HEARTBEAT_SECONDS)
+                break
+            except asyncio.TimeoutError:
+                await _heartbeat(job_id)
+    except asyncio.CancelledError:
+        # Shutdown: the task was cancelled, or the pool dropped the queued build
+        build.cancel()
+        cancelled = True
+        update = {"status": "failed", "error": "Export was cancelled by a server shutdown, please request it again"}
+    except Exception as e:
+        update = {"status": "failed", "error": str(e) or type(e).__name__}
+    else:
+        update = {
+            "status": "completed",
+            "progress": 1.0,
+            "url": file_url,
+            "size_bytes": os.path.getsize(file_path)
+        }
+    finally:
+        _active_jobs[owner] -= 1
+        if _active_jobs[owner] <= 0:
+            del _active_jobs[owner]
+
+    if update["status"] == "failed":
+        # Never served; don't leave a partial file for the sweeper
+        try:
+            os.remove(file_path)
+        except OSError:
+            pass
+    update["finished_at"] = update["last_accessed_at"] = datetime.utcnow()
+    await export_jobs_collection.update_one({"_id": job_id}, {"$set": update})
+    if cancelled:
+        raise asyncio.CancelledError()
+
+async def cancel_export_jobs():
+    """Cancel this process's export jobs, waiting until each has recorded its status"""
+    tasks = list(_job_tasks)
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+async def find_cached_export(cache_key, owner):
+    """Latest job building or holding the export for `cache_key`, shared with `owner`.
+
+    Completed jobs only count while their file is still on disk, queued and
+    running ones while their process is alive.
+    """
+    job = await export_jobs_collection.find_one(
+        {
+            "cache_key": cache_key,
+            "$or": [
+                {"status": "completed"},
+                {"status": {"$in": UNFINISHED_STATUSES}, "heartbeat_at": {"$gte": stale_cutoff()}}
+            ]
+        },
+        sort=[("created_at", -1)]
+    )
+    if not job:
+        return None
+    if job["status"] == "completed" and not os.path.exists(os.path.join(get_export_dir(), job["file_name"])):
+        return None
+
+    # A cache hit counts as an access, keeping the file from expiring
+    await export_jobs_collection.update_one(
+        {"_id": job["_id"]},
+        {"$addToSet": {"requested_by": owner}, "$set": {"last_accessed_at": datetime.utcnow()}}
+    )
+    return job
+
+async def enqueue_export_job(owner, query, export_format, cache_key):
+    """Queue an export file build on the worker pool and return its job document"""
+    if sum(_active_jobs.values()) >= EXPORT_QUEUE_LIMIT:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many exports in progress, please try again shortly"
+        )
+    if _active_jobs[owner] >= EXPORT_USER_QUEUE_LIMIT:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail=f"You already have {EXPORT_USER_QUEUE_LIMIT} exports in progress"
+        )
+
+    # Download URLs aren't authenticated, so file names stay unguessable
+    file_name = f"report_{uuid.uuid4()}.{export_extension(export_format)}"
+    now = datetime.utcnow()
+    job = {
+        "owner": owner,
+        "requested_by": [owner],
+        "format": export_format,
+        "query": query,
+        "cache_key": cache_key,
+        "file_name": file_name,
+        "status": "queued",
+        "progress": 0.0,
+        "url": None,
+        "error": None,
+        "created_at": now,
+        "heartbeat_at": now,
+        "finished_at": None
+    }
+    result = await export_jobs_collection.insert_one(job)
+    job["_id"] = result.inserted_id
+
+    _active_jobs[owner] += 1
+    task = asyncio.create_task(_run_export_job(
+        job["_id"], owner, query, export_format,
+        os.path.join(get_export_dir(), file_name), f"/downloads/{file_name}"
+    ))
+    _job_tasks.add(task)
+    task.add_done_callback(_job_tasks.discard)
+    return job
+
+async def record_export_job(owner, query, export_format, cache_key, file_name):
+    """Store a job document for an export that was built inline and is already complete"""
+    now = datetime.utcnow()
+    job = {
+        "owner": owner,
+        "requested_by": [owner],
+        "format": export_format,
+        "query": query,
+        "cache_key": cache_key,
+        "file_name": file_name,
+        "status": "completed",
+        "progress": 1.0,
+        "url": f"/downloads/{file_name}",
+        "error": None,
+        "size_bytes": os.path.getsize(os.path.join(get_export_dir(), file_name)),
+        "created_at": now,
+        "finished_at": now,
+        "last_accessed_at": now
+    }
+    result = await export_jobs_collection.insert_one(job)
+    job["_id"] = result.inserted_id
+    return job
+
+def serialize_export_job(job):
+    status, error = job["status"], job.get("error")
+    if is_stale(job):
+        # Not yet marked by the sweeper, but nothing is building it any more
+        status, error = "failed", INTERRUPTED_ERROR
+    return {
+        "id": str(job["_id"]),
+        "status": status,
+        "progress": job.get("progress", 0.0),
+        "format": job["format"],
+        "url": job.get("url"),
+        "error": error,
+        "created_at": job["created_at"],
+        "finished_at": job.get("finished_at")
+    }
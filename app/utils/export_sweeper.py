@@ -0,0 +1,137 @@
+"""
+Export directory lifecycle.
+
+Completed export files are tracked on their export_jobs documents (file name,
+size, owner, created / last accessed / last downloaded). A background sweeper
+marks jobs whose process went away as failed, expires completed and failed
+jobs not accessed within EXPORT_TTL_SECONDS, then evicts least recently
+accessed files until the directory fits in EXPORT_QUOTA_MB. Those passes work
+off the job metadata; a last pass lists the directory (in a thread) for files
+past the TTL that no live job tracks.
+"""
+import asyncio
+import os
+import time
+from datetime import datetime, timedelta
+from fastapi.staticfiles import StaticFiles
+from app.db.mongodb import export_jobs_collection
+from app.utils import metrics
+from app.utils.export_jobs import get_export_dir, fail_stale_export_jobs
+
+EXPORT_TTL_SECONDS = int(os.environ.get("EXPORT_TTL_SECONDS", "86400"))
+EXPORT_QUOTA_BYTES = int(os.environ.get("EXPORT_QUOTA_MB", "1024")) * 1024 * 1024
+EXPORT_SWEEP_INTERVAL_SECONDS = int(os.environ.get("EXPORT_SWEEP_INTERVAL_SECONDS", "300"))
+
+async def _evict(jobs, reason):
+    """Delete the files of `jobs` and mark them expired; returns the bytes freed"""
+    freed = 0
+    for job in jobs:
+        try:
+            os.remove(os.path.join(get_export_dir(), job["file_name"]))
+        except FileNotFoundError:
+            pass
+        freed += job.get("size_bytes", 0)
+
+    if jobs:
+        await export_jobs_collection.update_many(
+            {"_id": {"$in": [job["_id"] for job in jobs]}},
+            {"$set": {"status": "expired", "url": None, "expired_at": datetime.utcnow()}}
+        )
+        metrics.inc(f"exports_evicted_{reason}", len(jobs))
+        metrics.inc("exports_evicted_bytes", freed)
+    return freed
+
+async def sweep_exports():
+    """Expire export files past their TTL, then evict the oldest until under the quota"""
+    started = time.perf_counter()
+    # Jobs left queued/running by a process that went away (restart, crash)
+    metrics.inc("export_jobs_interrupted", await fail_stale_export_jobs())
+
+    live_files = {"status": "completed", "file_name": {"$ne": None}}
+    projection = {"file_name": 1, "size_bytes": 1}
+
+    # TTL, counted from the last download (or cache hit) rather than creation;
+    # failed jobs expire the same way, with any partial file they left
+    cutoff = datetime.utcnow() - timedelta(seconds=EXPORT_TTL_SECONDS)
+    expired = await export_jobs_collection.find(
+        {
+            "status": {"$in": ["completed", "failed"]},
+            "file_name": {"$ne": None},
+            "last_accessed_at": {"$lt": cutoff}
+        },
+        projection
+    ).to_list(length=None)
+    await _evict(expired, "ttl")
+
+    # Quota, least recently accessed first
+    totals = await export_jobs_collection.aggregate([
+        {"$match": live_files},
+        {"$group": {"_id": None, "bytes": {"$sum": "$size_bytes"}, "files": {"$sum": 1}}}
+    ]).to_list(length=None)
+    total_bytes = totals[0]["bytes"] if totals else 0
+    total_files = totals[0]["files"] if totals else 0
+
+    if total_bytes > EXPORT_QUOTA_BYTES:
+        over_quota = []
+        excess = total_bytes - EXPORT_QUOTA_BYTES
+        async for job in export_jobs_collection.find(live_files, projection).sort("last_accessed_at", 1):
+            over_quota.append(job)
+            excess -= job.get("size_bytes", 0)
+            if excess <= 0:
+                break
+        total_bytes -= await _evict(over_quota, "quota")
+        total_files -= len(over_quota)
+
+    metrics.inc("export_sweeps")
+    metrics.set_gauge("export_files", total_files)
+    metrics.set_gauge("export_bytes", total_bytes)
+    metrics.set_gauge("export_sweep_seconds", round(time.perf_counter() - started, 3))
+
+def _remove_untracked(export_dir, tracked, cutoff):
+    removed = 0
+    with os.scandir(export_dir) as entries:
+        for entry in entries:
+            if entry.is_file() and entry.name not in tracked and entry.stat().st_mtime < cutoff:
+                try:
+                    os.remove(entry.path)
+                except FileNotFoundError:
+                    continue
+                removed += 1
+    return removed
+
+async def sweep_untracked_exports():
+    """Remove files past the TTL that no live job tracks (failed builds, exports from before tracking)"""
+    tracked = set(await export_jobs_collection.distinct(
+        "file_name", {"status": {"$in": ["queued", "running", "completed"]}}
+    ))
+    cutoff = time.time() - EXPORT_TTL_SECONDS
+    removed = await asyncio.to_thread(_remove_untracked, get_export_dir(), tracked, cutoff)
+    metrics.inc("exports_evicted_untracked", removed)
+
+async def run_export_sweeper():
+    """Background task: sweep the exports directory every EXPORT_SWEEP_INTERVAL_SECONDS"""
+    while True:
+        try:
+            await sweep_exports()
+            await sweep_untracked_exports()
+        except Exception as e:
+            metrics.inc("export_sweep_errors")
+            print(f"⚠️ Export sweep failed: {e}")
+        await asyncio.sleep(EXPORT_SWEEP_INTERVAL_SECONDS)
+
+async def record_export_download(file_name):
+    now = datetime.utcnow()
+    await export_jobs_collection.update_one(
+        {"file_name": file_name},
+        {"$set": {"last_downloaded_at": now, "last_accessed_at": now}, "$inc": {"downloads": 1}}
+    )
+
+class ExportFiles(StaticFiles):
+    """Static export downloads that record each successful download on the file's job"""
+
+    async def get_response(self, path, scope):
+        response = await super().get_response(path, scope)
+        if response.status_code == 200:
+            await record_export_download(os.path.basename(path))
+            metrics.inc("export_downloads")
+        return response
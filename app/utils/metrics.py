@@ -0,0 +1,16 @@
+"""
+In-process metrics: named counters and gauges, served as JSON from /metrics.
+"""
+from collections import Counter
+
+_counters = Counter()
+_gauges = {}
+
+def inc(name, value=1):
+    _counters[name] += value
+
+def set_gauge(name, value):
+    _gauges[name] = value
+
+def snapshot():
+    return {"counters": dict(_counters), "gauges": dict(_gauges)}
@@ -0,0 +1,219 @@
+"""
+Token-bucket rate limiting.
+
+Each key (client IP, user and/or GraphQL operation, see RATE_LIMIT_KEYS) has a
+bucket of RATE_LIMIT_CAPACITY tokens refilled continuously at
+RATE_LIMIT_PER_MINUTE tokens a minute; a request spends its cost in tokens or
+is rejected. Unlike a fixed window there is no burst at window edges. Buckets
+live in an LRU bounded to RATE_LIMIT_MAX_KEYS, so a scan from many addresses
+cannot grow memory: the least recently seen keys are dropped, which at worst
+hands a forgotten client a full bucket again.
+
+With a shared state backend (see app/utils/shared_state.py) the budget is
+enforced across all workers with SlidingWindowLimiter instead.
+"""
+import hashlib
+import json
+import os
+import time
+from collections import OrderedDict
+from graphql import (
+    FieldNode, FragmentDefinitionNode, FragmentSpreadNode, GraphQLError, InlineFragmentNode,
+    OperationDefinitionNode, parse
+)
+from jose import JWTError, jwt
+from app.auth import ALGORITHM, SECRET_KEY, get_bearer_token
+from app.utils.shared_state import get_shared_state, is_shared
+
+RATE_LIMIT_PER_MINUTE = float(os.environ.get("RATE_LIMIT_PER_MINUTE", "100"))
+RATE_LIMIT_CAPACITY = float(os.environ.get("RATE_LIMIT_CAPACITY", str(RATE_LIMIT_PER_MINUTE)))
+RATE_LIMIT_MAX_KEYS = int(os.environ.get("RATE_LIMIT_MAX_KEYS", "10000"))
+# Comma separated parts of the bucket key: "ip", "user" and/or "operation"
+RATE_LIMIT_KEYS = tuple(
+    part.strip() for part in os.environ.get("RATE_LIMIT_KEYS", "ip").split(",") if part.strip()
+)
+
+# Tokens a GraphQL root field costs; fields not listed cost DEFAULT_FIELD_COST
+FIELD_COSTS = {
+    "exportReport": 20,
+    "adminDashboardStats": 5,
+    "userDashboardStats": 5,
+    "serviceMetricDashboard": 3,
+    "quarterlyReports": 3,
+    "passwordsExpiring": 2,
+}
+DEFAULT_FIELD_COST = 1
+# Parsed documents whose cost is remembered, keyed by a digest of the document
+OPERATION_COST_CACHE_SIZE = 1024
+
+class TokenBucket:
+    __slots__ = ("tokens", "updated_at")
+
+    def __init__(self, tokens, updated_at):
+        self.tokens = tokens
+        self.updated_at = updated_at
+
+class RateLimiter:
+    def __init__(self, capacity=RATE_LIMIT_CAPACITY, per_minute=RATE_LIMIT_PER_MINUTE, max_keys=RATE_LIMIT_MAX_KEYS):
+        self.capacity = capacity
+        self.rate = per_minute / 60
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()
+
+    async def acquire(self, key, cost=1):
+        """Spend `cost` tokens from `key`'s bucket.
+
+        Returns 0 when allowed, otherwise the seconds until enough tokens are back.
+        """
+        now = time.monotonic()
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = TokenBucket(self.capacity, now)
+            self._buckets[key] = bucket
+            if len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(key)
+            bucket.tokens = min(self.capacity, bucket.tokens + (now - bucket.updated_at) * self.rate)
+            bucket.updated_at = now
+
+        # A request costing more than the capacity is charged the whole bucket
+        cost = min(cost, self.capacity)
+        if bucket.tokens >= cost:
+            bucket.tokens -= cost
+            return 0
+        return (cost - bucket.tokens) / self.rate
+
+    def __len__(self):
+        return len(self._buckets)
+
+class SlidingWindowLimiter:
+    """The same budget as RateLimiter, kept in shared state so all workers draw on it.
+
+    A bucket refills in `capacity / rate` seconds; usage is counted per window
+    of that length, with the previous window weighted by how much of it still
+    overlaps the last `window` seconds. Shared backends only need atomic
+    counters for this, and it likewise has no burst at window edges.
+    """
+
+    def __init__(self, state, capacity=RATE_LIMIT_CAPACITY, per_minute=RATE_LIMIT_PER_MINUTE):
+        self.state = state
+        self.capacity = capacity
+        self.window = capacity / (per_minute / 60)
+
+    async def acquire(self, key, cost=1):
+        cost = min(cost, self.capacity)
+        position = time.time() / self.window
+        window = int(position)
+        elapsed = position - window
+        current, previous = await self.state.hit(key, window, cost, ttl=2 * self.window)
+        used = previous * (1 - elapsed) + current
+        if used <= self.capacity:
+            return 0
+
+        # Rejected requests do not count against the budget
+        await self.state.hit(key, window, -cost, ttl=2 * self.window)
+        current -= cost
+        if previous and current + cost <= self.capacity:
+            # Wait until enough of the previous window has slid out
+            return max((1 - (self.capacity - current - cost) / previous - elapsed) * self.window, 0.001)
+        return (1 - elapsed) * self.window
+
+def get_rate_limiter():
+    """Token buckets in this process, or a sliding window in shared state (see SHARED_STATE_BACKEND)"""
+    if is_shared():
+        return SlidingWindowLimiter(get_shared_state())
+    return RateLimiter()
+
+def _root_fields(selection_set, fragments, seen=()):
+    """Names of the root fields selected, through inline fragments and fragment spreads"""
+    for selection in selection_set.selections:
+        if isinstance(selection, FieldNode):
+            yield selection.name.value
+        elif isinstance(selection, InlineFragmentNode):
+            yield from _root_fields(selection.selection_set, fragments, seen)
+        elif isinstance(selection, FragmentSpreadNode):
+            name = selection.name.value
+            if name in fragments and name not in seen:
+                yield from _root_fields(fragments[name].selection_set, fragments, (*seen, name))
+
+def _operation_cost(query, operation_name):
+    try:
+        document = parse(query)
+    except GraphQLError:
+        return "invalid", DEFAULT_FIELD_COST
+
+    operations = []
+    fragments = {}
+    for definition in document.definitions:
+        if isinstance(definition, OperationDefinitionNode):
+            operations.append(definition)
+        elif isinstance(definition, FragmentDefinitionNode):
+            fragments[definition.name.value] = definition
+    if operation_name:
+        operations = [op for op in operations if op.name and op.name.value == operation_name]
+    if not operations:
+        return "invalid", DEFAULT_FIELD_COST
+
+    fields = [
+        field for field in _root_fields(operations[0].selection_set, fragments)
+        if not field.startswith("__")
+    ]
+    label = ",".join(sorted(set(fields))) or "anonymous"
+    cost = sum(FIELD_COSTS.get(field, DEFAULT_FIELD_COST) for field in fields)
+    return label, max(cost, DEFAULT_FIELD_COST)
+
+_operation_costs = OrderedDict()
+
+def operation_cost(query, operation_name=None):
+    """(operation label, token cost) of a GraphQL document.
+
+    The label is the sorted root fields of the operation being run, never the
+    client's operation name, so renaming an operation does not get it a fresh
+    budget. The cost is the sum of FIELD_COSTS over those root fields;
+    documents that do not parse cost DEFAULT_FIELD_COST and are left for the
+    GraphQL server to reject. Results are cached by a digest of the document,
+    so the cache holds no query text.
+    """
+    key = hashlib.blake2b(query.encode(), digest_size=16)
+    key.update(b"\0" + (operation_name or "").encode())
+    key = key.digest()
+    result = _operation_costs.get(key)
+    if result is not None:
+        _operation_costs.move_to_end(key)
+        return result
+
+    result = _operation_cost(query, operation_name)
+    _operation_costs[key] = result
+    if len(_operation_costs) > OPERATION_COST_CACHE_SIZE:
+        _operation_costs.popitem(last=False)
+    return result
+
+def graphql_cost(body):
+    """(operation label, token cost) of a GraphQL request body; batches are summed"""
+    try:
+        payload = json.loads(body)
+    except ValueError:
+        return "invalid", DEFAULT_FIELD_COST
+
+    labels, total = [], 0
+    for request in payload if isinstance(payload, list) else [payload]:
+        if not isinstance(request, dict) or not isinstance(request.get("query"), str):
+            labels.append("invalid")
+            total += DEFAULT_FIELD_COST
+            continue
+        operation_name = request.get("operationName")
+        label, cost = operation_cost(request["query"], operation_name if isinstance(operation_name, str) else None)
+        labels.append(label)
+        total += cost
+    return "+".join(sorted(set(labels))), total or DEFAULT_FIELD_COST
+
+def request_user(request):
+    """Subject of the request's bearer token, without a database lookup; None if absent or invalid"""
+    token = get_bearer_token(request)
+    if token is None:
+        return None
+    try:
+        return jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM]).get("sub")
+    except JWTError:
+        return None
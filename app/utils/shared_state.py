@@ -0,0 +1,259 @@
+"""
+State shared by all API workers: rate limit counters and cache generations.
+
+Under `uvicorn --workers N` every worker is its own process, so per-process
+limiters hand each client N times its budget and per-process caches only see
+their own worker's invalidations. SHARED_STATE_BACKEND selects where that
+state lives:
+
+- "local" (default): in this process only, as before
+- "shared_memory": a fixed-size table in a named shared memory segment,
+  guarded by a lock file; for several workers on one host
+- "mongo": the shared_state collection, updated with atomic $inc and
+  expired by a TTL index; for workers spread over several hosts
+
+Every backend offers the same two primitives: windowed counters (`hit`) for
+rate limiting and monotonic counters (`incr` / `get`) for cache generations.
+To check that a shared backend counts exactly across processes:
+
+    python -m app.utils.shared_state check {shared_memory|mongo}
+"""
+import asyncio
+import fcntl
+import hashlib
+import os
+import struct
+import sys
+import tempfile
+import time
+from contextlib import asynccontextmanager, contextmanager
+from datetime import datetime, timedelta
+from multiprocessing import get_context, resource_tracker, shared_memory
+from pymongo import ReturnDocument
+from app.db.mongodb import shared_state_collection
+
+SHARED_STATE_BACKEND = os.environ.get("SHARED_STATE_BACKEND", "local")
+SHARED_STATE_NAME = os.environ.get("SHARED_STATE_NAME", "report-analytics-hub")
+SHARED_STATE_SLOTS = int(os.environ.get("SHARED_STATE_SLOTS", "65536"))
+# Pause between attempts at the shared memory lock while another worker holds it
+LOCK_RETRY_SECONDS = 0.0005
+
+class LocalState:
+    """Counters in this process only"""
+
+    def __init__(self):
+        self._windows = {}
+        self._counters = {}
+
+    async def hit(self, key, window, amount, ttl):
+        """Add `amount` to `key`'s counter for `window`; returns (this window, previous window)"""
+        windows = self._windows.setdefault(key, {})
+        windows[window] = windows.get(window, 0) + amount
+        for old in [w for w in windows if w < window - 1]:
+            del windows[old]
+        return windows[window], windows.get(window - 1, 0)
+
+    async def incr(self, key):
+        self._counters[key] = self._counters.get(key, 0) + 1
+        return self._counters[key]
+
+    async def get(self, key):
+        return self._counters.get(key, 0)
+
+class SharedMemoryState:
+    """Counters in an open-addressed hash table in shared memory.
+
+    Each slot is (key hash, expiry, value). A key is looked up in at most
+    MAX_PROBES slots from its hash; expired slots are reused and, when all of
+    them are live, the one expiring soonest is taken over. Memory is fixed at
+    `slots` * 24 bytes however many keys are seen. Every access holds an
+    exclusive flock, which only lasts a few microseconds; the flock is tried
+    without blocking, yielding to the event loop while another worker holds it.
+    """
+
+    SLOT = struct.Struct("<Qdq")
+    MAX_PROBES = 16
+
+    def __init__(self, name=SHARED_STATE_NAME, slots=SHARED_STATE_SLOTS):
+        self.slots = slots
+        self._lock_file = open(os.path.join(tempfile.gettempdir(), f"{name}.lock"), "a+b")
+        with self._locked():
+            try:
+                # New segments are zero filled, i.e. all slots empty
+                self._shm = shared_memory.SharedMemory(name=name, create=True, size=slots * self.SLOT.size)
+            except FileExistsError:
+                self._shm = shared_memory.SharedMemory(name=name)
+        # The segment outlives any one worker; keep the resource tracker from
+        # unlinking it when the process that created it exits
+        resource_tracker.unregister(self._shm._name, "shared_memory")
+
+    @contextmanager
+    def _locked(self):
+        fcntl.flock(self._lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(self._lock_file, fcntl.LOCK_UN)
+
+    @asynccontextmanager
+    async def _locked_async(self):
+        # No await happens while the lock is held, so coroutines of this process
+        # (which share the lock file) never interleave inside it
+        while True:
+            try:
+                fcntl.flock(self._lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                break
+            except BlockingIOError:
+                await asyncio.sleep(LOCK_RETRY_SECONDS)
+        try:
+            yield
+        finally:
+            fcntl.flock(self._lock_file, fcntl.LOCK_UN)
+
+    @staticmethod
+    def _hash(key):
+        # Python's hash() differs per process; the table needs a stable one
+        return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), "little") or 1
+
+    def _add(self, key, amount, expires_at, now):
+        """Add `amount` to the slot of `key` (creating it) and return the new value; caller holds the lock"""
+        key_hash = self._hash(key)
+        buf = self._shm.buf
+        free = victim = None
+        for probe in range(self.MAX_PROBES):
+            offset = ((key_hash + probe) % self.slots) * self.SLOT.size
+            slot_hash, slot_expires, value = self.SLOT.unpack_from(buf, offset)
+            expired = slot_expires and slot_expires <= now
+            if slot_hash == key_hash:
+                value = (0 if expired else value) + amount
+                self.SLOT.pack_into(buf, offset, key_hash, max(slot_expires, expires_at) if expires_at else 0, value)
+                return value
+            if free is None and (not slot_hash or expired):
+                free = offset
+            if slot_expires and (victim is None or slot_expires < victim[0]):
+                victim = (slot_expires, offset)
+
+        offset = free if free is not None else victim[1] if victim else None
+        if offset is None:
+            # Every probed slot holds a non-expiring counter; count without storing
+            return amount
+        self.SLOT.pack_into(buf, offset, key_hash, expires_at, amount)
+        return amount
+
+    async def hit(self, key, window, amount, ttl):
+        async with self._locked_async():
+            now = time.time()
+            current = self._add(f"{key}:{window}", amount, now + ttl, now)
+            previous = self._add(f"{key}:{window - 1}", 0, now + ttl, now)
+        return current, previous
+
+    async def incr(self, key):
+        async with self._locked_async():
+            return self._add(key, 1, 0, time.time())
+
+    async def get(self, key):
+        async with self._locked_async():
+            return self._add(key, 0, 0, time.time())
+
+class MongoState:
+    """Counters in a collection: one document per key, updated with $inc and expired by TTL"""
+
+    def __init__(self, collection=shared_state_collection):
+        self.collection = collection
+
+    async def hit(self, key, window, amount, ttl):
+        # Windows live in one document per key so a check is a single round trip.
+        # The update is a pipeline that adds to this window, then rebuilds the
+        # window map with only the previous window and newer ones, so no stale
+        # window outlives a gap in traffic.
+        doc = await self.collection.find_one_and_update(
+            {"_id": f"window:{key}"},
+            [
+                {"$set": {
+                    f"windows.{window}": {"$add": [{"$ifNull": [f"$windows.{window}", 0]}, amount]},
+                    "expires_at": {"$max": [
+                        "$expires_at", {"$literal": datetime.utcnow() + timedelta(seconds=ttl)}
+                    ]}
+                }},
+                {"$set": {"windows": {"$arrayToObject": {"$filter": {
+                    "input": {"$objectToArray": "$windows"},
+                    "cond": {"$gte": [{"$toLong": "$$this.k"}, window - 1]}
+                }}}}}
+            ],
+            projection={f"windows.{window}": 1, f"windows.{window - 1}": 1},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        windows = doc.get("windows", {})
+        return windows.get(str(window), 0), windows.get(str(window - 1), 0)
+
+    async def incr(self, key):
+        doc = await self.collection.find_one_and_update(
+            {"_id": f"counter:{key}"},
+            {"$inc": {"value": 1}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        return doc["value"]
+
+    async def get(self, key):
+        doc = await self.collection.find_one({"_id": f"counter:{key}"})
+        return doc["value"] if doc else 0
+
+BACKENDS = {
+    "local": LocalState,
+    "shared_memory": SharedMemoryState,
+    "mongo": MongoState,
+}
+
+_shared_state = None
+
+def get_shared_state():
+    global _shared_state
+    if _shared_state is None:
+        _shared_state = BACKENDS[SHARED_STATE_BACKEND]()
+    return _shared_state
+
+def is_shared():
+    return SHARED_STATE_BACKEND != "local"
+
+# Cross-process check: every worker adds to the same counters, and the totals
+# must come out exact
+CHECK_PROCESSES = 4
+CHECK_ITERATIONS = 500
+
+def _check_worker(backend, key):
+    async def run():
+        state = BACKENDS[backend]()
+        for _ in range(CHECK_ITERATIONS):
+            await state.hit(key, 1, 1, 60)
+            await state.incr(key)
+    asyncio.run(run())
+
+async def _check_totals(backend, key):
+    state = BACKENDS[backend]()
+    current, _ = await state.hit(key, 1, 0, 60)
+    return current, await state.get(key)
+
+def check(backend):
+    key = f"check:{os.getpid()}:{time.time()}"
+    processes = [
+        get_context("spawn").Process(target=_check_worker, args=(backend, key))
+        for _ in range(CHECK_PROCESSES)
+    ]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+
+    expected = CHECK_PROCESSES * CHECK_ITERATIONS
+    window_total, counter_total = asyncio.run(_check_totals(backend, key))
+    print(f"{backend}: windowed counter {window_total}, counter {counter_total}, expected {expected}")
+    return window_total == counter_total == expected
+
+if __name__ == "__main__":
+    shared_backends = [name for name in BACKENDS if name != "local"]
+    if len(sys.argv) != 3 or sys.argv[1] != "check" or sys.argv[2] not in shared_backends:
+        print(f"Usage: python -m app.utils.shared_state check {{{'|'.join(shared_backends)}}}")
+        sys.exit(1)
+    sys.exit(0 if check(sys.argv[2]) else 1)
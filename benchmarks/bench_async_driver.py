@@ -0,0 +1,91 @@
+"""
+Throughput benchmark: blocking pymongo calls vs awaited Motor calls.
+
+Simulates concurrent GraphQL requests that each scan one quarter of weekly
+reports, the way weeklyReports does. With the synchronous driver every query
+blocks the event loop, so requests are effectively served one at a time.
+
+Usage:
+    MONGO_URI=mongodb://localhost:27017 python benchmarks/bench_async_driver.py
+
+Seeds a throwaway database (BENCH_DB, default: metrics_tracking_bench) and
+drops it afterwards.
+"""
+import asyncio
+import os
+import time
+from datetime import datetime
+
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import MongoClient
+
+MONGO_URI = os.environ.get("MONGO_URI", "mongodb://localhost:27017")
+BENCH_DB = os.environ.get("BENCH_DB", "metrics_tracking_bench")
+REPORTS = int(os.environ.get("BENCH_REPORTS", "520"))
+METRICS_PER_REPORT = int(os.environ.get("BENCH_METRICS", "60"))
+CONCURRENCY = int(os.environ.get("BENCH_CONCURRENCY", "50"))
+REQUESTS = int(os.environ.get("BENCH_REQUESTS", "500"))
+
+
+def seed(sync_db):
+    sync_db.weekly_reports.drop()
+    docs = []
+    for i in range(REPORTS):
+        docs.append({
+            "fy": f"FY{20 + i // 52}",
+            "quarter": f"Q{(i % 52) // 13 + 1}",
+            "week_date": f"{(i % 28) + 1:02d}-01-2024",
+            "metrics": [
+                {"metric_id": str(m), "name": f"Metric {m}", "value": float(m), "status": "green"}
+                for m in range(METRICS_PER_REPORT)
+            ],
+            "created_at": datetime.utcnow(),
+        })
+    sync_db.weekly_reports.insert_many(docs)
+
+
+async def run(label, handler):
+    semaphore = asyncio.Semaphore(CONCURRENCY)
+    latencies = []
+
+    async def one(i):
+        async with semaphore:
+            start = time.perf_counter()
+            await handler(i)
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(REQUESTS)))
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    p95 = latencies[int(len(latencies) * 0.95) - 1]
+    print(f"{label:<10} {REQUESTS / elapsed:8.1f} req/s   p95 {p95 * 1000:8.1f} ms")
+
+
+async def main():
+    sync_client = MongoClient(MONGO_URI)
+    async_client = AsyncIOMotorClient(MONGO_URI)
+    sync_db = sync_client[BENCH_DB]
+    async_db = async_client[BENCH_DB]
+    seed(sync_db)
+
+    async def blocking(i):
+        query = {"fy": f"FY{20 + i % 10}", "quarter": f"Q{i % 4 + 1}"}
+        list(sync_db.weekly_reports.find(query))
+
+    async def awaited(i):
+        query = {"fy": f"FY{20 + i % 10}", "quarter": f"Q{i % 4 + 1}"}
+        await async_db.weekly_reports.find(query).to_list(length=None)
+
+    print(f"{REQUESTS} requests, concurrency {CONCURRENCY}, {REPORTS} reports x {METRICS_PER_REPORT} metrics")
+    try:
+        await run("pymongo", blocking)
+        await run("motor", awaited)
+    finally:
+        sync_client.drop_database(BENCH_DB)
+        sync_client.close()
+        async_client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
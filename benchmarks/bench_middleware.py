@@ -0,0 +1,197 @@
+"""
+Throughput benchmark for the HTTP middleware stack.
+
+Sends a trivial GraphQL query (`{ ping }`) through a FastAPI app with the
+GraphQL route and the app's middleware, called directly as an ASGI app so
+only the application side is measured. "before" is the former chain of
+@app.middleware("http") functions (BaseHTTPMiddleware); "after" is the pure
+ASGI stack from app/middleware.py. Both sit on the same CORS/TrustedHost
+middleware and the same (practically unlimited) rate limiter.
+
+Usage:
+    python benchmarks/bench_middleware.py
+
+Needs no database. BENCH_REQUESTS (default: 5000) sets the requests per run;
+log output is written to /dev/null, but still formatted: directly for
+"before", through the access log queue for "after".
+"""
+import asyncio
+import json
+import logging
+import math
+import os
+import sys
+import time
+from typing import Callable
+
+os.environ.setdefault("RATE_LIMIT_PER_MINUTE", "1000000000")
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from ariadne import QueryType, make_executable_schema  # noqa: E402
+from ariadne.asgi import GraphQL  # noqa: E402
+from fastapi import FastAPI, Request  # noqa: E402
+from fastapi.middleware.cors import CORSMiddleware  # noqa: E402
+from fastapi.middleware.trustedhost import TrustedHostMiddleware  # noqa: E402
+from fastapi.responses import JSONResponse  # noqa: E402
+
+from app import middleware  # noqa: E402
+from app.utils import access_log  # noqa: E402
+from app.utils.rate_limit import graphql_cost  # noqa: E402
+
+REQUESTS = int(os.environ.get("BENCH_REQUESTS", "5000"))
+ROUNDS = int(os.environ.get("BENCH_ROUNDS", "3"))
+
+logger = middleware.logger
+
+
+# The former middleware functions, as chained in main.py
+async def legacy_rate_limiting_middleware(request: Request, call_next: Callable):
+    operation, cost = graphql_cost(await request.body())
+    retry_after = await middleware.rate_limiter.acquire(middleware.rate_limit_key(request, operation), cost)
+    if retry_after:
+        return JSONResponse(
+            status_code=429,
+            content={"detail": "Rate limit exceeded. Please try again later."},
+            headers={"Retry-After": str(math.ceil(retry_after))}
+        )
+    return await call_next(request)
+
+
+async def legacy_logging_middleware(request: Request, call_next: Callable):
+    start_time = time.time()
+    logger.info(f"Request: {request.method} {request.url.path}")
+    response = await call_next(request)
+    process_time = time.time() - start_time
+    logger.info(f"Response: {request.method} {request.url.path} - Status: {response.status_code}, Time: {process_time:.4f}s")
+    response.headers["X-Process-Time"] = str(process_time)
+    return response
+
+
+async def legacy_error_handling_middleware(request: Request, call_next: Callable):
+    try:
+        return await call_next(request)
+    except Exception as e:
+        logger.error(f"Unhandled exception: {str(e)}")
+        return JSONResponse(status_code=500, content={"detail": "Internal Server Error"})
+
+
+def build_app(legacy):
+    query = QueryType()
+    query.set_field("ping", lambda *_: "pong")
+    schema = make_executable_schema("type Query { ping: String! }", query)
+
+    app = FastAPI()
+    app.add_middleware(TrustedHostMiddleware, allowed_hosts=["localhost", "127.0.0.1"])
+    app.add_middleware(CORSMiddleware, allow_origins=["*"], allow_credentials=True, allow_methods=["*"], allow_headers=["*"])
+
+    if legacy:
+        @app.middleware("http")
+        async def custom_middleware(request: Request, call_next):
+            async def process_request(request):
+                return await call_next(request)
+            return await legacy_error_handling_middleware(
+                request,
+                lambda req: legacy_rate_limiting_middleware(
+                    req,
+                    lambda req2: legacy_logging_middleware(req2, process_request)
+                )
+            )
+
+        @app.middleware("http")
+        async def block_malicious_requests(request: Request, call_next):
+            url_path = str(request.url.path).lower()
+            if any(pattern in url_path for pattern in middleware.SUSPICIOUS_PATH_PATTERNS):
+                return JSONResponse(status_code=403, content={"detail": "Forbidden"})
+            return await call_next(request)
+
+        @app.middleware("http")
+        async def custom_404_handler(request: Request, call_next):
+            response = await call_next(request)
+            if response.status_code == 404:
+                return JSONResponse(status_code=404, content={"detail": "Not Found"})
+            return response
+    else:
+        app.add_middleware(middleware.LoggingMiddleware)
+        app.add_middleware(middleware.RateLimitMiddleware)
+        app.add_middleware(middleware.ErrorHandlingMiddleware)
+        app.add_middleware(middleware.BlockMaliciousPathsMiddleware)
+        app.add_middleware(middleware.NotFoundMiddleware)
+
+    app.add_route("/graphql", GraphQL(schema))
+    return app
+
+
+BODY = json.dumps({"query": "{ ping }"}).encode()
+SCOPE = {
+    "type": "http",
+    "asgi": {"version": "3.0"},
+    "http_version": "1.1",
+    "method": "POST",
+    "scheme": "http",
+    "path": "/graphql",
+    "raw_path": b"/graphql",
+    "root_path": "",
+    "query_string": b"",
+    "headers": [
+        (b"host", b"localhost"),
+        (b"content-type", b"application/json"),
+        (b"content-length", str(len(BODY)).encode()),
+    ],
+    "client": ("127.0.0.1", 50000),
+    "server": ("localhost", 8000),
+}
+
+
+async def call(app):
+    """One request through the ASGI app; returns (status, body)"""
+    request_sent = False
+    response = {}
+
+    async def receive():
+        nonlocal request_sent
+        if not request_sent:
+            request_sent = True
+            return {"type": "http.request", "body": BODY, "more_body": False}
+        await asyncio.Event().wait()
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            response["status"] = message["status"]
+        elif message["type"] == "http.response.body":
+            response["body"] = response.get("body", b"") + message.get("body", b"")
+
+    await app(dict(SCOPE), receive, send)
+    return response["status"], response["body"]
+
+
+async def measure(label, app):
+    status, body = await call(app)
+    assert status == 200 and json.loads(body) == {"data": {"ping": "pong"}}, (status, body)
+
+    best = None
+    for _ in range(ROUNDS):
+        start = time.perf_counter()
+        for _ in range(REQUESTS):
+            await call(app)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    print(f"{label:<7} {REQUESTS / best:8.0f} req/s   {best / REQUESTS * 1e6:7.1f} us/request")
+
+
+async def main():
+    devnull = open(os.devnull, "w")
+    # before: records written on the event loop, as with logging.basicConfig;
+    # after: the queue handler set up by app.middleware, its listener writing
+    queue_handlers = logging.root.handlers
+    for handler in access_log._listener.handlers:
+        handler.setStream(devnull)
+
+    print(f"{REQUESTS} requests per round, best of {ROUNDS} rounds")
+    logging.root.handlers = [logging.StreamHandler(devnull)]
+    await measure("before", build_app(legacy=True))
+    logging.root.handlers = queue_handlers
+    await measure("after", build_app(legacy=False))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,120 @@
+"""
+Latency benchmark for weeklyReport's quarter_actual computation.
+
+"before" mirrors the former resolver: one metric lookup plus one full quarter
+scan per metric. "after" mirrors the current one: one batched metric lookup
+and a single projected pass over the quarter's reports.
+
+Usage:
+    MONGO_URI=mongodb://localhost:27017 python benchmarks/bench_quarter_actuals.py
+
+Seeds a throwaway database (BENCH_DB, default: metrics_tracking_bench) with
+13 weekly reports x 100 metrics and drops it afterwards.
+"""
+import asyncio
+import os
+import statistics
+import time
+
+from motor.motor_asyncio import AsyncIOMotorClient
+
+MONGO_URI = os.environ.get("MONGO_URI", "mongodb://localhost:27017")
+BENCH_DB = os.environ.get("BENCH_DB", "metrics_tracking_bench")
+WEEKS = int(os.environ.get("BENCH_WEEKS", "13"))
+METRICS = int(os.environ.get("BENCH_METRICS", "100"))
+ROUNDS = int(os.environ.get("BENCH_ROUNDS", "20"))
+
+
+async def seed(db):
+    await db.metrics.drop()
+    await db.weekly_reports.drop()
+    result = await db.metrics.insert_many([
+        {"name": f"Metric {i}", "baseline": 10.0, "target": 90.0, "unit": "%", "actual_formula": "avg"}
+        for i in range(METRICS)
+    ])
+    metric_ids = [str(_id) for _id in result.inserted_ids]
+    await db.weekly_reports.insert_many([
+        {
+            "fy": "FY25",
+            "quarter": "Q1",
+            "week_date": f"{week + 1:02d}-04-2025",
+            "metrics": [
+                {"metric_id": metric_id, "name": f"Metric {i}", "value": float(week * i % 97)}
+                for i, metric_id in enumerate(metric_ids)
+            ],
+        }
+        for week in range(WEEKS)
+    ])
+    return await db.weekly_reports.find_one()
+
+
+async def before(db, report):
+    from bson import ObjectId
+    result = {}
+    for metric in report["metrics"]:
+        metric_id = metric["metric_id"]
+        metric_data = await db.metrics.find_one({"_id": ObjectId(metric_id)})
+        if metric_data:
+            quarter_reports = await db.weekly_reports.find(
+                {"fy": report["fy"], "quarter": report["quarter"]}
+            ).to_list(length=None)
+            values = []
+            for qr in quarter_reports:
+                for m in qr["metrics"]:
+                    if m["metric_id"] == metric_id:
+                        values.append(m["value"])
+                        break
+            result[metric_id] = sum(values) / len(values) if values else 0
+    return result
+
+
+async def after(db, report):
+    from bson import ObjectId
+    metric_ids = [metric["metric_id"] for metric in report["metrics"]]
+    definitions = await db.metrics.find(
+        {"_id": {"$in": [ObjectId(metric_id) for metric_id in metric_ids]}}
+    ).to_list(length=None)
+    defined = {str(doc["_id"]) for doc in definitions}
+
+    sums, counts = {}, {}
+    cursor = db.weekly_reports.find(
+        {"fy": report["fy"], "quarter": report["quarter"]},
+        {"_id": 0, "metrics.metric_id": 1, "metrics.value": 1}
+    )
+    async for quarter_report in cursor:
+        seen = set()
+        for m in quarter_report["metrics"]:
+            metric_id = m["metric_id"]
+            if metric_id in defined and metric_id not in seen:
+                seen.add(metric_id)
+                sums[metric_id] = sums.get(metric_id, 0) + m["value"]
+                counts[metric_id] = counts.get(metric_id, 0) + 1
+    return {metric_id: sums[metric_id] / counts[metric_id] if metric_id in sums else 0 for metric_id in defined}
+
+
+async def measure(label, fn, db, report):
+    timings = []
+    for _ in range(ROUNDS):
+        start = time.perf_counter()
+        result = await fn(db, report)
+        timings.append(time.perf_counter() - start)
+    print(f"{label:<7} median {statistics.median(timings) * 1000:9.1f} ms   max {max(timings) * 1000:9.1f} ms")
+    return result
+
+
+async def main():
+    client = AsyncIOMotorClient(MONGO_URI)
+    db = client[BENCH_DB]
+    try:
+        report = await seed(db)
+        print(f"{WEEKS} weekly reports x {METRICS} metrics, {ROUNDS} rounds")
+        expected = await measure("before", before, db, report)
+        actual = await measure("after", after, db, report)
+        assert expected == actual, "quarter actuals differ"
+    finally:
+        await client.drop_database(BENCH_DB)
+        client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
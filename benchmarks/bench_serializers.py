@@ -0,0 +1,146 @@
+"""
+Micro-benchmark for document serialization.
+
+"before" is the former generic serialize_doc: for every document it checks
+week_date, loops over four IndusIT date field names and re-parses their
+strings. "after" is the execution_data serializer from the registry, which
+only touches that collection's fields, followed by the Date/DateTime scalar
+formatting GraphQL applies to the (natively stored) date fields.
+
+Usage:
+    python benchmarks/bench_serializers.py
+
+Needs no database. BENCH_DOCS (default: 100000) sets the number of documents;
+each run serializes fresh copies so neither side sees converted documents.
+"""
+import copy
+import os
+import sys
+import time
+from datetime import datetime
+
+from bson import ObjectId
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from app.db.serializers import get_serializer, format_date, format_datetime  # noqa: E402
+
+DOCS = int(os.environ.get("BENCH_DOCS", "100000"))
+ROUNDS = int(os.environ.get("BENCH_ROUNDS", "5"))
+
+
+def legacy_serialize_doc(doc):
+    if doc:
+        doc["id"] = str(doc["_id"])
+        doc.pop("_id", None)
+
+        # Format dates in DD-MM-YYYY format for date fields
+        if "week_date" in doc:
+            try:
+                if isinstance(doc["week_date"], str):
+                    # Check if already in DD-MM-YYYY format
+                    if doc["week_date"].count('-') == 2 and len(doc["week_date"].split('-')[0]) == 2:
+                        pass  # Already in correct format
+                    else:
+                        # Convert from ISO format if needed
+                        date_obj = datetime.fromisoformat(doc["week_date"].replace('Z', '+00:00'))
+                        doc["week_date"] = date_obj.strftime('%d-%m-%Y')
+                elif isinstance(doc["week_date"], datetime):
+                    doc["week_date"] = doc["week_date"].strftime('%d-%m-%Y')
+            except (ValueError, AttributeError):
+                pass  # Keep original format if parsing fails
+
+        # Format date fields in IndusIT collections
+        date_fields = [
+            "latest_password_change_date", 
+            "next_password_update_date", 
+            "last_successful_execution",
+            "last_dr_date"
+        ]
+
+        for field in date_fields:
+            if field in doc and doc[field]:
+                try:
+                    if isinstance(doc[field], str):
+                        # Check if already in DD-MM-YYYY format
+                        if doc[field].count('-') == 2 and len(doc[field].split('-')[0]) == 2:
+                            pass  # Already in correct format
+                        else:
+                            # Convert from ISO format if needed
+                            date_obj = datetime.fromisoformat(doc[field].replace('Z', '+00:00'))
+                            doc[field] = date_obj.strftime('%d-%m-%Y')
+                    elif isinstance(doc[field], datetime):
+                        doc[field] = doc[field].strftime('%d-%m-%Y')
+                except (ValueError, AttributeError):
+                    pass  # Keep original format if parsing fails
+
+        # Convert created_at and updated_at to proper format if they exist
+        if "created_at" in doc and doc["created_at"]:
+            try:
+                doc["created_at"] = doc["created_at"].strftime('%d-%m-%Y %H:%M:%S')
+            except AttributeError:
+                pass
+
+        if "updated_at" in doc and doc["updated_at"]:
+            try:
+                doc["updated_at"] = doc["updated_at"].strftime('%d-%m-%Y %H:%M:%S')
+            except AttributeError:
+                pass
+    return doc
+
+
+def make_docs(native_dates):
+    # Same ids on both sides so their output can be compared
+    now = datetime(2025, 4, 1, 9, 30)
+    return [
+        {
+            "_id": ObjectId(f"{i:024x}"),
+            "apaid": f"AP{i:06d}",
+            "current_status": "Running" if i % 3 else "Stopped",
+            "last_successful_execution": (
+                datetime(2025, 3, i % 28 + 1) if native_dates else f"{i % 28 + 1:02d}-03-2025"
+            ),
+            "volumes_daily": i % 500,
+            "volumes_monthly": i % 15000,
+            "business_impact": "High",
+            "infra_details": ["vm-01", "vm-02"],
+            "web_service_url": None,
+            "app_url": None,
+            "created_at": now,
+            "updated_at": now,
+        }
+        for i in range(DOCS)
+    ]
+
+
+serialize_execution = get_serializer("execution_data")
+
+
+def serialize_and_format(doc):
+    serialize_execution(doc)
+    doc["last_successful_execution"] = format_date(doc["last_successful_execution"])
+    doc["created_at"] = format_datetime(doc["created_at"])
+    doc["updated_at"] = format_datetime(doc["updated_at"])
+
+
+def measure(label, serialize, docs):
+    timings = []
+    for _ in range(ROUNDS):
+        batch = copy.deepcopy(docs)
+        start = time.perf_counter()
+        for doc in batch:
+            serialize(doc)
+        timings.append(time.perf_counter() - start)
+    best = min(timings)
+    print(f"{label:<7} best {best * 1000:8.1f} ms   {best / len(docs) * 1e6:6.2f} us/doc")
+    return batch
+
+
+def main():
+    print(f"{DOCS} execution_data documents, best of {ROUNDS} rounds")
+    before = measure("before", legacy_serialize_doc, make_docs(native_dates=False))
+    after = measure("after", serialize_and_format, make_docs(native_dates=True))
+    assert before == after, "serializers disagree"
+
+
+if __name__ == "__main__":
+    main()
@@ -1,28 +1,41 @@
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.trustedhost import TrustedHostMiddleware
-from fastapi.responses import JSONResponse
-from fastapi.staticfiles import StaticFiles
+from fastapi.responses import JSONResponse, StreamingResponse
 from contextlib import asynccontextmanager
 from ariadne.asgi import GraphQL
-import os
 
 # Import schema from resolvers
 from app.resolvers import schema
-from app.middleware import logging_middleware, rate_limiting_middleware, error_handling_middleware
+from app.middleware import (
+    NotFoundMiddleware, BlockMaliciousPathsMiddleware, ErrorHandlingMiddleware,
+    RateLimitMiddleware, LoggingMiddleware
+)
 from app.db.init_db import initialize_database
+from app.auth import get_context_value, get_bearer_token, get_current_user, is_admin
+from app.resolvers.reports import build_export_query, find_export_reports
+from app.utils.export import iter_csv_chunks
+from app.utils.export_jobs import get_export_dir, cancel_export_jobs, shutdown_export_pool
+from app.utils.export_sweeper import ExportFiles, run_export_sweeper
+from app.utils import metrics
+import asyncio
 
 # ✅ Lifespan (startup/shutdown hooks)
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     print("🚀 App is starting up...")
     # Initialize database with roles and superadmin
-    initialize_database()
+    await initialize_database()
     # Initialize exports directory
-    export_dir = os.environ.get("EXPORT_DIR", "./exports")
-    os.makedirs(export_dir, exist_ok=True)
+    get_export_dir()
+    # Expire and evict old export files in the background
+    sweeper = asyncio.create_task(run_export_sweeper())
     yield
     print("🛑 App is shutting down...")
+    sweeper.cancel()
+    # Stop export workers; unfinished jobs are cancelled and marked failed
+    await cancel_export_jobs()
+    shutdown_export_pool()
 
 # ✅ Create FastAPI app
 app = FastAPI(lifespan=lifespan)
@@ -42,43 +55,44 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# ✅ Custom middlewares
-@app.middleware("http")
-async def custom_middleware(request: Request, call_next):
-    # Chain our custom middlewares
-    async def process_request(request):
-        return await call_next(request)
-    
-    # Apply middlewares in sequence
-    response = await error_handling_middleware(
-        request, 
-        lambda req: rate_limiting_middleware(
-            req, 
-            lambda req2: logging_middleware(req2, process_request)
-        )
-    )
-    
-    return response
+# ✅ Custom middlewares (pure ASGI; the last added runs first)
+app.add_middleware(LoggingMiddleware)
+app.add_middleware(RateLimitMiddleware)
+app.add_middleware(ErrorHandlingMiddleware)
+# Block malicious paths
+app.add_middleware(BlockMaliciousPathsMiddleware)
+# Custom 404 body
+app.add_middleware(NotFoundMiddleware)
 
-# ✅ Middleware: Block malicious paths
-@app.middleware("http")
-async def block_malicious_requests(request: Request, call_next):
-    url_path = str(request.url.path).lower()
-    suspicious_patterns = ["jndi", "struts2", "optiontransferselect", "web-inf"]
-    if any(pattern in url_path for pattern in suspicious_patterns):
-        return JSONResponse(status_code=403, content={"detail": "Forbidden"})
-    return await call_next(request)
+# ✅ Streaming CSV export: rows are sent in chunks straight from the Mongo cursor
+@app.get("/exports/report.csv")
+async def stream_report_csv(request: Request, fy: str, quarter: str = None, week_date: str = None):
+    token = get_bearer_token(request)
+    if token is None:
+        return JSONResponse(status_code=401, content={"detail": "Not authenticated"})
+    await get_current_user(token)
+
+    cursor = find_export_reports(build_export_query(fy, quarter, week_date))
+    filename = "_".join(part for part in ("report", fy, quarter, week_date) if part)
+    return StreamingResponse(
+        iter_csv_chunks(cursor),
+        media_type="text/csv",
+        headers={"Content-Disposition": f'attachment; filename="{filename}.csv"'}
+    )
 
-# ✅ Middleware: Custom 404 handler
-@app.middleware("http")
-async def custom_404_handler(request: Request, call_next):
-    response = await call_next(request)
-    if response.status_code == 404:
-        return JSONResponse(status_code=404, content={"detail": "Not Found"})
-    return response
+# ✅ In-process metrics (export sweeper activity, downloads); admins only
+@app.get("/metrics")
+async def get_metrics(request: Request):
+    token = get_bearer_token(request)
+    if token is None:
+        return JSONResponse(status_code=401, content={"detail": "Not authenticated"})
+    user = await get_current_user(token)
+    if not is_admin(user):
+        return JSONResponse(status_code=403, content={"detail": "Admin privileges required"})
+    return metrics.snapshot()
 
-# Mount static files for downloads
-app.mount("/downloads", StaticFiles(directory="exports"), name="downloads")
+# Mount export files for downloads (each download is recorded for the sweeper)
+app.mount("/downloads", ExportFiles(directory=get_export_dir()), name="downloads")
 
 # ✅ Mount GraphQL route
-app.add_route("/graphql", GraphQL(schema, debug=True))
+app.add_route("/graphql", GraphQL(schema, debug=True, context_value=get_context_value))
@@ -359,6 +359,10 @@ export async function getFYConfigs(token: string) {
   return data.fyConfigs;
 }
 
+// Export polling: once a second, for at most 10 minutes
+const EXPORT_POLL_INTERVAL_MS = 1000;
+const EXPORT_POLL_MAX_ATTEMPTS = 600;
+
 export async function exportReport(token: string, input: {
   fy: string;
   quarter?: string;
@@ -369,12 +373,47 @@ export async function exportReport(token: string, input: {
     mutation ExportReport($input: ExportInput!) {
       exportReport(input: $input) {
         url
+        job_id
+        status
       }
     }
   `;
   
   const data = await fetchGraphQL(query, { input }, token);
-  return data.exportReport;
+  let job = data.exportReport;
+  
+  // XLSX/PDF exports are built in the background; poll until the file is ready
+  let attempts = 0;
+  while (job.status === 'queued' || job.status === 'running') {
+    if (++attempts > EXPORT_POLL_MAX_ATTEMPTS) {
+      throw new Error('Export is taking too long, please try again later');
+    }
+    await new Promise((resolve) => setTimeout(resolve, EXPORT_POLL_INTERVAL_MS));
+    job = { job_id: job.job_id, ...(await getExportJob(token, job.job_id)) };
+  }
+  
+  if (job.status !== 'completed') {
+    throw new Error(job.error || 'Export failed');
+  }
+  
+  return job;
+}
+
+export async function getExportJob(token: string, id: string) {
+  const query = `
+    query ExportJob($id: ID!) {
+      exportJob(id: $id) {
+        id
+        status
+        progress
+        url
+        error
+      }
+    }
+  `;
+  
+  const data = await fetchGraphQL(query, { id }, token);
+  return data.exportJob;
 }
 
 // IndusIT Dashboard API functions
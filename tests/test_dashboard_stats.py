@@ -0,0 +1,28 @@
+import pytest
+
+from app.resolvers.indusit import (
+    ADMIN_DASHBOARD_PIPELINE, AUTOMATION_STATS_PROJECTION, USER_DASHBOARD_PIPELINE, USER_STATS_FACETS
+)
+
+
+@pytest.mark.parametrize("pipeline", [USER_DASHBOARD_PIPELINE, ADMIN_DASHBOARD_PIPELINE])
+def test_automations_are_projected_before_the_unions(pipeline):
+    assert pipeline[0] is AUTOMATION_STATS_PROJECTION
+    assert all("$unionWith" in stage for stage in pipeline[1:-1])
+    assert "$facet" in pipeline[-1]
+
+
+def test_projection_leaves_the_automation_facets_unchanged(mongo):
+    automations = mongo["automation_metadata"].sync
+    automations.insert_many([
+        {"apaid": "AP1", "rpa_name": "Invoices", "category": "Finance", "priority": "P1", "owner": "a", "notes": "x" * 100},
+        {"apaid": "AP2", "rpa_name": "Payroll", "category": "HR", "priority": "P2", "owner": "b"},
+        {"apaid": "AP3", "rpa_name": "Claims", "category": "Finance", "priority": "P1"},
+    ])
+    automations.database["execution_data"].insert_one({"apaid": "AP1", "current_status": "Running"})
+    facets = {name: USER_STATS_FACETS[name] for name in ("automations_count_by_category", "p1_bots_status")}
+
+    def run(head):
+        return list(automations.aggregate(head + [{"$facet": facets}]))
+
+    assert run([AUTOMATION_STATS_PROJECTION]) == run([])
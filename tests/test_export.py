@@ -0,0 +1,65 @@
+import asyncio
+import csv
+import threading
+
+from app.utils import export
+from app.utils.export import EXPORT_COLUMNS, write_csv_report
+
+
+class Cursor:
+    def __init__(self, reports):
+        self._reports = iter(reports)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        try:
+            return next(self._reports)
+        except StopIteration:
+            raise StopAsyncIteration
+
+
+def weekly_report(week, metrics=3):
+    return {
+        "fy": "FY26",
+        "quarter": "Q1",
+        "week_date": week,
+        "metrics": [
+            {"name": f"metric {i}", "value": i, "baseline": 0, "target": 10, "unit": "%", "status": "red"}
+            for i in range(metrics)
+        ]
+    }
+
+
+def test_csv_export_has_a_row_per_metric(tmp_path):
+    file_path = tmp_path / "report.csv"
+    reports = [weekly_report(f"2025-04-{day:02d}") for day in range(1, 1001)]
+
+    asyncio.run(write_csv_report(Cursor(reports), file_path))
+
+    with open(file_path, newline="") as f:
+        rows = list(csv.reader(f))
+    assert rows[0] == EXPORT_COLUMNS
+    assert len(rows) == 1 + 3000
+    assert rows[-1] == ["FY26", "Q1", "2025-04-1000", "metric 2", "2", "0", "10", "%", "red", ""]
+
+
+def test_csv_file_io_stays_off_the_event_loop(tmp_path, monkeypatch):
+    loop_thread = threading.get_ident()
+    io_threads = []
+    to_thread = asyncio.to_thread
+
+    async def recording_to_thread(func, *args, **kwargs):
+        def call():
+            io_threads.append(threading.get_ident())
+            return func(*args, **kwargs)
+        return await to_thread(call)
+
+    monkeypatch.setattr(export.asyncio, "to_thread", recording_to_thread)
+    asyncio.run(write_csv_report(Cursor([weekly_report("2025-04-04")]), tmp_path / "report.csv"))
+
+    # open, one chunk, close
+    assert len(io_threads) == 3
+    assert loop_thread not in io_threads
+    assert (tmp_path / "report.csv").read_text().count("\n") == 4
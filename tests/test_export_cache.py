@@ -0,0 +1,72 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.utils import export_jobs
+from app.utils.export_jobs import export_cache_key, find_cached_export
+
+LONG_AGO = datetime.utcnow() - timedelta(days=1)
+
+
+@pytest.fixture
+def jobs(mongo, monkeypatch, tmp_path):
+    monkeypatch.setenv("EXPORT_DIR", str(tmp_path))
+    collection = mongo["export_jobs"]
+    monkeypatch.setattr(export_jobs, "export_jobs_collection", collection)
+    return collection
+
+
+def add_job(jobs, status, tmp_path=None, **fields):
+    now = datetime.utcnow()
+    job = {
+        "owner": "owner", "requested_by": ["owner"], "format": "xlsx", "cache_key": "key",
+        "file_name": "report.xlsx", "status": status, "progress": 0.0,
+        "created_at": now, "heartbeat_at": now, **fields
+    }
+    if tmp_path is not None:
+        (tmp_path / job["file_name"]).write_bytes(b"xlsx")
+    job["_id"] = jobs.sync.insert_one(job).inserted_id
+    return job
+
+
+def test_completed_export_on_disk_is_a_cache_hit(jobs, tmp_path):
+    job = add_job(jobs, "completed", tmp_path, last_accessed_at=LONG_AGO)
+
+    hit = asyncio.run(find_cached_export("key", "someone else"))
+
+    assert hit["_id"] == job["_id"]
+    stored = jobs.sync.find_one({"_id": job["_id"]})
+    assert stored["requested_by"] == ["owner", "someone else"]
+    assert stored["last_accessed_at"] > LONG_AGO
+
+
+def test_completed_export_without_its_file_is_a_miss(jobs):
+    add_job(jobs, "completed")
+    assert asyncio.run(find_cached_export("key", "owner")) is None
+
+
+@pytest.mark.parametrize("status", ["queued", "running"])
+def test_live_unfinished_job_is_shared(jobs, status):
+    job = add_job(jobs, status)
+    assert asyncio.run(find_cached_export("key", "owner"))["_id"] == job["_id"]
+
+
+@pytest.mark.parametrize("status", ["queued", "running"])
+def test_stale_unfinished_job_is_not_shared(jobs, status):
+    add_job(jobs, status, heartbeat_at=LONG_AGO, created_at=LONG_AGO)
+    assert asyncio.run(find_cached_export("key", "owner")) is None
+
+
+@pytest.mark.parametrize("status", ["failed", "expired"])
+def test_failed_and_expired_jobs_are_not_shared(jobs, tmp_path, status):
+    add_job(jobs, status, tmp_path)
+    assert asyncio.run(find_cached_export("key", "owner")) is None
+
+
+def test_cache_key_follows_filter_format_and_data_version():
+    key = export_cache_key({"fy": "FY26", "quarter": "Q1"}, "xlsx", 3)
+    assert export_cache_key({"quarter": "Q1", "fy": "FY26"}, "xlsx", 3) == key
+    assert export_cache_key({"fy": "FY26", "quarter": "Q2"}, "xlsx", 3) != key
+    assert export_cache_key({"fy": "FY26", "quarter": "Q1"}, "csv", 3) != key
+    assert export_cache_key({"fy": "FY26", "quarter": "Q1"}, "xlsx", 4) != key
@@ -0,0 +1,117 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.utils import export_jobs
+from app.utils.export_jobs import (
+    INTERRUPTED_ERROR, enqueue_export_job, fail_stale_export_jobs, find_cached_export,
+    serialize_export_job
+)
+
+LONG_AGO = datetime.utcnow() - timedelta(days=1)
+
+
+@pytest.fixture
+def jobs(mongo, monkeypatch, tmp_path):
+    monkeypatch.setenv("EXPORT_DIR", str(tmp_path))
+    collection = mongo["export_jobs"]
+    monkeypatch.setattr(export_jobs, "export_jobs_collection", collection)
+    return collection
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    """Export builds run in threads instead of worker processes"""
+    executor = ThreadPoolExecutor(max_workers=2)
+    monkeypatch.setattr(export_jobs, "get_export_pool", lambda: executor)
+    yield executor
+    executor.shutdown(wait=True)
+
+
+def add_job(jobs, status, tmp_path=None, **fields):
+    now = datetime.utcnow()
+    job = {
+        "owner": "owner", "requested_by": ["owner"], "format": "xlsx", "cache_key": "key",
+        "file_name": "report.xlsx", "status": status, "progress": 0.0,
+        "created_at": now, "heartbeat_at": now, **fields
+    }
+    if tmp_path is not None:
+        (tmp_path / job["file_name"]).write_bytes(b"xlsx")
+    job["_id"] = jobs.sync.insert_one(job).inserted_id
+    return job
+
+
+def test_stale_jobs_are_reported_and_marked_failed(jobs):
+    stale = add_job(jobs, "running", heartbeat_at=LONG_AGO, created_at=LONG_AGO)
+    live = add_job(jobs, "running")
+
+    serialized = serialize_export_job(jobs.sync.find_one({"_id": stale["_id"]}))
+    assert (serialized["status"], serialized["error"]) == ("failed", INTERRUPTED_ERROR)
+    assert serialize_export_job(jobs.sync.find_one({"_id": live["_id"]}))["status"] == "running"
+
+    assert asyncio.run(fail_stale_export_jobs()) == 1
+    assert jobs.sync.find_one({"_id": stale["_id"]})["status"] == "failed"
+    assert jobs.sync.find_one({"_id": live["_id"]})["status"] == "running"
+
+
+async def run_job():
+    """Enqueue an export and wait for its build; returns the job id"""
+    job = await enqueue_export_job("owner", {"fy": "FY25"}, "xlsx", "key")
+    await asyncio.gather(*export_jobs._job_tasks)
+    return job["_id"]
+
+
+def test_successful_build_completes_the_job(jobs, pool, monkeypatch):
+    def build(job_id, query, export_format, file_path):
+        with open(file_path, "wb") as f:
+            f.write(b"12345")
+    monkeypatch.setattr(export_jobs, "build_export_file", build)
+
+    job_id = asyncio.run(run_job())
+
+    job = jobs.sync.find_one({"_id": job_id})
+    assert job["status"] == "completed"
+    assert job["size_bytes"] == 5
+    assert job["url"] == f"/downloads/{job['file_name']}"
+    assert not export_jobs._active_jobs
+
+
+def test_failed_build_records_the_error_and_removes_the_file(jobs, pool, monkeypatch, tmp_path):
+    def build(job_id, query, export_format, file_path):
+        with open(file_path, "wb") as f:
+            f.write(b"partial")
+        raise RuntimeError("disk full")
+    monkeypatch.setattr(export_jobs, "build_export_file", build)
+
+    job_id = asyncio.run(run_job())
+
+    job = jobs.sync.find_one({"_id": job_id})
+    assert (job["status"], job["error"]) == ("failed", "disk full")
+    assert job["finished_at"] is not None
+    assert list(tmp_path.iterdir()) == []
+    assert not export_jobs._active_jobs
+    assert asyncio.run(find_cached_export("key", "owner")) is None
+
+
+def test_cancelled_job_is_recorded_as_failed(jobs, pool, monkeypatch):
+    release = threading.Event()
+    monkeypatch.setattr(export_jobs, "build_export_file", lambda *args: release.wait(5))
+
+    async def run():
+        job = await enqueue_export_job("owner", {"fy": "FY25"}, "xlsx", "key")
+        await asyncio.sleep(0.05)
+        await export_jobs.cancel_export_jobs()
+        return job["_id"]
+
+    try:
+        job_id = asyncio.run(run())
+    finally:
+        release.set()
+
+    job = jobs.sync.find_one({"_id": job_id})
+    assert job["status"] == "failed"
+    assert "cancelled" in job["error"]
+    assert not export_jobs._active_jobs
@@ -0,0 +1,86 @@
+import asyncio
+import os
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.utils import export_jobs, export_sweeper, metrics
+from app.utils.export_sweeper import sweep_exports, sweep_untracked_exports
+
+LONG_AGO = datetime.utcnow() - timedelta(days=2)
+
+
+@pytest.fixture
+def jobs(mongo, monkeypatch, tmp_path):
+    monkeypatch.setenv("EXPORT_DIR", str(tmp_path))
+    collection = mongo["export_jobs"]
+    monkeypatch.setattr(export_jobs, "export_jobs_collection", collection)
+    monkeypatch.setattr(export_sweeper, "export_jobs_collection", collection)
+    monkeypatch.setattr(metrics, "_counters", Counter())
+    monkeypatch.setattr(metrics, "_gauges", {})
+    return collection
+
+
+def add_export(jobs, tmp_path, name, size, last_accessed_at, status="completed"):
+    (tmp_path / name).write_bytes(b"x" * size)
+    now = datetime.utcnow()
+    return jobs.sync.insert_one({
+        "status": status, "file_name": name, "size_bytes": size, "created_at": now,
+        "heartbeat_at": now, "last_accessed_at": last_accessed_at
+    }).inserted_id
+
+
+def test_exports_past_the_ttl_are_expired(jobs, tmp_path):
+    old = add_export(jobs, tmp_path, "old.xlsx", 10, LONG_AGO)
+    failed = add_export(jobs, tmp_path, "failed.xlsx", 5, LONG_AGO, status="failed")
+    recent = add_export(jobs, tmp_path, "recent.xlsx", 20, datetime.utcnow())
+
+    asyncio.run(sweep_exports())
+
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["recent.xlsx"]
+    assert jobs.sync.find_one({"_id": old})["status"] == "expired"
+    assert jobs.sync.find_one({"_id": failed})["status"] == "expired"
+    assert jobs.sync.find_one({"_id": recent})["status"] == "completed"
+    snapshot = metrics.snapshot()
+    assert snapshot["counters"]["exports_evicted_ttl"] == 2
+    assert snapshot["gauges"]["export_files"] == 1
+    assert snapshot["gauges"]["export_bytes"] == 20
+
+
+def test_least_recently_accessed_exports_are_evicted_over_quota(jobs, tmp_path, monkeypatch):
+    monkeypatch.setattr(export_sweeper, "EXPORT_QUOTA_BYTES", 25)
+    now = datetime.utcnow()
+    for minutes, name in [(3, "a.xlsx"), (1, "b.xlsx"), (2, "c.xlsx")]:
+        add_export(jobs, tmp_path, name, 10, now - timedelta(minutes=minutes))
+
+    asyncio.run(sweep_exports())
+
+    # 30 bytes against a 25 byte quota: only the least recently accessed file goes
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["b.xlsx", "c.xlsx"]
+    assert metrics.snapshot()["counters"]["exports_evicted_quota"] == 1
+    assert metrics.snapshot()["gauges"]["export_bytes"] == 20
+
+
+def test_stale_jobs_are_marked_failed_by_the_sweep(jobs):
+    jobs.sync.insert_one({"status": "running", "file_name": "x.xlsx", "created_at": LONG_AGO, "heartbeat_at": LONG_AGO})
+
+    asyncio.run(sweep_exports())
+
+    assert jobs.sync.find_one({})["status"] == "failed"
+    assert metrics.snapshot()["counters"]["export_jobs_interrupted"] == 1
+
+
+def test_old_untracked_files_are_removed(jobs, tmp_path):
+    add_export(jobs, tmp_path, "tracked.xlsx", 10, datetime.utcnow())
+    stale = time.time() - export_sweeper.EXPORT_TTL_SECONDS - 60
+    for name in ("tracked.xlsx", "orphan.xlsx"):
+        (tmp_path / name).touch()
+        os.utime(tmp_path / name, (stale, stale))
+    (tmp_path / "new-orphan.xlsx").touch()
+
+    asyncio.run(sweep_untracked_exports())
+
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["new-orphan.xlsx", "tracked.xlsx"]
+    assert metrics.snapshot()["counters"]["exports_evicted_untracked"] == 1
@@ -0,0 +1,81 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from bson import ObjectId
+
+from app.db.loaders import MetricLoader, get_metric_loader
+
+
+class CountingCollection:
+    """Counts the find calls reaching the wrapped collection"""
+
+    def __init__(self, collection):
+        self.collection = collection
+        self.finds = []
+
+    def find(self, query, *args, **kwargs):
+        self.finds.append(query)
+        return self.collection.find(query, *args, **kwargs)
+
+
+@pytest.fixture
+def metrics(mongo):
+    collection = mongo["metrics"]
+    ids = [ObjectId() for _ in range(3)]
+    collection.sync.insert_many([{"_id": metric_id, "name": f"metric {i}"} for i, metric_id in enumerate(ids)])
+    return CountingCollection(collection), [str(metric_id) for metric_id in ids]
+
+
+def test_loads_in_one_batch_are_one_query(metrics):
+    collection, ids = metrics
+    loader = MetricLoader(collection)
+
+    async def run():
+        return await asyncio.gather(*(loader.load(metric_id) for metric_id in ids))
+
+    docs = asyncio.run(run())
+    assert [doc["name"] for doc in docs] == ["metric 0", "metric 1", "metric 2"]
+    assert len(collection.finds) == 1
+
+
+def test_results_are_memoized_per_loader(metrics):
+    collection, ids = metrics
+    loader = MetricLoader(collection)
+
+    async def run():
+        first = await loader.load_many(ids[:2])
+        second = await loader.load_many(ids)
+        return first, second
+
+    first, second = asyncio.run(run())
+    assert second[:2] == first
+    # Only the one metric not seen before is fetched by the second batch
+    assert collection.finds[1] == {"_id": {"$in": [ObjectId(ids[2])]}}
+
+
+def test_missing_and_invalid_ids(metrics):
+    collection, ids = metrics
+    loader = MetricLoader(collection)
+
+    results = asyncio.run(loader.load_many([ids[0], str(ObjectId()), "not-an-id"]))
+
+    assert results[0]["name"] == "metric 0"
+    assert results[1] is None
+    assert isinstance(results[2], Exception)
+    assert len(collection.finds) == 1
+
+
+def test_query_errors_reach_every_caller():
+    class FailingCollection:
+        def find(self, query):
+            raise RuntimeError("connection lost")
+
+    results = asyncio.run(MetricLoader(FailingCollection()).load_many([str(ObjectId()), str(ObjectId())]))
+    assert [str(result) for result in results] == ["connection lost", "connection lost"]
+
+
+def test_one_loader_per_request_context():
+    info = SimpleNamespace(context={})
+    assert get_metric_loader(info) is get_metric_loader(info)
+    assert get_metric_loader(SimpleNamespace(context={})) is not get_metric_loader(info)
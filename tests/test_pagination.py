@@ -0,0 +1,79 @@
+import asyncio
+import random
+from datetime import datetime
+
+import pytest
+from bson import ObjectId
+from fastapi import HTTPException
+
+from app.db.pagination import decode_cursor, encode_cursor, paginate, with_sort_keys
+
+REPORT_DATE_SORT = [("report_date", -1), ("_id", -1)]
+
+
+def page_through(collection, sort, projection, page_size=4):
+    """Every document, in page order, following endCursor until the last page"""
+    async def run():
+        seen, after = [], None
+        while True:
+            page = await paginate(collection, {}, page_size, after, sort=sort, projection=projection)
+            seen.extend(edge["node"] for edge in page["edges"])
+            if not page["pageInfo"]["hasNextPage"]:
+                return seen, page["totalCount"]
+            after = page["pageInfo"]["endCursor"]
+    return asyncio.run(run())
+
+
+@pytest.fixture
+def reports(mongo):
+    rng = random.Random(7)
+    docs = []
+    for i in range(23):
+        doc = {"_id": ObjectId(f"{i:024x}"), "n": i, "fy": "FY25"}
+        roll = rng.random()
+        if roll < 0.4:
+            doc["report_date"] = datetime(2025, 1, 1 + i % 5)
+        elif roll < 0.7:
+            doc["report_date"] = None
+        docs.append(doc)
+    mongo["weekly_reports"].sync.insert_many(docs)
+    return mongo["weekly_reports"]
+
+
+@pytest.mark.parametrize("sort", [REPORT_DATE_SORT, [("report_date", 1), ("_id", 1)]])
+@pytest.mark.parametrize("projection", [None, {"n": 1}, {"_id": 0, "n": 1}, {"fy": 0}])
+def test_pages_cover_every_document_once(reports, sort, projection):
+    seen, total = page_through(reports, sort, projection)
+
+    expected = [doc["n"] for doc in reports.sync.find({}).sort(sort)]
+    assert [doc["n"] for doc in seen] == expected
+    assert total == 23
+
+
+def test_projection_without_sort_keys_still_builds_cursors(reports):
+    page = asyncio.run(paginate(reports, {}, 5, sort=REPORT_DATE_SORT, projection={"n": 1}))
+
+    cursor = page["pageInfo"]["endCursor"]
+    last = reports.sync.find_one({"n": page["edges"][-1]["node"]["n"]})
+    assert decode_cursor(cursor, REPORT_DATE_SORT) == [last.get("report_date"), last["_id"]]
+
+
+def test_with_sort_keys():
+    assert with_sort_keys(None, REPORT_DATE_SORT) is None
+    assert with_sort_keys({"n": 1}, REPORT_DATE_SORT) == {"n": 1, "report_date": 1, "_id": 1}
+    assert with_sort_keys({"_id": 1}, REPORT_DATE_SORT) == {"_id": 1, "report_date": 1}
+    # Exclusion projections keep every field but excluded sort keys
+    assert with_sort_keys({"metrics": 0, "report_date": 0}, REPORT_DATE_SORT) == {"metrics": 0}
+
+
+def test_cursor_round_trip():
+    doc = {"_id": ObjectId(), "report_date": datetime(2025, 3, 1)}
+    assert decode_cursor(encode_cursor(doc, REPORT_DATE_SORT), REPORT_DATE_SORT) == [doc["report_date"], doc["_id"]]
+    assert decode_cursor(encode_cursor({"_id": doc["_id"]}, REPORT_DATE_SORT), REPORT_DATE_SORT) == [None, doc["_id"]]
+
+
+@pytest.mark.parametrize("cursor", ["not base64!", encode_cursor({"_id": 1}, [("_id", 1)])])
+def test_invalid_cursor(cursor):
+    with pytest.raises(HTTPException) as error:
+        decode_cursor(cursor, REPORT_DATE_SORT)
+    assert error.value.status_code == 400
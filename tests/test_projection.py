@@ -0,0 +1,77 @@
+from graphql import build_schema, graphql_sync
+
+from app.db.projection import projection_from_info, selected_fields
+
+SCHEMA = build_schema("""
+    type Metric {
+        metric_id: String
+        value: Float
+    }
+
+    type Report {
+        id: ID!
+        fy: String
+        quarter: String
+        week_date: String
+        metrics: [Metric]
+        quarter_actual: Float
+    }
+
+    type ReportEdge {
+        node: Report
+        cursor: String
+    }
+
+    type ReportConnection {
+        edges: [ReportEdge]
+        total_count: Int
+    }
+
+    type Query {
+        report: Report
+        reports: ReportConnection
+    }
+""")
+
+
+def resolve_info(query, field="report"):
+    """The GraphQLResolveInfo the `field` resolver receives for `query`"""
+    captured = []
+
+    def resolve(info):
+        captured.append(info)
+        return None
+
+    result = graphql_sync(SCHEMA, query, root_value={field: resolve})
+    assert not result.errors
+    return captured[0]
+
+
+def test_only_selected_fields_are_projected():
+    info = resolve_info("{ report { id fy metrics { value } __typename } }")
+    assert projection_from_info(info) == {"_id": 1, "fy": 1, "metrics": 1}
+
+
+def test_fragments_are_expanded():
+    info = resolve_info("""
+        query { report { ...Period ... on Report { week_date } } }
+        fragment Period on Report { fy quarter }
+    """)
+    assert selected_fields(info) == {"fy", "quarter", "week_date"}
+
+
+def test_connection_nodes_are_projected_through_the_path():
+    info = resolve_info("{ reports { total_count edges { cursor node { fy quarter } } } }", "reports")
+    assert selected_fields(info) == {"total_count", "edges"}
+    assert projection_from_info(info, ("edges", "node")) == {"_id": 1, "fy": 1, "quarter": 1}
+
+
+def test_computed_fields_project_what_they_are_built_from():
+    info = resolve_info("{ report { quarter_actual week_date } }")
+    projection = projection_from_info(info, requires={"quarter_actual": ["metrics", "fy", "quarter"]})
+    assert projection == {"_id": 1, "metrics": 1, "fy": 1, "quarter": 1, "week_date": 1}
+
+
+def test_fields_selected_twice_are_merged():
+    info = resolve_info("{ report { fy } report { quarter } }")
+    assert projection_from_info(info) == {"_id": 1, "fy": 1, "quarter": 1}
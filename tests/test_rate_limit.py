@@ -0,0 +1,88 @@
+import asyncio
+import json
+
+import pytest
+
+from app.utils import rate_limit
+from app.utils.rate_limit import RateLimiter, graphql_cost, operation_cost
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """time.monotonic as seen by the limiter, advanced by hand"""
+    now = [1000.0]
+    monkeypatch.setattr(rate_limit.time, "monotonic", lambda: now[0])
+    return now
+
+
+def acquire(limiter, key, cost=1):
+    return asyncio.run(limiter.acquire(key, cost))
+
+
+def test_bucket_allows_capacity_then_rejects(clock):
+    limiter = RateLimiter(capacity=3, per_minute=60)
+    assert [acquire(limiter, "a") for _ in range(3)] == [0, 0, 0]
+    # One token a second: the next one is a second away
+    assert acquire(limiter, "a") == pytest.approx(1.0)
+
+
+def test_bucket_refills_continuously(clock):
+    limiter = RateLimiter(capacity=3, per_minute=60)
+    for _ in range(3):
+        acquire(limiter, "a")
+
+    clock[0] += 1.5
+    assert acquire(limiter, "a") == 0
+    assert acquire(limiter, "a") == pytest.approx(0.5)
+
+    # Never more than the capacity, however long the client was away
+    clock[0] += 3600
+    assert [acquire(limiter, "a") for _ in range(3)] == [0, 0, 0]
+    assert acquire(limiter, "a") > 0
+
+
+def test_costs_are_capped_at_capacity(clock):
+    limiter = RateLimiter(capacity=5, per_minute=60)
+    assert acquire(limiter, "a", cost=20) == 0
+    assert acquire(limiter, "a") == pytest.approx(1.0)
+
+
+def test_least_recently_seen_keys_are_evicted(clock):
+    limiter = RateLimiter(capacity=1, per_minute=60, max_keys=2)
+    acquire(limiter, "a")
+    acquire(limiter, "b")
+    assert acquire(limiter, "a") > 0  # "a" is now the most recently seen
+    acquire(limiter, "c")
+
+    assert len(limiter) == 2
+    assert acquire(limiter, "a") > 0
+    # "b" was dropped and starts over with a full bucket
+    assert acquire(limiter, "b") == 0
+
+
+def test_operation_label_ignores_operation_name():
+    renamed = [
+        graphql_cost(json.dumps({"query": f"query {name} {{ exportReport {{ url }} }}", "operationName": name}))
+        for name in ("Export", "Export2", "Anything")
+    ]
+    assert renamed == [("exportReport", rate_limit.FIELD_COSTS["exportReport"])] * 3
+
+
+def test_fragments_do_not_hide_root_fields():
+    query = "{ ... on Query { exportReport { url } } ...Stats } fragment Stats on Query { adminDashboardStats { total } }"
+    assert operation_cost(query) == ("adminDashboardStats,exportReport", 25)
+
+
+def test_unparseable_documents_cost_the_default():
+    assert graphql_cost(b"not json") == ("invalid", rate_limit.DEFAULT_FIELD_COST)
+    assert operation_cost("{ broken") == ("invalid", rate_limit.DEFAULT_FIELD_COST)
+    assert operation_cost("query A { ping }", "B") == ("invalid", rate_limit.DEFAULT_FIELD_COST)
+
+
+def test_operation_cost_cache_is_bounded(monkeypatch):
+    monkeypatch.setattr(rate_limit, "_operation_costs", type(rate_limit._operation_costs)())
+    monkeypatch.setattr(rate_limit, "OPERATION_COST_CACHE_SIZE", 8)
+    for i in range(20):
+        operation_cost("{ field%d }" % i)
+    assert len(rate_limit._operation_costs) == 8
+    assert all(isinstance(key, bytes) for key in rate_limit._operation_costs)
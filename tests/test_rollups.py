@@ -0,0 +1,188 @@
+import asyncio
+
+import pytest
+from bson import ObjectId
+
+from app.db import rollups
+
+
+@pytest.fixture
+def db(mongo, monkeypatch):
+    reports, quarters = mongo["weekly_reports"], mongo["quarterly_rollups"]
+    monkeypatch.setattr(rollups, "weekly_reports_collection", reports)
+    monkeypatch.setattr(rollups, "quarterly_rollups_collection", quarters)
+    return reports, quarters
+
+
+def report(fy, quarter, *metrics):
+    return {
+        "_id": ObjectId(),
+        "fy": fy,
+        "quarter": quarter,
+        "metrics": [
+            {"metric_id": metric_id, "name": f"{metric_id} v{value}", "value": value, "unit": "%"}
+            for metric_id, value in metrics
+        ]
+    }
+
+
+async def insert(reports, doc):
+    async with rollups.updating_quarters((doc["fy"], doc["quarter"])):
+        await reports.insert_one(doc)
+
+
+def metric_values(rollup):
+    return {
+        metric["metric_id"]: (metric["sum"], metric["count"], metric["entries_sum"], metric["entries"])
+        for metric in rollup["metrics"]
+    }
+
+
+def test_rollups_match_a_scan_of_the_reports(db):
+    reports, _ = db
+
+    async def run():
+        await insert(reports, report("FY26", "Q2", ("b", 1)))
+        # The second entry of a metric counts towards its entries, not its actuals
+        await insert(reports, report("FY26", "Q1", ("a", 2), ("b", 4), ("a", 6)))
+        await insert(reports, report("FY26", "Q1", ("c", 3), ("a", 4)))
+        return await rollups.get_quarter_rollups({})
+
+    q2, q1 = asyncio.run(run())
+    # Quarters and their metrics follow the order they were first reported in
+    assert [(rollup["fy"], rollup["quarter"]) for rollup in (q2, q1)] == [("FY26", "Q2"), ("FY26", "Q1")]
+    assert [metric["metric_id"] for metric in q1["metrics"]] == ["a", "b", "c"]
+    assert metric_values(q1) == {"a": (6, 2, 12, 3), "b": (4, 1, 4, 1), "c": (3, 1, 3, 1)}
+    # Definitions come from the earliest report with the metric
+    assert q1["metrics"][0]["name"] == "a v2"
+    assert metric_values(q2) == {"b": (1, 1, 1, 1)}
+
+
+def test_stored_rollups_are_current_after_each_write(db):
+    reports, quarters = db
+    doc = report("FY26", "Q1", ("a", 2))
+
+    async def run():
+        await insert(reports, doc)
+        await insert(reports, report("FY26", "Q1", ("a", 4)))
+        async with rollups.updating_quarters(("FY26", "Q1")):
+            await reports.delete_one({"_id": doc["_id"]})
+
+    asyncio.run(run())
+    stored = quarters.sync.find_one({"fy": "FY26", "quarter": "Q1"})
+    assert rollups.is_current(stored)
+    assert stored["revision"] == 3
+    assert metric_values(stored) == {"a": (4, 1, 4, 1)}
+
+
+def test_failed_write_still_rebuilds_its_quarter(db):
+    reports, quarters = db
+
+    async def run():
+        with pytest.raises(RuntimeError):
+            async with rollups.updating_quarters(("FY26", "Q1")):
+                await reports.insert_one(report("FY26", "Q1", ("a", 2)))
+                raise RuntimeError("request cancelled")
+
+    asyncio.run(run())
+    stored = quarters.sync.find_one({"fy": "FY26", "quarter": "Q1"})
+    assert rollups.is_current(stored)
+    assert metric_values(stored) == {"a": (2, 1, 2, 1)}
+
+
+def test_quarters_found_during_the_write_are_rebuilt(db):
+    reports, quarters = db
+    doc = report("FY26", "Q1", ("a", 2))
+
+    async def run():
+        await insert(reports, doc)
+        # A report moved to another quarter: the one it left is only known from the pre-image
+        async with rollups.updating_quarters(("FY26", "Q2")) as touched:
+            previous = await reports.find_one_and_update({"_id": doc["_id"]}, {"$set": {"quarter": "Q2"}})
+            touched.add((previous["fy"], previous["quarter"]))
+        return await rollups.get_quarter_rollups({})
+
+    assert [rollup["quarter"] for rollup in asyncio.run(run())] == ["Q2"]
+    assert all(rollups.is_current(stored) for stored in quarters.sync.find())
+    assert quarters.sync.find_one({"quarter": "Q1"})["metrics"] == []
+
+
+def test_quarter_with_a_write_in_flight_is_read_from_the_reports(db):
+    reports, quarters = db
+
+    async def run():
+        await insert(reports, report("FY26", "Q1", ("a", 2)))
+        async with rollups.updating_quarters(("FY26", "Q1")):
+            await reports.insert_one(report("FY26", "Q1", ("a", 4)))
+            return await rollups.get_quarter_rollups({"fy": "FY26"})
+
+    [rollup] = asyncio.run(run())
+    assert metric_values(rollup) == {"a": (6, 2, 6, 2)}
+
+
+def test_failed_rebuild_is_repaired_on_read(db, monkeypatch):
+    reports, quarters = db
+    build = rollups.build_quarter_rollup
+
+    async def failing_build(*args, **kwargs):
+        raise ConnectionError("primary stepped down")
+
+    async def run():
+        await insert(reports, report("FY26", "Q1", ("a", 2)))
+        monkeypatch.setattr(rollups, "build_quarter_rollup", failing_build)
+        with pytest.raises(ConnectionError):
+            await insert(reports, report("FY26", "Q1", ("a", 4)))
+        monkeypatch.setattr(rollups, "build_quarter_rollup", build)
+        return await rollups.get_quarter_rollups({})
+
+    [rollup] = asyncio.run(run())
+    assert metric_values(rollup) == {"a": (6, 2, 6, 2)}
+    assert rollups.is_current(quarters.sync.find_one({"fy": "FY26", "quarter": "Q1"}))
+
+
+def test_build_is_redone_when_a_write_moves_the_revision(db, monkeypatch):
+    reports, quarters = db
+    compute = rollups.compute_quarter_rollup
+    computed = []
+
+    async def interleaved_compute(fy, quarter):
+        rollup = await compute(fy, quarter)
+        if not computed:
+            # Another write lands after this aggregation read the reports
+            await reports.insert_one(report(fy, quarter, ("a", 4)))
+            await rollups._bump_revision(fy, quarter)
+        computed.append(rollup)
+        return rollup
+
+    async def run():
+        await reports.insert_one(report("FY26", "Q1", ("a", 2)))
+        revision = await rollups._bump_revision("FY26", "Q1")
+        monkeypatch.setattr(rollups, "compute_quarter_rollup", interleaved_compute)
+        await rollups.build_quarter_rollup("FY26", "Q1", revision)
+
+    asyncio.run(run())
+    stored = quarters.sync.find_one({"fy": "FY26", "quarter": "Q1"})
+    assert len(computed) == 2
+    assert stored["built_revision"] == stored["revision"] == 2
+    assert metric_values(stored) == {"a": (6, 2, 6, 2)}
+
+
+def test_rebuild_recomputes_every_quarter_and_clears_pending(db):
+    reports, quarters = db
+    reports.sync.insert_many([report("FY26", "Q1", ("a", 2)), report("FY26", "Q2", ("b", 3))])
+    quarters.sync.insert_one({"fy": "FY26", "quarter": "Q1", "revision": 4, "pending": 1, "metrics": []})
+
+    asyncio.run(rollups.rebuild_quarterly_rollups())
+    stored = {rollup["quarter"]: rollup for rollup in quarters.sync.find()}
+    assert all(rollups.is_current(rollup) for rollup in stored.values())
+    assert stored["Q1"]["revision"] == 5
+    assert metric_values(stored["Q1"]) == {"a": (2, 1, 2, 1)}
+    assert metric_values(stored["Q2"]) == {"b": (3, 1, 3, 1)}
+
+
+def test_per_metric_rollups_are_dropped(db):
+    _, quarters = db
+    quarters.sync.insert_one({"fy": "FY26", "quarter": "Q1", "metric_id": "a", "sum": 2, "count": 1})
+
+    asyncio.run(rollups.drop_legacy_rollups())
+    assert quarters.sync.count_documents({}) == 0
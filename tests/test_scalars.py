@@ -0,0 +1,83 @@
+from datetime import datetime
+
+import pytest
+from ariadne import QueryType, graphql_sync, make_executable_schema
+from graphql import IntValueNode, StringValueNode
+
+from app.resolvers.scalars import (
+    date_scalar, datetime_scalar, parse_date_literal, parse_date_value, parse_datetime_value,
+    serialize_date, serialize_datetime
+)
+
+STORED = datetime(2026, 1, 2, 3, 4, 5)
+
+query = QueryType()
+
+
+@query.field("echoDate")
+def resolve_echo_date(_, info, value):
+    return value
+
+
+@query.field("stored")
+def resolve_stored(*_):
+    return {"day": STORED, "at": STORED}
+
+
+schema = make_executable_schema(
+    """
+    scalar Date
+    scalar DateTime
+
+    type Stored {
+        day: Date
+        at: DateTime
+    }
+
+    type Query {
+        echoDate(value: Date!): Date
+        stored: Stored
+    }
+    """,
+    query, date_scalar, datetime_scalar
+)
+
+
+def test_stored_dates_are_formatted_at_the_edge():
+    _, result = graphql_sync(schema, {"query": "{ stored { day at } }"})
+    assert result["data"]["stored"] == {"day": "02-01-2026", "at": "02-01-2026 03:04:05"}
+
+
+def test_arguments_are_parsed_into_datetimes():
+    _, result = graphql_sync(schema, {
+        "query": "query ($value: Date!) { literal: echoDate(value: \"02-01-2026\") variable: echoDate(value: $value) }",
+        "variables": {"value": "2026-01-02"}
+    })
+    assert result["data"] == {"literal": "02-01-2026", "variable": "02-01-2026"}
+
+
+def test_invalid_date_argument_is_an_error():
+    _, result = graphql_sync(schema, {"query": "{ echoDate(value: \"31-02-2026\") }"})
+    assert "expected DD-MM-YYYY" in result["errors"][0]["message"]
+
+
+def test_date_parsing():
+    assert parse_date_value("02-01-2026") == datetime(2026, 1, 2)
+    assert parse_date_literal(StringValueNode(value="02-01-2026")) == datetime(2026, 1, 2)
+    with pytest.raises(ValueError):
+        parse_date_value("soon")
+    with pytest.raises(ValueError):
+        parse_date_literal(IntValueNode(value="20260102"))
+
+
+def test_datetime_parsing_accepts_dates_too():
+    assert parse_datetime_value("02-01-2026 03:04:05") == STORED
+    assert parse_datetime_value("2026-01-02T03:04:05Z") == STORED
+    assert parse_datetime_value("02-01-2026") == datetime(2026, 1, 2)
+    with pytest.raises(ValueError):
+        parse_datetime_value("02-01-2026 25:00:00")
+
+
+def test_serializers_pass_through_preformatted_strings():
+    assert serialize_date("02-01-2026") == "02-01-2026"
+    assert serialize_datetime("02-01-2026 03:04:05") == "02-01-2026 03:04:05"
@@ -0,0 +1,62 @@
+from datetime import datetime
+
+import pytest
+from bson import ObjectId
+
+from app.db.serializers import (
+    FIELD_TYPES, READ_CONVERTERS, build_serializer, date_fields, format_date, format_datetime,
+    get_serializer
+)
+
+CREATED = datetime(2026, 1, 2, 3, 4, 5)
+
+
+def test_converts_id_and_declared_fields_only():
+    report_id, user_id = ObjectId(), ObjectId()
+    doc = get_serializer("weekly_reports")({
+        "_id": report_id,
+        "week_date": "2025-04-04",
+        "created_by": user_id,
+        "created_at": CREATED,
+        "other_id": user_id,
+    })
+    assert doc == {
+        "id": str(report_id),
+        "week_date": "04-04-2025",
+        "created_by": str(user_id),
+        # Left to the DateTime scalar
+        "created_at": CREATED,
+        "other_id": user_id,
+    }
+
+
+def test_missing_and_empty_fields_are_left_alone():
+    serialize = build_serializer({"created_by": "str", "week_date": "date_string"})
+    assert serialize({"_id": 1, "created_by": None}) == {"id": "1", "created_by": None}
+    assert serialize(None) is None
+
+
+def test_every_declared_type_is_known():
+    kinds = {kind for field_types in FIELD_TYPES.values() for kind in field_types.values()}
+    assert kinds <= set(READ_CONVERTERS) | {"date", "datetime"}
+
+
+def test_date_fields_are_the_bson_date_fields():
+    assert date_fields("execution_data") == ["last_successful_execution", "created_at", "updated_at"]
+    assert date_fields("weekly_reports") == ["created_at", "updated_at"]
+
+
+@pytest.mark.parametrize("value, expected", [
+    (CREATED, "02-01-2026"),
+    ("02-01-2026", "02-01-2026"),
+    ("2026-01-02T03:04:05Z", "02-01-2026"),
+    ("not a date", "not a date"),
+])
+def test_format_date_matches_strftime(value, expected):
+    assert format_date(value) == expected
+
+
+def test_format_datetime_matches_strftime():
+    assert format_datetime(CREATED) == CREATED.strftime("%d-%m-%Y %H:%M:%S")
+    assert format_datetime(datetime(999, 12, 31)) == "31-12-0999 00:00:00"
+    assert format_datetime("02-01-2026") == "02-01-2026"
@@ -0,0 +1,182 @@
+import asyncio
+import os
+import tempfile
+import uuid
+from multiprocessing import get_context, shared_memory
+
+import pytest
+
+from app.utils.shared_state import LocalState, MongoState, SharedMemoryState
+
+WORKER_ITERATIONS = 200
+
+
+@pytest.fixture
+def segment_name():
+    """A shared memory segment (and lock file) of its own, removed afterwards"""
+    name = f"test-shared-state-{uuid.uuid4().hex[:12]}"
+    yield name
+    try:
+        segment = shared_memory.SharedMemory(name=name)
+    except FileNotFoundError:
+        pass
+    else:
+        segment.close()
+        segment.unlink()
+    try:
+        os.remove(os.path.join(tempfile.gettempdir(), f"{name}.lock"))
+    except FileNotFoundError:
+        pass
+
+
+def slots(state):
+    return [state.SLOT.unpack_from(state._shm.buf, i * state.SLOT.size) for i in range(state.slots)]
+
+
+def _count(name, key):
+    async def run():
+        state = SharedMemoryState(name, slots=64)
+        for _ in range(WORKER_ITERATIONS):
+            await state.hit(key, 1, 1, 60)
+            await state.incr(key)
+    asyncio.run(run())
+
+
+async def exercise(state):
+    """The same sequence against any backend: windowed hits, then counters"""
+    results = [
+        await state.hit("client", 5, 2, 60),
+        await state.hit("client", 5, 1, 60),
+        await state.hit("client", 6, 4, 60),
+        await state.hit("other", 6, 1, 60),
+        # Windows before the previous one no longer count
+        await state.hit("client", 8, 1, 60),
+    ]
+    counters = [await state.get("generation"), await state.incr("generation"), await state.incr("generation")]
+    return results, counters + [await state.get("generation"), await state.get("unknown")]
+
+
+EXPECTED = ([(2, 0), (3, 0), (4, 3), (1, 0), (1, 0)], [0, 1, 2, 2, 0])
+
+
+def test_local_state():
+    assert asyncio.run(exercise(LocalState())) == EXPECTED
+
+
+def test_local_state_drops_old_windows():
+    state = LocalState()
+
+    async def run():
+        for window in range(10):
+            await state.hit("client", window, 1, 60)
+
+    asyncio.run(run())
+    assert sorted(state._windows["client"]) == [8, 9]
+
+
+def test_shared_memory_state(segment_name):
+    assert asyncio.run(exercise(SharedMemoryState(segment_name, slots=64))) == EXPECTED
+
+
+def test_shared_memory_state_is_shared_by_instances(segment_name):
+    first, second = SharedMemoryState(segment_name, slots=64), SharedMemoryState(segment_name, slots=64)
+
+    async def run():
+        await first.incr("generation")
+        await second.incr("generation")
+        await first.hit("client", 1, 3, 60)
+        return await second.get("generation"), await second.hit("client", 1, 1, 60)
+
+    assert asyncio.run(run()) == (2, (4, 0))
+
+
+def test_shared_memory_state_counts_across_processes(segment_name):
+    SharedMemoryState(segment_name, slots=64)
+    workers = [get_context("spawn").Process(target=_count, args=(segment_name, "key")) for _ in range(2)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join(timeout=60)
+    assert [worker.exitcode for worker in workers] == [0, 0]
+
+    async def totals():
+        state = SharedMemoryState(segment_name, slots=64)
+        current, _ = await state.hit("key", 1, 0, 60)
+        return current, await state.get("key")
+
+    assert asyncio.run(totals()) == (2 * WORKER_ITERATIONS, 2 * WORKER_ITERATIONS)
+
+
+def test_expired_slot_restarts_its_count(segment_name):
+    state = SharedMemoryState(segment_name, slots=4)
+    assert state._add("a", 5, 110, now=100) == 5
+    assert state._add("a", 1, 110, now=105) == 6
+    assert state._add("a", 1, 130, now=120) == 1
+
+
+def test_expired_slots_are_reused(segment_name):
+    state = SharedMemoryState(segment_name, slots=4)
+    for i, key in enumerate("abcd"):
+        state._add(key, 1, 110 + i, now=100)
+    assert all(slot_hash for slot_hash, _, _ in slots(state))
+
+    # "a" and "b" have expired: the new key takes one of their slots
+    assert state._add("e", 7, 150, now=112) == 7
+    hashes = {slot_hash for slot_hash, _, _ in slots(state)}
+    assert state._hash("e") in hashes
+    assert {state._hash("c"), state._hash("d")} <= hashes
+
+
+def test_soonest_expiring_slot_is_taken_over_when_all_are_live(segment_name):
+    state = SharedMemoryState(segment_name, slots=4)
+    for key, expires_at in zip("abcd", (140, 120, 150, 130)):
+        state._add(key, 3, expires_at, now=100)
+
+    assert state._add("e", 1, 160, now=101) == 1
+    hashes = {slot_hash for slot_hash, _, _ in slots(state)}
+    assert hashes == {state._hash(key) for key in "acde"}
+    # "b" lost its slot, so it counts from scratch
+    assert state._add("b", 0, 120, now=102) == 0
+
+
+def test_non_expiring_counters_are_never_taken_over(segment_name):
+    state = SharedMemoryState(segment_name, slots=4)
+    for key in "abcd":
+        state._add(key, 2, 0, now=100)
+
+    assert state._add("e", 1, 0, now=100) == 1
+    assert state._add("e", 1, 0, now=100) == 1
+    assert {value for _, _, value in slots(state)} == {2}
+
+
+def test_mongo_state(mongo):
+    collection = mongo["shared_state"]
+    assert asyncio.run(exercise(MongoState(collection))) == EXPECTED
+    # Only the current and previous windows are kept on the document
+    assert collection.sync.find_one({"_id": "window:client"})["windows"] == {"8": 1}
+
+
+@pytest.fixture
+def mongo_server():
+    """The shared_state_test collection on the server at MONGO_URI, if one answers"""
+    from motor.motor_asyncio import AsyncIOMotorClient
+    from pymongo import MongoClient
+    from pymongo.errors import PyMongoError
+
+    uri = os.environ.get("MONGO_URI", "mongodb://localhost:27017")
+    client = MongoClient(uri, serverSelectionTimeoutMS=500)
+    try:
+        client.admin.command("ping")
+    except PyMongoError:
+        pytest.skip(f"no MongoDB server at {uri}")
+    name = f"shared_state_test_{uuid.uuid4().hex[:8]}"
+    yield lambda: AsyncIOMotorClient(uri).metrics_tracking_test[name]
+    client.metrics_tracking_test.drop_collection(name)
+    client.close()
+
+
+def test_mongo_state_on_a_server(mongo_server):
+    async def run():
+        return await exercise(MongoState(mongo_server()))
+
+    assert asyncio.run(run()) == EXPECTED